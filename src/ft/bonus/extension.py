@@ -0,0 +1,165 @@
+import json
+import os
+
+import discord
+from discord import Option
+from discord.ext import tasks
+from discord.ui import Select, View
+from loguru import logger
+
+from src.ft.bonus.squadbusters.navigation import NavigationView
+
+
+@tasks.loop(hours=24)
+async def scheduled_update():
+    """
+    This function is a task that runs every 24 hours.
+
+    The function executes the "scraper.py" script located in the "src/ft/bonus/squadbusters" directory.
+    The purpose of this script is to update the data used by the bot.
+
+    This function doesn't take any arguments and doesn't return anything.
+    """
+    logger.info("Updating squadbusters data...")
+    os.system("python src/ft/bonus/squadbusters/scraper.py")
+
+
+def setup(bot):
+    """
+    Registers the bonus features: the 'sb-ultras' and 'raids' commands, and the Squad Busters data update task
+    started once the bot is ready.
+    """
+    @bot.listen("on_ready")
+    async def start_squadbusters_update():
+        if not scheduled_update.is_running():
+            scheduled_update.start()
+
+    @bot.command(name='sb-ultras', description='Display the list of ultra abilities')
+    async def sb_ultras(ctx, character: Option(str, "The character name (Archer Queen, Barbarian...)", required=False)):
+        """
+        Handles the 'sb-ultras' command in Discord. It displays a list of ultra abilities for characters in the game.
+
+        This command can be used with or without specifying a character name. If a character name is provided, the command
+        displays the ultra abilities for that specific character. If no character name is provided, it displays the ultra
+        abilities for all characters.
+
+        Args:
+            ctx: The context under which the command is executed. Contains information about the guild, channel, and user.
+            character: An optional argument. The name of the character for which to display ultra abilities. If not provided,
+                       the command displays ultra abilities for all characters.
+
+        The function reads the ultra abilities data from a JSON file (`abilities.json`), which contains the abilities for
+        each character. The character names are keys in this JSON file. If a character name is provided, it converts the
+        name to lowercase and replaces spaces with hyphens to match the keys in the JSON file. If the character is found,
+        it displays the abilities for that character. Otherwise, it sends a message indicating the character was not found.
+        """
+        with open("src/ft/bonus/squadbusters/abilities.json", "r") as file:
+            abilities_data = json.load(file)
+        characters = [character for character in abilities_data.keys() if character != 'description']
+
+        if character:
+            character = character.lower().replace(" ", "-")
+            if character in abilities_data:
+                start_index = characters.index(character)
+            else:
+                await ctx.respond(f"Character **{character}** not found.")
+                return
+        else:
+            start_index = 0
+
+        view = NavigationView(characters, abilities_data, start_index)
+        embed = view.update_embed()
+        await ctx.respond(embed=embed, view=view)
+
+
+
+    @bot.slash_command(name="raids", description="Display the list of raids and their steps")
+    async def raids(ctx):
+        """
+        Handles the '/raids' slash command in Discord. It allows users to select a raid from a predefined list and then
+        choose a specific step of the raid to view detailed information about it.
+
+        Args:
+            ctx: The context under which the slash command is executed. Contains information about the guild, channel,
+                 and user.
+
+        This function first presents a selection menu of available raids to the user. Once a raid is selected, another
+        selection menu is presented with the steps of the chosen raid. The user can then select a specific step to view
+        detailed information about it, which is displayed in an embed message.
+        """
+        raids = ["Vow of the Disciple"]
+        raid_options = [discord.SelectOption(label=raid, value=raid) for raid in raids]
+
+        raid_select = Select(placeholder="Choose a raid...", options=raid_options)
+
+        async def raid_select_callback(interaction):
+            """
+            Callback function for when a raid is selected from the raid selection menu.
+
+            Args:
+                interaction: The interaction object representing the user's selection.
+
+            This function retrieves the selected raid, validates it, and then presents another selection menu to the user
+            with the steps available for the selected raid. If the selected raid is not found, an error message is sent.
+            """
+            selected_raid = raid_select.values[0]
+
+            if selected_raid not in raids:
+                await interaction.response.send_message("Invalid option.", ephemeral=True)
+                return
+
+            raid_path = os.path.join(os.getcwd(), "src/ft/bonus/destiny/", selected_raid)
+            if not os.path.exists(raid_path):
+                await interaction.response.send_message(f"Folder {raid_path} unreachable.", ephemeral=True)
+                return
+
+            etapes = [etape.split('.')[0] for etape in os.listdir(raid_path) if etape.endswith('.txt')]
+            etapes = [etape.replace("_", " ") for etape in etapes]
+            etape_options = [discord.SelectOption(label=etape, value=etape) for etape in etapes]
+
+            etape_select = Select(placeholder="Choose a step...", options=etape_options)
+
+            async def etape_select_callback(interaction):
+                """
+                Callback function for when a raid step is selected from the step selection menu.
+
+                Args:
+                    interaction: The interaction object representing the user's selection.
+
+                This function retrieves the selected step, validates it, and then reads the corresponding information
+                from a text file. The information is then displayed to the user in an embed message. If the selected step
+                is not found, an error message is sent.
+                """
+                selected_etape = etape_select.values[0]
+
+                file_path = os.path.join(raid_path, f'{selected_etape.lower().replace(" ", "_")}.txt')
+
+                if not os.path.isfile(file_path):
+                    await interaction.response.send_message(f"File {file_path} unreachable.", ephemeral=True)
+                    return
+
+                try:
+                    with open(file_path, 'r', encoding='utf-8') as file:
+                        content = file.read()
+                except Exception as e:
+                    await interaction.response.send_message(f"Error when reading file : {e}", ephemeral=True)
+                    return
+
+                embed = discord.Embed(title=f"{selected_raid} - {selected_etape}", description=content, color=discord.Color.blue())
+                embed.set_image(url=content.split('\n')[0])
+
+                await interaction.response.send_message(embed=embed, ephemeral=False)
+
+            etape_select.callback = etape_select_callback
+
+            etape_view = View()
+            etape_view.add_item(etape_select)
+
+            await interaction.response.send_message("Select a step :", view=etape_view, ephemeral=False)
+
+        raid_select.callback = raid_select_callback
+
+        raid_view = View()
+        raid_view.add_item(raid_select)
+
+        await ctx.respond("Select a raid  :", view=raid_view, ephemeral=False)
@@ -0,0 +1,97 @@
+import discord
+from discord.ext import tasks, commands
+
+from src.ft.ft1.recommendations import generate_recommendations
+from src.ft.ft1.stream_notifications import check_streamers, validate_streamer
+from src.utilities.settings import Settings
+
+settings = Settings()
+
+
+@tasks.loop(hours=1)
+async def scheduled_recommendation(bot):
+    """
+    This function is a task that runs every hour. Its purpose is to send a recommendation message to a specific channel.
+
+    The function first retrieves the channel using the channel_id. If the channel exists, it sends a message
+    indicating that it's analyzing and recommending content. It then calls the `analyze_and_recommend` function with
+    the bot and channel_id as arguments to get the recommendation. The recommendation is then sent to the channel.
+
+    It takes one argument:
+    - bot: The bot instance.
+
+    This function doesn't return anything.
+    """
+    recommended_channel_id = settings.get('recommended_channel_id')
+    recommended_channel = bot.get_channel(recommended_channel_id)
+    channel_id = settings.get('recommendations_channel_id')
+    channel = bot.get_channel(channel_id)
+
+    if channel and recommended_channel:
+        embed = discord.Embed(title=":alarm_clock: Scheduled Recommendation",
+                                description=f":mag_right: Analyzing and recommending content in {recommended_channel.mention}...",
+                                color=0xe6e7e8)
+        embed.set_footer(text="MEE7 Recommendation System",
+                            icon_url=settings.get('icon_url'))
+        message = await channel.send(embed=embed)
+        recommendation = await generate_recommendations(bot, recommended_channel, recommended_channel_id, discord, settings.get('icon_url'))
+
+        await message.reply(embed=recommendation)
+
+
+def setup(bot):
+    """
+    Registers the Twitch stream notifications and recommendations feature: the 'recommend' and 'add_streamer'
+    commands, and the streamers check task started once the bot is ready.
+    """
+    @bot.listen("on_ready")
+    async def start_stream_notifications():
+        # scheduled_recommendation.start(bot)
+        if not check_streamers.is_running():
+            check_streamers.start(bot)
+
+    @bot.command(name="recommend", description="Recommends content based on recent discussions")
+    async def recommend(ctx, channel: discord.TextChannel):
+        """
+        This function is a command handler for the 'recommend' command.
+
+        It takes two arguments: - ctx: The context in which the command was called. This includes information about the
+        message, the channel, and the user who called the command. - channel_id: The ID of the channel for which to
+        recommend content. This should be a string.
+
+        The function first checks if the channel_id is a digit. If it is, it converts it to an integer and checks if a
+        channel with that ID exists. If the channel exists, it calls the `analyze_and_recommend` function with the bot
+        and channel_id as arguments to get the recommendation. The recommendation is then sent as a response to the
+        command. If the channel doesn't exist, it sends a response indicating that the channel was not found for
+        analysis. If the channel_id is not a digit, it sends a response indicating that the channel ID is invalid.
+
+        This function doesn't return anything.
+        """
+        channel_id = channel.id
+        channel = bot.get_channel(channel_id)
+        if channel:
+            recommendation = await generate_recommendations(bot, channel, channel_id, discord, settings.get('icon_url'))
+            await ctx.respond(embed=recommendation)
+        else:
+            await ctx.respond("Channel not found for analysis.")
+
+    @bot.command(name="add_streamer", description="Adds a streamer to the list of streamers to check")
+    @commands.has_permissions(administrator=True)
+    async def add_streamer(ctx, streamer: discord.Option(discord.SlashCommandOptionType.string)):
+        """
+        This function is a command handler for the 'add_streamer' command.
+
+        It takes two arguments:
+        - ctx: The context in which the command was called.
+        - streamer: The name of the streamer to add to the list of streamers to check.
+
+        The function first validates the streamer name using the `validate_streamer` function. If the streamer is valid,
+        it adds the streamer to the list of streamers to check and sends a success message. If the streamer is invalid,
+        it sends an error message.
+        """
+        streamer = streamer.lower().replace(" ", "")
+        if await validate_streamer(streamer, append=True):
+            settings.add_streamer(streamer)
+            await ctx.respond(f":white_check_mark: {streamer} has been added to the list of streamers to check.")
+        else:
+            await ctx.respond(f":x: {streamer} is not a valid Twitch username.")
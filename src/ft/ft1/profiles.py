@@ -0,0 +1,70 @@
+import json
+import time
+
+
+class UserProfileCache:
+    def __init__(self, file_path="src/ft/ft1/user_profiles.json", ttl=24 * 3600):
+        """
+        A persistent cache of Twitch user profiles (display name, login, profile image...), indexed by user ID and by
+        login. Profiles older than `ttl` seconds are considered expired and must be fetched again. The logins unknown to
+        Twitch (typo, renamed or banned user) are remembered for `ttl` seconds too, so they aren't requested again on
+        every poll.
+
+        Args:
+            file_path (str): The JSON file where the profiles are persisted.
+            ttl (int): The time to live of a profile, in seconds.
+        """
+        self.file_path = file_path
+        self.ttl = ttl
+        self.profiles = {}  # user ID -> {'profile': dict, 'fetched_at': timestamp}
+        self.logins = {}  # login -> user ID
+        self.unknown_logins = {}  # login -> timestamp of the lookup that found no user
+        self.dirty = False
+        self.load()
+
+    def load(self):
+        try:
+            with open(self.file_path, "r") as f:
+                self.profiles = json.load(f)
+        except (FileNotFoundError, json.JSONDecodeError):
+            self.profiles = {}
+        self.logins = {entry['profile']['login']: user_id for user_id, entry in self.profiles.items()}
+
+    def save(self):
+        if not self.dirty:
+            return
+        with open(self.file_path, "w") as f:
+            json.dump(self.profiles, f, indent=4)
+        self.dirty = False
+
+    def _fresh(self, entry):
+        return entry is not None and time.time() - entry['fetched_at'] < self.ttl
+
+    def get_by_id(self, user_id):
+        entry = self.profiles.get(str(user_id))
+        return entry['profile'] if self._fresh(entry) else None
+
+    def get_by_login(self, login):
+        user_id = self.logins.get(login.lower())
+        return self.get_by_id(user_id) if user_id else None
+
+    def put(self, profile):
+        user_id = str(profile['id'])
+        previous = self.profiles.get(user_id)
+        if previous and previous['profile']['login'] != profile['login']:
+            self.logins.pop(previous['profile']['login'], None)  # The user was renamed.
+        self.profiles[user_id] = {'profile': profile, 'fetched_at': time.time()}
+        self.logins[profile['login']] = user_id
+        self.unknown_logins.pop(profile['login'], None)
+        self.dirty = True
+
+    def put_unknown(self, login):
+        self.unknown_logins[login.lower()] = time.time()
+
+    def missing_logins(self, logins):
+        """
+        Returns the logins whose profile is not cached or has expired, except the logins recently found unknown.
+        """
+        now = time.time()
+        return [login for login in logins if self.get_by_login(login) is None
+                and now - self.unknown_logins.get(login.lower(), 0) >= self.ttl]
@@ -1,6 +1,4 @@
 import os
-from googlesearch import search
-import textrazor
 
 
 async def analyze_topics(bot, channel_id):
@@ -21,6 +19,8 @@ async def analyze_topics(bot, channel_id):
 
     This function returns a string which is the recommendation message and a list of topics.
     """
+    import textrazor  # Only imported when the recommendations are used.
+
     client = textrazor.TextRazor(os.getenv('TEXTRAZOR_API_KEY'), extractors=["topics"])
     client.set_entity_freebase_type_filters(["/organization/organization"])
     client.set_entity_dbpedia_type_filters(["Company"])
@@ -55,6 +55,8 @@ async def recommend_article(query):
     Raises:
         Exception: Captures and returns any exceptions as a string if an error occurs during the search process.
     """
+    from googlesearch import search
+
     try:
         # Perform the search and get the results as a generator
         search_results = search(query)
@@ -0,0 +1,142 @@
+import json
+import math
+from datetime import datetime, timezone
+
+HOURS_PER_WEEK = 7 * 24
+
+
+def hour_of_week(moment):
+    moment = moment.astimezone(timezone.utc)
+    return moment.weekday() * 24 + moment.hour
+
+
+def parse_started_at(started_at):
+    # Helix timestamps look like "2024-07-16T14:26:36Z"
+    return datetime.fromisoformat(started_at.replace('Z', '+00:00'))
+
+
+class PollingScheduler:
+    def __init__(self, file_path="src/ft/ft1/streamers_history.json", tick=15, min_interval=15, default_interval=60,
+                 max_interval=300, max_requests_per_minute=60, batch_size=100, min_events=3):
+        """
+        Decides which streamers are polled at each tick of the streamers check.
+
+        The scheduler learns when each streamer usually goes live: every go-live is counted in one of the 168 hours of
+        the week (UTC), and the counts are persisted. A streamer whose go-live distribution peaks around the current
+        hour is polled every `min_interval` seconds, a streamer who rarely streams at this hour only every
+        `max_interval` seconds, and streamers without enough history every `default_interval` seconds. Online
+        streamers are polled every `default_interval` seconds to detect the end of their stream.
+
+        The number of Helix requests per minute is capped by `max_requests_per_minute`: when more streamers are due
+        than the budget allows, the most overdue ones are polled first and the others wait for the next tick.
+
+        Args:
+            file_path (str): The JSON file where the go-live history is persisted.
+            tick (int): The number of seconds between two ticks of the streamers check.
+            min_interval (int): The polling interval of the streamers most likely to go live, in seconds.
+            default_interval (int): The polling interval of the streamers without history, in seconds.
+            max_interval (int): The polling interval of the dormant streamers, in seconds.
+            max_requests_per_minute (int): The global budget of Helix requests per minute.
+            batch_size (int): The number of streamers checked by one Helix request.
+            min_events (int): The number of recorded go-lives needed before adapting the interval of a streamer.
+        """
+        self.file_path = file_path
+        self.tick = tick
+        self.min_interval = min_interval
+        self.default_interval = default_interval
+        self.max_interval = max_interval
+        self.max_requests_per_minute = max_requests_per_minute
+        self.batch_size = batch_size
+        self.min_events = min_events
+        self.history = {}  # streamer -> {'hours': {hour of the week: count}, 'last_stream_id': str}
+        self.next_poll = {}  # streamer -> timestamp of the next poll
+        self.intervals = {}  # streamer -> current polling interval
+        self.dirty = False
+        self.load()
+
+    def load(self):
+        try:
+            with open(self.file_path, "r") as f:
+                self.history = json.load(f)
+        except (FileNotFoundError, json.JSONDecodeError):
+            self.history = {}
+        for history in self.history.values():
+            # Histories saved as a list of 168 counts are converted to the sparse format.
+            if isinstance(history['hours'], list):
+                history['hours'] = {str(hour): count for hour, count in enumerate(history['hours']) if count}
+
+    def save(self):
+        if not self.dirty:
+            return
+        with open(self.file_path, "w") as f:
+            json.dump(self.history, f, separators=(',', ':'))
+        self.dirty = False
+
+    def record_go_live(self, streamer, stream_id, started_at):
+        """
+        Counts a go-live in the history of a streamer. A stream is only counted once, even if it is seen going live
+        several times (e.g. after a restart of the bot).
+
+        Args:
+            streamer (str): The username of the streamer.
+            stream_id (str): The Helix ID of the stream.
+            started_at (datetime): When the stream started.
+        """
+        history = self.history.setdefault(streamer, {'hours': {}, 'last_stream_id': None})
+        if history['last_stream_id'] == stream_id:
+            return
+        hour = str(hour_of_week(started_at))  # JSON object keys are strings.
+        history['hours'][hour] = history['hours'].get(hour, 0) + 1
+        history['last_stream_id'] = stream_id
+        self.dirty = True
+
+    def relative_likelihood(self, streamer, now):
+        """
+        Returns how likely the streamer is to go live around `now` (the previous, current and next hours of the week)
+        compared to a streamer going live uniformly at any hour: 1 means average, 4 four times more likely than
+        average. Returns None if the streamer doesn't have enough history.
+        """
+        hours = self.history.get(streamer, {}).get('hours', {})
+        total = sum(hours.values())
+        if total < self.min_events:
+            return None
+        current = hour_of_week(now)
+        window = sum(hours.get(str((current + offset) % HOURS_PER_WEEK), 0) for offset in (-1, 0, 1))
+        prior = 0.01  # Smoothing, so that no hour is considered impossible.
+        share = (window + 3 * prior) / (total + HOURS_PER_WEEK * prior)
+        return share / (3 / HOURS_PER_WEEK)
+
+    def interval(self, streamer, online, now):
+        if online:
+            return self.default_interval
+        likelihood = self.relative_likelihood(streamer, now)
+        if likelihood is None:
+            return self.default_interval
+        return min(self.max_interval, max(self.min_interval, self.default_interval / likelihood))
+
+    def due_streamers(self, streamers, now):
+        """
+        Returns the streamers to poll at this tick, within the request budget, most overdue first.
+
+        Args:
+            streamers (list): The usernames of all the streamers.
+            now (datetime): The current time.
+        """
+        timestamp = now.timestamp()
+        due = [streamer for streamer in streamers if self.next_poll.get(streamer, 0) <= timestamp]
+        capacity = max(1, math.floor(self.max_requests_per_minute * self.tick / 60)) * self.batch_size
+        if len(due) > capacity:
+            def overdue(streamer):
+                return (timestamp - self.next_poll.get(streamer, 0)) / self.intervals.get(streamer,
+                                                                                         self.default_interval)
+
+            due = sorted(due, key=overdue, reverse=True)[:capacity]
+        return due
+
+    def polled(self, streamer, online, now):
+        """
+        Schedules the next poll of a streamer after it was checked.
+        """
+        interval = self.interval(streamer, online, now)
+        self.intervals[streamer] = interval
+        self.next_poll[streamer] = now.timestamp() + interval
@@ -0,0 +1,82 @@
+import json
+import time
+
+
+class StreamerStates:
+    def __init__(self, file_path="src/ft/ft1/streamers_state.json", flush_interval=60):
+        """
+        The persisted state of the streamers: whether they are online, the Helix ID and start time of their current
+        (or last) stream, the ID of the Discord message announcing it and when they were last checked.
+
+        A stream is announced once per Helix stream ID, so a streamer still live after a restart of the bot isn't
+        announced again. The states are written behind: changes are kept in memory and written at most every
+        `flush_interval` seconds, except after a notification, which is written immediately.
+
+        Args:
+            file_path (str): The JSON file where the states are persisted.
+            flush_interval (int): The maximum number of seconds a change stays in memory only.
+        """
+        self.file_path = file_path
+        self.flush_interval = flush_interval
+        self.states = {}  # streamer -> {'online', 'stream_id', 'started_at', 'message_id', 'checked_at'}
+        self.dirty = False
+        self.saved_at = 0.0
+        self.load()
+
+    def load(self):
+        try:
+            with open(self.file_path, "r") as f:
+                self.states = json.load(f)
+        except (FileNotFoundError, json.JSONDecodeError):
+            self.states = {}
+
+    def save(self, force=False):
+        """
+        Writes the states if they changed since the last write, and if `flush_interval` seconds passed or `force` is
+        set.
+        """
+        if not self.dirty or not force and time.monotonic() - self.saved_at < self.flush_interval:
+            return
+        with open(self.file_path, "w") as f:
+            json.dump(self.states, f, separators=(',', ':'))
+        self.dirty = False
+        self.saved_at = time.monotonic()
+
+    def _state(self, streamer):
+        return self.states.setdefault(streamer, {'online': False, 'stream_id': None, 'started_at': None,
+                                                 'message_id': None, 'checked_at': None})
+
+    def is_online(self, streamer):
+        state = self.states.get(streamer)
+        return bool(state and state['online'])
+
+    def went_live(self, streamer, streamer_data):
+        """
+        Marks the streamer as online with the stream returned by Helix.
+
+        Returns:
+            bool: True if this stream wasn't seen before and must be announced, False if it was already announced
+                  (the streamer was already online, or the bot restarted during the stream).
+        """
+        state = self._state(streamer)
+        if state['stream_id'] == streamer_data['id']:
+            if not state['online']:
+                state['online'] = True
+                self.dirty = True
+            return False
+        state.update(online=True, stream_id=streamer_data['id'], started_at=streamer_data['started_at'],
+                     message_id=None)
+        self.dirty = True
+        return True
+
+    def went_offline(self, streamer):
+        self._state(streamer)['online'] = False
+        self.dirty = True
+
+    def set_message_id(self, streamer, message_id):
+        self._state(streamer)['message_id'] = message_id
+        self.dirty = True
+
+    def checked(self, streamer, timestamp):
+        self._state(streamer)['checked_at'] = timestamp
+        self.dirty = True
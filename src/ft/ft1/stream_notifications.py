@@ -1,137 +1,180 @@
-import os
+from datetime import datetime, timezone
 
 import discord
-import requests
 from discord.ext import tasks
-from dotenv import load_dotenv
 from loguru import logger
 
+from src.ft.ft1.profiles import UserProfileCache
+from src.ft.ft1.scheduler import PollingScheduler, parse_started_at
+from src.ft.ft1.states import StreamerStates
+from src.ft.ft1.twitch_api import HELIX_MAX_VALUES, helix_get, helix_get_many, twitch_auth
+from src.utilities.metrics import metrics, timed
 from src.utilities.settings import Settings
 
-dotenv_path = os.path.abspath(os.path.join(os.path.dirname(__file__), "../../..", ".env"))
-load_dotenv(dotenv_path)
 settings = Settings()
+twitch_settings = settings.get('twitch') or {}
 
-TWITCH_CLIENT_ID = os.getenv('TWITCH_CLIENT_ID')
-TWITCH_CLIENT_SECRET = os.getenv('TWITCH_CLIENT_SECRET')
+# Cache of the Twitch user profiles, used to build the notifications without requesting them when a streamer goes live
+user_profiles = UserProfileCache(ttl=twitch_settings.get('profiles_ttl_hours', 24) * 3600)
 
-if not TWITCH_CLIENT_ID or not TWITCH_CLIENT_SECRET:
-    logger.critical(
-        "Les variables d'environnement TWITCH_CLIENT_ID ou TWITCH_CLIENT_SECRET ne sont pas configurées correctement.")
-    exit()
+# Number of seconds between two ticks of the streamers check; each tick only polls the streamers that are due
+POLL_TICK_SECONDS = twitch_settings.get('poll_tick_seconds', 15)
 
-
-def get_access_token(client_id, client_secret):
-    """
-    This function retrieves an access token from Twitch's OAuth2 endpoint.
-
-    It takes two arguments:
-    - client_id: The client ID for the Twitch application.
-    - client_secret: The client secret for the Twitch application.
-
-    The function first constructs the URL for the OAuth2 endpoint and the payload for the request.
-    The payload includes the client_id, client_secret, and the grant_type which is set to 'client_credentials'.
-    It then sends a POST request to the OAuth2 endpoint with the payload.
-
-    If the request is successful, it retrieves the access token from the response and returns it.
-    If the request is not successful, it raises an HTTPError.
-
-    This function returns a string which is the access token.
-    """
-    url = 'https://id.twitch.tv/oauth2/token'  # The URL for the OAuth2 endpoint.
-    payload = {
-        'client_id': client_id,
-        'client_secret': client_secret,
-        'grant_type': 'client_credentials'
-    }
-    response = requests.post(url, data=payload)  # Send a POST request to the OAuth2 endpoint with the payload.
-    response.raise_for_status()  # If the request is not successful, raise an HTTPError.
-    return response.json()['access_token']  # Retrieve the access token from the response and return it.
-
-
-TWITCH_ACCESS_TOKEN = get_access_token(TWITCH_CLIENT_ID, TWITCH_CLIENT_SECRET)
+# Scheduler learning when each streamer usually goes live, to poll them more often at these hours
+scheduler = PollingScheduler(
+    tick=POLL_TICK_SECONDS,
+    min_interval=twitch_settings.get('min_poll_seconds', 15),
+    default_interval=twitch_settings.get('default_poll_seconds', 60),
+    max_interval=twitch_settings.get('max_poll_seconds', 300),
+    max_requests_per_minute=twitch_settings.get('max_requests_per_minute', 60),
+    batch_size=HELIX_MAX_VALUES,
+)
 
 # List of streamers to check
 STREAMERS = settings.get('streamers_list')
 
-# Twitch API URL
-STREAMS_API_URL = 'https://api.twitch.tv/helix/streams'
-USER_API_URL = 'https://api.twitch.tv/helix/users'
+# Persisted state of each streamer, so that a restart neither announces the streams again nor checks every streamer
+streamer_states = StreamerStates(flush_interval=twitch_settings.get('state_flush_seconds', 60))
+for streamer, state in streamer_states.states.items():
+    if state['checked_at'] is not None:  # Resume the polling schedule where it stopped.
+        scheduler.polled(streamer, state['online'], datetime.fromtimestamp(state['checked_at'], timezone.utc))
 
-# Twitch API headers
-API_HEADERS = {
-    'Client-ID': TWITCH_CLIENT_ID,
-    'Authorization': 'Bearer ' + TWITCH_ACCESS_TOKEN,
-}
 
-# Dictionary to store the status of each streamer
-streamers_status = {streamer: False for streamer in STREAMERS}
-
-
-@tasks.loop(minutes=1)
+@tasks.loop(seconds=POLL_TICK_SECONDS)
+@timed("task_seconds", task="check_streamers")
 async def check_streamers(bot):
     """
-    This function is a task that runs every minute. Its purpose is to check the status of a list of streamers.
+    This function is a task that runs every `POLL_TICK_SECONDS` seconds. Its purpose is to check the status of the
+    streamers that are due according to the polling scheduler.
 
     It takes one argument:
     - bot: The bot instance.
 
-    The function first logs a message to the console indicating that it's checking the streamers. It then iterates
-    over the list of streamers and checks if each streamer is online by calling the `check_user` function. If a
-    streamer is online and was previously not online, it updates the streamer's status to online and sends a
-    notification to Discord by calling the `notify_discord` function. If a streamer is not online and was previously
-    online, it updates the streamer's status to offline.
+    The function asks the scheduler which streamers are due: the streamers likely to go live at this hour are polled
+    more often than the dormant ones, within the Helix request budget. It then fetches their live streams with
+    `get_live_streams` (one request per 100 streamers). If a streamer is online and was previously not online, it
+    updates the streamer's state to online; if the stream wasn't announced yet (states are keyed by Helix stream ID and
+    persisted, so a restart doesn't announce it again), the go-live is recorded in the scheduler's history, the
+    profiles of these newly live streamers are retrieved with `get_users` (from the profiles cache, warmed by
+    `warm_user_profiles`) and a notification is sent to Discord by calling the `notify_discord` function. If a streamer
+    is not online and was previously online, it updates the streamer's state to offline. Every checked streamer is then
+    rescheduled. Streamers whose batch request failed keep their previous state and are polled again at the next tick.
 
     This function doesn't return anything.
     """
-    logger.info("Checking streamers...")
-    for streamer in STREAMERS:
-        datas = await check_user_and_get_info(
-            streamer)  # Check if the streamer is online by calling the `check_user` function.
-        is_online = bool(datas)
-        if is_online and not streamers_status[streamer]:  # If the streamer is online and was previously not online.
-            streamers_status[streamer] = True  # Update the streamer's status to online.
-            await notify_discord(datas, bot)  # Send a notification to Discord by calling the `notify_discord` function.
-        elif not is_online and streamers_status[streamer]:  # If the streamer is not online and was previously online.
-            streamers_status[streamer] = False  # Update the streamer's status to offline.
-
-
-async def check_user_and_get_info(streamer):
+    if not twitch_auth.configured:
+        return
+    now = datetime.now(timezone.utc)
+    due_streamers = scheduler.due_streamers(STREAMERS, now)
+    metrics.gauge("twitch_due_streamers").set(len(due_streamers))
+    if not due_streamers:
+        return
+    logger.info(f"Checking {len(due_streamers)} streamers...")
+    await warm_user_profiles(STREAMERS)
+    live_streams, checked_streamers = await get_live_streams(due_streamers)
+    newly_live = []
+    for streamer in checked_streamers:
+        streamer_data = live_streams.get(streamer)
+        if streamer_data:
+            if streamer_states.went_live(streamer, streamer_data):  # If this stream wasn't announced yet.
+                scheduler.record_go_live(streamer, streamer_data['id'], parse_started_at(streamer_data['started_at']))
+                newly_live.append(streamer_data)
+        elif streamer_states.is_online(streamer):  # If the streamer is not online and was previously online.
+            streamer_states.went_offline(streamer)
+        streamer_states.checked(streamer, now.timestamp())
+        scheduler.polled(streamer, streamer_states.is_online(streamer), now)
+
+    if newly_live:
+        users = await get_users([streamer_data['user_id'] for streamer_data in newly_live])
+        for streamer_data in newly_live:
+            user_info = users.get(streamer_data['user_id'])
+            if user_info:
+                message = await notify_discord({'streamer_data': streamer_data, 'user_info': user_info}, bot)
+                if message:
+                    streamer_states.set_message_id(streamer_data['user_login'].lower(), message.id)
+    streamer_states.save(force=bool(newly_live))
+    scheduler.save()
+
+
+async def get_live_streams(streamers):
     """
-    This function checks if a given streamer is currently online on Twitch and if so, retrieves the user's information.
+    This function retrieves the live streams of a list of streamers, using one Helix request per 100 streamers.
 
     Args:
-        streamer (str): The username of the streamer to check.
+        streamers (list): The usernames of the streamers to check.
 
     Returns:
-        dict: A dictionary with the streamer's online status and user information if the streamer is online.
-              If the streamer is not online, it returns an empty dictionary.
-
-    The function first checks if the streamer is online by sending a GET request to the Twitch API endpoint.
-    If there is any data in the response, the streamer is considered online and the function proceeds to retrieve the user's information.
-    The user's information is retrieved by sending another GET request to the Twitch API endpoint, this time with the user_id obtained from the streamer's data.
-    If there is any data in the response, the user's information is added to the return dictionary along with the streamer's data.
-    If an exception occurs during the process, an error message is logged and an empty dictionary is returned.
+        tuple: A dictionary mapping the username of each live streamer to its stream data, and the set of usernames
+               that were actually checked (the streamers of a batch whose request failed are missing from it).
     """
-    url = f'{STREAMS_API_URL}?user_login={streamer}'  # Construct the URL for the Twitch API endpoint.
-    try:
-        req = requests.get(url,
-                           headers=API_HEADERS)  # Send a GET request to the Twitch API endpoint with the API headers.
-        json_data = req.json()  # Retrieve the data from the response.
-        if json_data.get('data'):  # If there is any data, the streamer is online.
-            streamer_data = json_data['data'][0]
-
-            # Get user info
-            user_id = streamer_data['user_id']
-            url = f'{USER_API_URL}?id={user_id}'
-            req = requests.get(url, headers=API_HEADERS)
-            json_data = req.json()
-            if json_data.get('data'):
-                user_info = json_data['data'][0]
-                return {'streamer_data': streamer_data, 'user_info': user_info}
-    except Exception as e:
-        logger.error("Error checking user or getting user info:", e)
-    return {}
+    live_streams = {}
+    checked_streamers = set()
+    for batch, json_data in await helix_get_many('streams', 'user_login', streamers, [('first', 100)]):
+        if isinstance(json_data, Exception):
+            logger.error(f"Error checking streamers {batch[0]}...{batch[-1]}: {json_data}")
+            continue
+        checked_streamers.update(batch)
+        for streamer_data in json_data.get('data', []):
+            live_streams[streamer_data['user_login'].lower()] = streamer_data
+    return live_streams, checked_streamers
+
+
+async def get_users(user_ids):
+    """
+    This function retrieves the user information (display name, login, profile image...) of a list of Twitch users.
+    Cached profiles are returned directly, the others are requested with one Helix request per 100 users and cached.
+
+    Args:
+        user_ids (list): The IDs of the users.
+
+    Returns:
+        dict: A dictionary mapping user IDs to user information. Users whose batch request failed are missing.
+    """
+    users = {}
+    missing_ids = []
+    for user_id in user_ids:
+        user_info = user_profiles.get_by_id(user_id)
+        if user_info:
+            users[user_id] = user_info
+        else:
+            missing_ids.append(user_id)
+    if missing_ids:
+        for batch, json_data in await helix_get_many('users', 'id', missing_ids):
+            if isinstance(json_data, Exception):
+                logger.error(f"Error getting user info: {json_data}")
+                continue
+            for user_info in json_data.get('data', []):
+                users[user_info['id']] = user_info
+                user_profiles.put(user_info)
+        user_profiles.save()
+    return users
+
+
+async def warm_user_profiles(streamers):
+    """
+    This function caches the profiles of the streamers which are not cached yet or whose profile expired, using one
+    Helix request per 100 streamers. Once warmed, the profiles cache answers all the lookups until the profiles
+    expire, so go-live notifications don't need any extra request. The logins Helix doesn't know are remembered as
+    unknown until the profiles expire, so they don't cost a request on every poll.
+
+    Args:
+        streamers (list): The usernames of the streamers.
+    """
+    missing_logins = user_profiles.missing_logins(streamers)
+    if not missing_logins:
+        return
+    for batch, json_data in await helix_get_many('users', 'login', missing_logins):
+        if isinstance(json_data, Exception):
+            logger.error(f"Error warming user profiles: {json_data}")
+            continue
+        found = set()
+        for user_info in json_data.get('data', []):
+            user_profiles.put(user_info)
+            found.add(user_info['login'])
+        for login in batch:
+            if login.lower() not in found:
+                user_profiles.put_unknown(login)
+    user_profiles.save()
 
 
 async def validate_streamer(streamer, append=False):
@@ -142,24 +185,26 @@ async def validate_streamer(streamer, append=False):
         streamer (str): The username of the streamer to validate.
         append (bool): Whether to append the streamer to the list of streamers to check.
 
-    The function first constructs the URL for the Twitch API endpoint to retrieve user information.
-    It then sends a GET request to the Twitch API endpoint with the streamer's username.
-    If the response contains any data, the streamer is considered valid.
+    The function first looks for the streamer in the profiles cache. If it is not cached, it sends a GET request to the
+    Twitch API endpoint with the streamer's username, and caches the returned profile.
+    If a profile is found, the streamer is considered valid.
     If the response does not contain any data, the streamer is considered invalid.
 
     This function returns a boolean value indicating whether the streamer is valid.
     """
-    url = f'{USER_API_URL}?login={streamer}'  # Construct the URL for the Twitch API endpoint.
     try:
-        req = requests.get(url, headers=API_HEADERS)  # Send a GET request to the Twitch API endpoint with the API headers.
-        json_data = req.json()  # Retrieve the data from the response.
-        is_valid = bool(json_data.get('data'))
+        is_valid = user_profiles.get_by_login(streamer) is not None
+        if not is_valid:
+            json_data = await helix_get('users', {'login': streamer})  # Send a GET request to the Twitch API.
+            is_valid = bool(json_data.get('data'))
+            if is_valid:
+                user_profiles.put(json_data['data'][0])
+                user_profiles.save()
         if append and is_valid:
             STREAMERS.append(streamer)
-            streamers_status[streamer] = False
         return is_valid  # If there is any data, the streamer is valid.
     except Exception as e:
-        logger.error("Error validating streamer:", e)
+        logger.error(f"Error validating streamer: {e}")
 
 
 async def notify_discord(datas, bot):
@@ -174,7 +219,7 @@ async def notify_discord(datas, bot):
     it creates an embed message with the streamer's name, game, stream title, profile image, and a link to their
     Twitch stream. The embed message is then sent to the bot channel.
 
-    This function doesn't return anything.
+    This function returns the sent message, or None if the bot channel doesn't exist.
     """
     channel_id = settings.get('twitch_channel_id')  # The ID of the Discord channel to send the notification to.
     bot_channel = bot.get_channel(channel_id)
@@ -191,4 +236,4 @@ async def notify_discord(datas, bot):
         embed.set_thumbnail(url=user_info['profile_image_url'])
         embed.set_footer(text="MEE7 Twitch Stream Notifications",
                          icon_url=settings.get('icon_url'))
-        await bot_channel.send(embed=embed)
+        return await bot_channel.send(embed=embed)
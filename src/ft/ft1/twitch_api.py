@@ -0,0 +1,177 @@
+import asyncio
+import os
+import time
+
+import aiohttp
+from dotenv import load_dotenv
+from loguru import logger
+
+from src.utilities.metrics import metrics
+
+dotenv_path = os.path.abspath(os.path.join(os.path.dirname(__file__), "../../..", ".env"))
+load_dotenv(dotenv_path)
+
+TWITCH_CLIENT_ID = os.getenv('TWITCH_CLIENT_ID')
+TWITCH_CLIENT_SECRET = os.getenv('TWITCH_CLIENT_SECRET')
+
+# Twitch API URLs, which can be pointed to a local stand-in (see src/tests/twitch_standin.py)
+TOKEN_URL = os.getenv('TWITCH_TOKEN_URL', 'https://id.twitch.tv/oauth2/token')
+HELIX_API_URL = os.getenv('TWITCH_HELIX_API_URL', 'https://api.twitch.tv/helix')
+
+# Maximum number of values of a multi-value parameter (user_login, id...) per Helix request
+HELIX_MAX_VALUES = 100
+# Maximum number of concurrent Helix requests
+HELIX_MAX_CONCURRENCY = 10
+
+
+class TwitchAuthError(Exception):
+    pass
+
+
+class TwitchAuth:
+    def __init__(self, client_id, client_secret, refresh_margin=300):
+        """
+        Manages the Twitch app access token (client credentials flow).
+
+        The token is acquired asynchronously on first use rather than at import time, so the bot starts even when
+        Twitch is unreachable or the credentials are missing. It is refreshed `refresh_margin` seconds before it
+        expires, and immediately after Twitch rejected it (see `invalidate`).
+
+        Args:
+            client_id (str): The client ID of the Twitch application.
+            client_secret (str): The client secret of the Twitch application.
+            refresh_margin (int): How many seconds before the expiration the token is refreshed.
+        """
+        self.client_id = client_id
+        self.client_secret = client_secret
+        self.refresh_margin = refresh_margin
+        self.access_token = None
+        self.expires_at = 0.0
+        self.lock = asyncio.Lock()
+
+    @property
+    def configured(self):
+        return bool(self.client_id and self.client_secret)
+
+    def is_valid(self):
+        return self.access_token is not None and time.monotonic() < self.expires_at - self.refresh_margin
+
+    def invalidate(self, rejected_token):
+        # Only forget the token if it wasn't already replaced by a concurrent request.
+        if self.access_token == rejected_token:
+            self.access_token = None
+
+    async def get_token(self, session):
+        """
+        Returns a valid access token, requesting a new one if there is none yet or if it is about to expire. Concurrent
+        callers wait for the same request instead of each requesting a token.
+
+        Args:
+            session (aiohttp.ClientSession): The session used to request the token.
+
+        Raises:
+            TwitchAuthError: If the credentials are missing or Twitch refused them.
+            aiohttp.ClientError: If Twitch can't be reached.
+        """
+        if not self.configured:
+            raise TwitchAuthError("TWITCH_CLIENT_ID or TWITCH_CLIENT_SECRET environment variables are not set.")
+        async with self.lock:
+            if not self.is_valid():
+                await self._request_token(session)
+        return self.access_token
+
+    async def _request_token(self, session):
+        payload = {
+            'client_id': self.client_id,
+            'client_secret': self.client_secret,
+            'grant_type': 'client_credentials'
+        }
+        async with session.post(TOKEN_URL, data=payload) as response:
+            if response.status != 200:
+                raise TwitchAuthError(f"Twitch refused to deliver an access token (status {response.status}).")
+            json_data = await response.json()
+        self.access_token = json_data['access_token']
+        self.expires_at = time.monotonic() + json_data.get('expires_in', 3600)
+        logger.info(f"Twitch access token acquired, expires in {json_data.get('expires_in', 3600)}s.")
+
+
+twitch_auth = TwitchAuth(TWITCH_CLIENT_ID, TWITCH_CLIENT_SECRET)
+if not twitch_auth.configured:
+    logger.critical(
+        "Les variables d'environnement TWITCH_CLIENT_ID ou TWITCH_CLIENT_SECRET ne sont pas configurées correctement.")
+
+_session = None
+
+
+async def get_session():
+    """
+    Returns the HTTP session shared by the Twitch API calls, creating it on first use (it must be created from a
+    running event loop).
+    """
+    global _session
+    if _session is None or _session.closed:
+        _session = aiohttp.ClientSession(timeout=aiohttp.ClientTimeout(total=10))
+    return _session
+
+
+async def helix_get(endpoint, params):
+    """
+    Sends a GET request to the Twitch Helix API.
+
+    If Twitch answers 401 (the token expired or was revoked), the token is invalidated and the request is sent again
+    once with a new token.
+
+    Args:
+        endpoint (str): The Helix endpoint, e.g. 'streams' or 'users'.
+        params (dict or list): The query parameters. A list of `(key, value)` tuples allows repeated keys.
+
+    Returns:
+        dict: The JSON response.
+
+    Raises:
+        TwitchAuthError: If no access token can be obtained.
+        aiohttp.ClientError: If the request fails.
+    """
+    session = await get_session()
+    for attempt in range(2):
+        access_token = await twitch_auth.get_token(session)
+        headers = {
+            'Client-ID': twitch_auth.client_id,
+            'Authorization': 'Bearer ' + access_token,
+        }
+        metrics.counter("twitch_requests_total", endpoint=endpoint).inc()
+        async with session.get(f'{HELIX_API_URL}/{endpoint}', params=params, headers=headers) as response:
+            if response.status == 401 and attempt == 0:
+                logger.warning("Twitch access token rejected, requesting a new one...")
+                twitch_auth.invalidate(access_token)
+                continue
+            response.raise_for_status()
+            return await response.json()
+
+
+async def helix_get_many(endpoint, key, values, extra_params=None):
+    """
+    Sends as few GET requests to the Twitch Helix API as possible for a list of values of a multi-value parameter,
+    e.g. `helix_get_many('streams', 'user_login', logins)`: the values are split in batches of `HELIX_MAX_VALUES`, and
+    the batches are requested concurrently (at most `HELIX_MAX_CONCURRENCY` at a time).
+
+    Args:
+        endpoint (str): The Helix endpoint.
+        key (str): The name of the multi-value parameter.
+        values (list): The values of the parameter.
+        extra_params (list, optional): Additional query parameters, as `(key, value)` tuples.
+
+    Returns:
+        list: A list of `(batch, result)` tuples, where `batch` is the list of values sent in one request and `result`
+              is either its JSON response or the exception raised by the request, so that a failing batch doesn't
+              prevent the others from being processed.
+    """
+    semaphore = asyncio.Semaphore(HELIX_MAX_CONCURRENCY)
+    batches = [values[i:i + HELIX_MAX_VALUES] for i in range(0, len(values), HELIX_MAX_VALUES)]
+
+    async def get_batch(batch):
+        async with semaphore:
+            return await helix_get(endpoint, [(key, value) for value in batch] + (extra_params or []))
+
+    results = await asyncio.gather(*[get_batch(batch) for batch in batches], return_exceptions=True)
+    return list(zip(batches, results))
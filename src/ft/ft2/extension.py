@@ -0,0 +1,319 @@
+import json
+import os
+from datetime import datetime
+
+import discord
+from discord.ui import Select, View
+
+from src.ft.ft2.icals_to_json import register_user_ical
+from src.ft.ft2.planning import is_everyone_available, download_ical, ensure_temp_dir, TEMP_DIR, \
+    aggregate_weekly_events, read_user_icals
+from src.utilities.settings import Settings
+from src.utilities.store import open_event_store
+
+settings = Settings()
+store = open_event_store(settings)
+
+
+def load_user_icals(directory='user_icals'):
+    """
+    Loads user iCal data from JSON files within a specified directory.
+
+    This function scans a given directory for JSON files, each expected to contain iCal data for a user. It constructs
+    a dictionary mapping user IDs (extracted from the filenames) to the full path of their respective JSON file. If the
+    specified directory does not exist, it is created.
+
+    Args:
+        directory (str): The directory to scan for JSON files. Defaults to 'user_icals'.
+
+    Returns:
+        dict: A dictionary where keys are user IDs (str) and values are the paths (str) to their iCal JSON files.
+    """
+    users_icals = {}
+    if not os.path.exists(directory):
+        os.makedirs(directory)
+    for filename in os.listdir(directory):
+        if filename.endswith('.json'):
+            user_id = filename.split('.')[0]
+            users_icals[user_id] = os.path.join(directory, filename)
+    return users_icals
+
+
+user_icals = load_user_icals()
+
+
+async def planning(ctx):
+    """
+    Asynchronously plans and aggregates weekly events for all non-bot users in a Discord server.
+
+    Args:
+        ctx: The context from which this function is called. Provides access to Discord server information and
+             methods for responding to events.
+
+    Returns:
+        None. This function primarily interacts with the Discord API to send messages and does not return any value.
+    """
+    ensure_temp_dir()  # Ensure the temporary directory for storing files exists.
+    users = ctx.guild.members  # Retrieve all members from the guild (Discord server).
+    users = [user for user in users if not user.bot]  # Filter out bot users.
+
+    if not users:
+        await ctx.respond("No users found in the Discord server.")  # Respond if no non-bot users are found.
+        return
+
+    aggregated_events = aggregate_weekly_events(store=store)  # Aggregate weekly events for the users.
+
+    if not aggregated_events:
+        await ctx.respond("No events found for the current week.")  # Respond if no events are aggregated.
+        return
+
+    combined_json = json.dumps(aggregated_events,
+                               indent=4)  # Convert the aggregated events into a formatted JSON string.
+
+    # Write the JSON string to a file for storage or further processing.
+    if not os.path.exists("events_state"):
+        os.makedirs("events_state")
+    with open("events_state/aggregated_events.json", "w") as json_file:
+        json_file.write(combined_json)
+
+
+def display_best_days():
+    """
+    Identifies and returns the days when all users have common availability in all time slots.
+
+    This function aggregates weekly events for all users, iterates through each user's events,
+    and builds a dictionary mapping each day to the users available during morning, afternoon, and evening slots.
+    It then identifies days when there is at least one user available in each time slot and returns these days.
+
+    The function assumes the existence of a `aggregate_weekly_events` function that aggregates events for all users
+    and a `get_display_name_from_id` function that returns a user's display name given their user ID.
+
+    Returns:
+        list: A list of dates (as strings) where all users have common availability in all time slots.
+    """
+    weekly_events = aggregate_weekly_events(store=store)
+    # The IDs of the users who registered their iCal
+    all_users = list(read_user_icals(store=store))
+
+    time_slots = ["morning", "afternoon", "evening"]
+
+    common_availability = {}
+
+    # Iterate over all users to build the common availability dictionary
+    for user_id in all_users:
+        if user_id in weekly_events:
+            # Assuming you have a way to get the display name from the user_id
+            user_name = get_display_name_from_id(user_id)  # Placeholder function
+            for day, times in weekly_events[user_id].items():
+                if day not in common_availability:
+                    common_availability[day] = {slot: [] for slot in time_slots}
+                for time_slot in time_slots:
+                    if times.get(time_slot):
+                        common_availability[day][time_slot].append(user_name)
+
+    max_availability = {slot: 0 for slot in time_slots}
+    for slots in common_availability.values():
+        for time_slot, users in slots.items():
+            max_availability[time_slot] = max(max_availability[time_slot], len(users))
+    dates_with_stars = []
+    for day, slots in common_availability.items():
+        if all(len(slots[slot]) > 0 for slot in time_slots):
+            dates_with_stars.append(day)
+    return dates_with_stars
+
+
+def get_display_name_from_id(user_id):
+    """
+    Generates a display name for a user based on their user ID.
+
+    This function simply formats the user ID into a string that starts with "User_"
+    followed by the user ID. It's a straightforward way to generate a unique display name
+    for users based on their ID.
+
+    Args:
+        user_id: The unique identifier for the user.
+
+    Returns:
+        A string that represents the display name of the user.
+    """
+    return f"User_{user_id}"
+
+
+def setup(bot):
+    """
+    Registers the planning feature: the 'register_ical', 'availability' and 'display_common_availability' commands.
+    """
+    @bot.command(name="register_ical", description="Register your iCal file for availability checks")
+    async def register_ical(ctx, url: discord.Option(discord.SlashCommandOptionType.string)):
+        """
+        Registers a user's iCal file for availability checks by downloading it and associating it with their Discord ID.
+
+        This command is triggered by a Discord slash command. It first ensures that a temporary directory exists for storing
+        iCal files. Then, it downloads the iCal file from the provided URL to a temporary file. After downloading,
+        it registers
+        the user's iCal file by associating the temporary file path with the user's Discord ID and name in a global
+        dictionary.
+        Finally, it performs an initial planning operation (e.g., checking availability) and responds to the user indicating
+        successful registration.
+
+        Args:
+            ctx: The context of the command, which includes information about the channel, guild, and user who invoked.
+            url: A string representing the URL of the iCal file to be downloaded and registered.
+
+        Returns:
+            None. The function's primary side effects are downloading a file, updating a global dictionary, performing an
+            initial planning operation, and sending a response message to the Discord channel.
+        """
+        ensure_temp_dir()  # Ensure the temporary directory for iCal files exists.
+        temp_file_path = os.path.join(TEMP_DIR, 'temp.ics')  # Define the path for the temporary iCal file.
+        await download_ical(url, temp_file_path, ctx)  # Download the iCal file from the provided URL.
+        await register_user_ical(ctx.author.id, ctx.author.name, temp_file_path,
+                                 user_icals, store)  # Register the user's iCal file.
+        await planning(ctx)  # Perform an initial planning operation with the newly registered iCal file.
+        await ctx.respond(f":white_check_mark: Your iCal file has been registered successfully.")  # Respond to the user.
+
+
+    @bot.command(name="availability", description="Displays the availabilities of all persons in the Discord server")
+    async def availability(ctx):
+        """
+        A Discord bot command to display the availability of all members in the server.
+
+        This command retrieves all non-bot members from the guild (server) and presents a selection menu to the command invoker.
+        Upon selection of a user, it fetches the user's availability from a JSON file named after the user's ID and displays
+        it in the Discord channel.
+
+        Args:
+            ctx: The context under which the command is executed. Contains information and methods related to the command
+            invocation.
+
+        Returns:
+            None. This function operates by sending messages to a Discord channel.
+        """
+        # Retrieve all non-bot members from the guild
+        users = ctx.guild.members
+        users = [user for user in users if not user.bot]
+
+        # If no users are found, send a response and return
+        if not users:
+            await ctx.respond("No users found in the Discord server.")
+            return
+
+        # Create selection options for each user
+        options = [discord.SelectOption(label=member.display_name, value=str(member.id)) for member in users]
+
+        # Create a selection menu with the user options
+        select = Select(placeholder="Choose a user", options=options)
+
+        async def select_callback(interaction):
+            """
+            Callback function for when a user is selected from the dropdown.
+
+            Fetches the selected user's availability from a JSON file and sends it as an embed in the Discord channel.
+
+            Args:
+                interaction: The interaction object representing the user's selection.
+
+            Returns:
+                None. Sends messages to a Discord channel.
+            """
+            # Retrieve the selected user's ID from the selection
+            user_id = int(select.values[0])
+            file_path = f"user_icals/{user_id}.json"
+            user_data = None
+            if store:
+                ical_content = store.user_ical(user_id)
+                user_data = {"user_id": user_id, "ical_content": ical_content} if ical_content is not None else None
+
+            # Check if the file exists
+            if (store and user_data is None) or (not store and not os.path.exists(file_path)):
+                await interaction.response.send_message(
+                    f"No availability data found for {interaction.guild.get_member(user_id).display_name}.")
+                return
+
+            # Show typing indicator while processing
+            async with ctx.typing():
+                try:
+                    # Fetch and display the selected user's availability
+                    embeds = await is_everyone_available(ctx, file_path, user_data)
+                    for embed in embeds:
+                        await interaction.response.send_message(embed=embed)
+                except Exception as e:
+                    await interaction.response.send_message(f"An error occurred while retrieving the data: {str(e)}")
+
+        # Assign the callback to the selection
+        select.callback = select_callback
+        # Create a view and add the selection menu to it
+        view = View()
+        view.add_item(select)
+
+        # Send the selection menu to the Discord channel
+        await ctx.respond("Select a user to view their availability:", view=view)
+
+
+    @bot.command(name="display_common_availability",
+                 description="Displays common availability of all users for the current week")
+    async def display_common_availability(ctx):
+        """
+        Displays the common availability of all users in the Discord server for the current week.
+
+        This command aggregates the availability of all users for the current week and presents it in an embed message.
+        The availability is categorized into three time slots: morning, afternoon, and evening. For each day of the
+        current week, the command lists the users available during these time slots. Days when users are available
+        across all time slots are highlighted with a star symbol.
+
+        Args:
+            ctx: The context under which the command is executed. Contains information about the guild, channel, and user.
+
+        Returns:
+            An embed message sent to the channel from which the command was invoked. The message contains the common
+            availability of users for each day of the current week, categorized into morning, afternoon, and evening.
+        """
+        weekly_events = aggregate_weekly_events(store=store)
+        all_users = ctx.guild.members
+
+        time_slots = ["morning", "afternoon", "evening"]
+
+        common_availability = {}
+
+        for user in all_users:
+            user_id = str(user.id)
+            if user_id in weekly_events:
+                user_name = user.display_name
+                for day, times in weekly_events[user_id].items():
+                    if day not in common_availability:
+                        common_availability[day] = {slot: [] for slot in time_slots}
+                    for time_slot in time_slots:
+                        if times.get(time_slot) is True:
+                            common_availability[day][time_slot].append(user_name)
+
+        max_availability = {slot: 0 for slot in time_slots}
+        for slots in common_availability.values():
+            for time_slot, users in slots.items():
+                max_availability[time_slot] = max(max_availability[time_slot], len(users))
+
+        embed = discord.Embed(title="Common Availability for All Users", color=discord.Color.green())
+
+        dates_with_stars = []
+
+        for day, slots in common_availability.items():
+
+            date_obj = datetime.strptime(day, '%Y-%m-%d')
+            french_day = date_obj.strftime('%A %d %B')
+            french_day = french_day.capitalize()
+
+            morning_users = ", ".join(slots["morning"])
+            afternoon_users = ", ".join(slots["afternoon"])
+            evening_users = ", ".join(slots["evening"])
+
+            day_star = ""
+            if all(len(slots[slot]) > 0 for slot in time_slots):
+                day_star = "⭐"
+                dates_with_stars.append(day)
+
+            availability_str = (
+                f"```\nMorning : {morning_users}\n"
+                f"Afternoon : {afternoon_users}\n"
+                f"Evening : {evening_users}\n```"
+            )
+            embed.add_field(name=f"{french_day} {day_star}", value=availability_str, inline=False)
+        await ctx.respond(embed=embed)
@@ -191,7 +191,7 @@ async def update_embed_with_week(message, ical_content, week_offset, person):
     embed = create_embed_for_week(person, week_availability)
     await message.edit(embed=embed)
 
-async def is_everyone_available(ctx, json_file_path: str):
+async def is_everyone_available(ctx, json_file_path: str, user_data: dict = None):
     """
     Asynchronously checks and displays the availability of all users for the current week in a Discord channel.
 
@@ -206,12 +206,14 @@ async def is_everyone_available(ctx, json_file_path: str):
     Args:
         ctx: The context in which this function is called, used here to potentially send messages back to a Discord channel.
         json_file_path (str): The file system path to the JSON file containing user data (user IDs and iCal content).
+        user_data (dict, optional): The user data, when it is read from the event store instead of a JSON file.
 
     Returns:
         list: A list of discord.Embed objects, each representing the availability of a user for the current week.
     """
-    with open(json_file_path, 'r') as json_file:
-        user_data = json.load(json_file)
+    if user_data is None:
+        with open(json_file_path, 'r') as json_file:
+            user_data = json.load(json_file)
 
     user_id = user_data["user_id"]
     ical_content = user_data["ical_content"]
@@ -224,4 +226,74 @@ async def is_everyone_available(ctx, json_file_path: str):
     embed = create_embed_for_week(user_id, week_availability)
     embeds.append(embed)
 
-    return embeds
\ No newline at end of file
+    return embeds
+
+
+def read_user_icals(directory='user_icals', store=None):
+    """
+    Reads the iCal content of every registered user, from the event store if given, otherwise from the JSON files of
+    a directory.
+
+    Returns:
+        dict: A dictionary mapping user IDs (str) to their iCal content (str).
+    """
+    if store:
+        return store.user_icals()
+    user_icals = {}
+    for filename in os.listdir(directory):
+        if filename.endswith('.json'):
+            with open(os.path.join(directory, filename), 'r') as json_file:
+                user_data = json.load(json_file)
+                user_icals[str(user_data["user_id"])] = user_data.get("ical_content", "")
+    return user_icals
+
+
+def aggregate_weekly_events(directory='user_icals', store=None):
+    """
+    Aggregates weekly events for all users from JSON files within a specified directory.
+
+    This function scans a directory for JSON files, each representing a user's event data. For each file,
+    it extracts the user's ID and iCal content, then parses the iCal content to determine the user's availability
+    for the current week. The availability data is aggregated into a dictionary, keyed by user ID, with each value
+    being another dictionary mapping ISO-formatted dates to availability information.
+
+    Args:
+        directory (str): The directory to scan for user JSON files. Defaults to 'user_icals'.
+        store (EventStore, optional): The event store to read the iCals from instead of the directory.
+
+    Returns:
+        dict: A dictionary where each key is a user ID (str) and each value is a dictionary. The value dictionary
+              maps ISO-formatted dates (str) to availability information (dict), which indicates the user's
+              availability for morning, afternoon, and evening of each day in the current week.
+    """
+    aggregated_events = {}
+    current_week_start = get_current_week_start()
+
+    for user_id, ical_content in read_user_icals(directory, store).items():
+        if ical_content:
+            events = parse_ical_content(ical_content)
+            if events is None:
+                continue
+            week_events = check_availability(events, current_week_start)
+
+            week_events_str_keys = {day.isoformat(): availability for day, availability in week_events.items()}
+
+            aggregated_events[user_id] = week_events_str_keys
+
+    return aggregated_events
+
+
+def get_current_week_start():
+    """
+    Calculate the start date of the current week based on the Europe/Paris timezone.
+
+    This function determines the current date and time in the 'Europe/Paris' timezone,
+    then calculates the start of the week (Monday) by subtracting the current weekday
+    number from the current date. The weekday function returns 0 for Monday through 6 for Sunday,
+    aligning with the ISO standard for the first day of the week.
+
+    Returns:
+        datetime.date: The date representing the start (Monday) of the current week.
+    """
+    return datetime.now(pytz.timezone('Europe/Paris')).date() - timedelta(
+        days=datetime.now(pytz.timezone('Europe/Paris')).weekday())
@@ -0,0 +1,102 @@
+from datetime import date, timedelta
+
+import discord
+from discord import Option
+
+from src.ft.ft3.history import GRANULARITIES
+from src.ft.ft3.profanities import handle_profanities
+from src.ft.ft3.warnings import open_warnings
+from src.utilities.pipeline import BLOCK, pipeline
+from src.utilities.settings import Settings
+
+settings = Settings()
+warnings = open_warnings(settings)
+
+
+def setup(bot):
+    """
+    Registers the profanities and warnings feature: the "profanities" stage of the message pipeline and the 'warnings'
+    and 'warnings_history' commands. Unless `settings.json` says otherwise, the stage blocks when its queue is full
+    rather than dropping messages, so that the moderation is never skipped under load.
+    """
+    pipeline.add_stage("profanities", handle_profanities, overflow_policy=BLOCK)
+
+    @bot.command(name="warnings", description="Displays the warnings for a user or all users")
+    async def display_warnings(ctx, user: discord.User = None):
+        """
+        This function is a command handler for the 'warnings' command.
+
+        Args: ctx (discord.Context): The context in which the command was called. user (discord.User, optional): The user
+        for whom to display warnings. If not provided, warnings for all users are displayed.
+
+        The function first checks if a user was provided. If a user was provided, it retrieves the warnings for that user
+        and sends a response with the number of warnings. If no user provided, it retrieves the warnings for all
+        users. If there are any warnings, it creates a description string with the warnings for each user and sends a
+        response with an embed message containing the warnings. If there are no warnings, it sends a response indicating
+        that no warnings were found.
+
+        This function doesn't return anything.
+        """
+        if user:
+            await ctx.respond(f"{user.mention} has {warnings.get_user_warnings(user.id)} warning(s).")
+        else:
+            all_warnings = warnings.get_all_warnings()
+            if all_warnings:
+                description = "\n".join([f"**{i + 1}**. {ctx.guild.get_member(int(user_id)).mention} - {count} warning(s)"
+                                         for i, (user_id, count) in enumerate(all_warnings.items())])
+            else:
+                description = "No warnings found."
+            embed = discord.Embed(title=f":warning: Warnings Summary of {ctx.guild.name}",
+                                  color=discord.Color.red(),
+                                  description=description)
+            embed.set_footer(text="MEE7 Warning System",
+                             icon_url=settings.get('icon_url'))
+            await ctx.respond(embed=embed)
+
+    @bot.command(name="warnings_history", description="Displays the warnings per day, week or month over a date range")
+    async def display_warnings_history(ctx,
+                                       granularity: Option(str, "Group the warnings by", choices=list(GRANULARITIES),
+                                                           default="day"),
+                                       start: Option(str, "First day (YYYY-MM-DD), 30 days ago by default",
+                                                     required=False),
+                                       end: Option(str, "Last day (YYYY-MM-DD), today by default", required=False),
+                                       user: discord.User = None):
+        """
+        This function is a command handler for the 'warnings_history' command.
+
+        Args: ctx (discord.Context): The context in which the command was called. granularity (str): "day", "week" or
+        "month". start (str, optional): The first day of the range. end (str, optional): The last day of the range.
+        user (discord.User, optional): The user whose warnings are displayed. If not provided, the warnings of all users
+        are displayed.
+
+        The history is read from the rollups maintained as the warnings are added, so the daily files aren't opened.
+        For each period, the number of warnings of the user, or the total and the most warned user, is displayed in an
+        embed message. Only the 25 most recent periods are displayed.
+
+        This function doesn't return anything.
+        """
+        try:
+            end_day = date.fromisoformat(end) if end else date.today()
+            start_day = date.fromisoformat(start) if start else end_day - timedelta(days=30)
+        except ValueError:
+            await ctx.respond("Dates must be formatted as YYYY-MM-DD.", ephemeral=True)
+            return
+        if start_day > end_day:
+            await ctx.respond("The first day must be before the last day.", ephemeral=True)
+            return
+
+        history = warnings.get_history(start_day, end_day, granularity, user.id if user else None)
+        lines = []
+        for period, counts in list(history.items())[-25:]:
+            if user:
+                lines.append(f"**{period}** - {sum(counts.values())} warning(s)")
+            else:
+                top_user, top_count = max(counts.items(), key=lambda item: item[1])
+                lines.append(f"**{period}** - {sum(counts.values())} warning(s), most by <@{top_user}> ({top_count})")
+        embed = discord.Embed(title=f":warning: Warnings per {granularity} from {start_day} to {end_day}"
+                                    + (f" of {user.display_name}" if user else ""),
+                              color=discord.Color.red(),
+                              description="\n".join(lines) or "No warnings found.")
+        embed.set_footer(text="MEE7 Warning System",
+                         icon_url=settings.get('icon_url'))
+        await ctx.respond(embed=embed)
@@ -0,0 +1,132 @@
+import glob
+import json
+import os
+from datetime import date, timedelta
+
+from src.utilities.store import iso_day
+
+GRANULARITIES = ("day", "week", "month")
+
+
+def period_of(day, granularity):
+    """
+    Returns the key of the period containing a day: the ISO day itself, the ISO day of the Monday of its week, or the
+    month formatted as YYYY-MM.
+
+    Args:
+        day (date): The day.
+        granularity (str): "day", "week" or "month".
+    """
+    if granularity == "day":
+        return day.isoformat()
+    if granularity == "week":
+        return (day - timedelta(days=day.weekday())).isoformat()
+    return day.strftime("%Y-%m")
+
+
+def periods(start, end, granularity):
+    """
+    Returns the keys of the periods overlapping the range of days from `start` to `end` (both included), oldest first.
+    """
+    keys = []
+    day = start
+    while day <= end:
+        keys.append(period_of(day, granularity))
+        if granularity == "day":
+            day += timedelta(days=1)
+        elif granularity == "week":
+            day += timedelta(days=7 - day.weekday())
+        else:
+            day = (day.replace(day=1) + timedelta(days=32)).replace(day=1)
+    return keys
+
+
+def period_bounds(start, end, granularity):
+    """
+    Returns the first day of the period containing `start` and the last day of the period containing `end`.
+    """
+    if granularity == "week":
+        return start - timedelta(days=start.weekday()), end + timedelta(days=6 - end.weekday())
+    if granularity == "month":
+        return start.replace(day=1), (end.replace(day=1) + timedelta(days=32)).replace(day=1) - timedelta(days=1)
+    return start, end
+
+
+class WarningHistory:
+    def __init__(self, file_path="src/ft/ft3/warnings_history.json"):
+        """
+        The number of warnings of each user per day, week and month, rolled up as the warnings are added.
+
+        A range query reads one rollup per period of the range, instead of opening the daily `warnings_MMDDYYYY.json`
+        files, so it stays fast whatever the length of the history. The existing daily files are ingested once, when
+        the history file doesn't exist yet.
+
+        Args:
+            file_path (str): The JSON file where the rollups are persisted.
+        """
+        self.file_path = file_path
+        self.rollups = {granularity: {} for granularity in GRANULARITIES}  # granularity -> period -> user -> count
+        self.load()
+
+    def load(self):
+        try:
+            with open(self.file_path, "r") as f:
+                self.rollups = json.load(f)
+        except FileNotFoundError:
+            self.ingest_daily_files()
+
+    def to_dict(self):
+        return {granularity: {period: dict(counts) for period, counts in rollup.items()}
+                for granularity, rollup in self.rollups.items()}
+
+    def ingest_daily_files(self, pattern="src/ft/ft3/warnings_[0-9]*.json"):
+        """
+        Adds the warnings of the daily files to the rollups.
+
+        Returns:
+            int: The number of ingested files.
+        """
+        paths = glob.glob(pattern)
+        for path in paths:
+            day = date.fromisoformat(iso_day(os.path.basename(path)[len("warnings_"):-len(".json")]))
+            with open(path, "r") as f:
+                for user_id, count in json.load(f).items():
+                    self.add(user_id, day, count)
+        return len(paths)
+
+    def add(self, user_id, day, count=1):
+        for granularity in GRANULARITIES:
+            counts = self.rollups[granularity].setdefault(period_of(day, granularity), {})
+            counts[user_id] = counts.get(user_id, 0) + count
+
+    def remove_user(self, user_id):
+        for rollup in self.rollups.values():
+            for period in list(rollup):
+                if rollup[period].pop(user_id, None) is not None and not rollup[period]:
+                    del rollup[period]
+
+    def query(self, start, end, granularity="day", user_id=None):
+        """
+        Returns the warnings per period between two days, of a user or of everyone.
+
+        The first and last periods are counted whole: a weekly query starting on a Wednesday includes the warnings of
+        the Monday and Tuesday before.
+
+        Args:
+            start (date): The first day of the range.
+            end (date): The last day of the range.
+            granularity (str): "day", "week" or "month".
+            user_id (str): The ID of the user, or None for everyone.
+
+        Returns:
+            dict: period -> {user ID: count}, oldest period first, without the periods with no warnings.
+        """
+        rollup = self.rollups[granularity]
+        history = {}
+        for period in periods(start, end, granularity):
+            counts = rollup.get(period)
+            if counts and user_id is not None:
+                counts = {user_id: counts[user_id]} if user_id in counts else None
+            if counts:
+                history[period] = dict(counts)
+        return history
@@ -0,0 +1,74 @@
+from bisect import bisect_left, insort
+
+
+class Leaderboard:
+    def __init__(self, counts=None):
+        """
+        Counts per user, kept ordered as they change, so that the top users are read without sorting all of them.
+
+        The users are grouped in buckets by count, and the distinct counts are kept sorted. Incrementing a user moves it
+        to the next bucket, so `increment`, `remove` and `count` are O(1) (plus a bisection in the distinct counts,
+        which are few), and `top(k)` only visits the k first users. Within a count, the users are ordered by the time
+        they reached it.
+
+        Args:
+            counts (dict): The initial count of each user.
+        """
+        self.counts = {}  # user -> count
+        self.buckets = {}  # count -> {user: None}, in the order the users reached the count
+        self.distinct_counts = []  # Sorted, ascending
+        for user, count in (counts or {}).items():
+            self.set(user, count)
+
+    def __len__(self):
+        return len(self.counts)
+
+    def _bucket_remove(self, user, count):
+        bucket = self.buckets[count]
+        del bucket[user]
+        if not bucket:
+            del self.buckets[count]
+            del self.distinct_counts[bisect_left(self.distinct_counts, count)]
+
+    def _bucket_add(self, user, count):
+        bucket = self.buckets.get(count)
+        if bucket is None:
+            bucket = self.buckets[count] = {}
+            insort(self.distinct_counts, count)
+        bucket[user] = None
+
+    def count(self, user):
+        return self.counts.get(user, 0)
+
+    def set(self, user, count):
+        self.remove(user)
+        if count > 0:
+            self.counts[user] = count
+            self._bucket_add(user, count)
+
+    def increment(self, user, amount=1):
+        count = self.counts.get(user, 0)
+        if count:
+            self._bucket_remove(user, count)
+        self.counts[user] = count + amount
+        self._bucket_add(user, count + amount)
+
+    def remove(self, user):
+        count = self.counts.pop(user, None)
+        if count is not None:
+            self._bucket_remove(user, count)
+
+    def top(self, k=10):
+        """
+        Returns the k users with the highest counts, as a dict of user -> count, highest first.
+        """
+        top = {}
+        for count in reversed(self.distinct_counts):
+            for user in self.buckets[count]:
+                if len(top) == k:
+                    return top
+                top[user] = count
+        return top
+
+    def to_dict(self):
+        return dict(self.counts)
@@ -0,0 +1,134 @@
+import os
+import re
+import unicodedata
+
+# Characters commonly used in place of letters, and whitespaces. '!' isn't mapped, since it usually ends a word rather
+# than replacing an 'i'.
+LEET = bytes.maketrans(b"@43105$7\t\n\r", b"aaeiosst   ")
+# Runs of 3 or more identical characters, written for emphasis ("puuuutain"); a real word rarely has any.
+RUN = re.compile(rb"(.)\1{2,}")
+
+
+def fold(text):
+    """
+    Lowercases a text and removes its accents. The text is encoded in ASCII, the characters without an ASCII
+    equivalent (emojis, other scripts) are dropped: the regex engine and `bytes.translate` are much faster on bytes.
+    """
+    text = text.lower()
+    if text.isascii():
+        return text.encode("ascii")
+    return unicodedata.normalize("NFKD", text).encode("ascii", "ignore")
+
+
+def normalize(text):
+    """
+    Folds a text and replaces the leetspeak characters by the letters they stand for. The normalized text has the
+    length of the folded text, character for character.
+    """
+    return fold(text).translate(LEET)
+
+
+def squeezed(normalized, folded):
+    """
+    Returns the variants of a normalized text to match, each with the folded text aligned on it, character for
+    character. A text without runs of 3 or more identical characters is matched as is. Otherwise, the runs are
+    shortened to 1 character ("puuuutain") and to 2 characters ("connnnard"): the words keep their letters literal, so
+    "good" never matches "god" and "assess" never matches "asses".
+    """
+    if RUN.search(normalized) is None:
+        return [(normalized, folded)]
+    variants = []
+    for keep in (1, 2):
+        normalized_parts, folded_parts, position = [], [], 0
+        for run in RUN.finditer(normalized):
+            normalized_parts.append(normalized[position:run.start() + keep])
+            folded_parts.append(folded[position:run.start() + keep])
+            position = run.end()
+        normalized_parts.append(normalized[position:])
+        folded_parts.append(folded[position:])
+        variants.append((b"".join(normalized_parts), b"".join(folded_parts)))
+    return variants
+
+
+def _trie_pattern(node):
+    # Converts a trie (dict of escaped byte -> child, with b"" marking the end of a word) into an equivalent regex,
+    # sharing the prefixes of the words, so that the regex engine doesn't try every word at every position.
+    branches = [char + _trie_pattern(child) for char, child in sorted(node.items()) if char]
+    if not branches:
+        return b""
+    pattern = branches[0] if len(branches) == 1 else b"(?:" + b"|".join(branches) + b")"
+    return b"(?:" + pattern + b")?" if b"" in node else pattern
+
+
+class ProfanityMatcher:
+    def __init__(self, words=()):
+        """
+        Detects the profanities of a text with a single precompiled regex.
+
+        The words are normalized (see `normalize`) and merged into a trie, compiled into one regex matching whole
+        words only, so a message is scanned once by the regex engine whatever the number of words. The messages are
+        normalized the same way, so accents ("enculé") and leetspeak ("m3rde") don't hide a profanity, and the runs of
+        repeated letters of the messages ("puuuutain") are shortened (see `squeezed`). A match made of digits only
+        ("455") isn't a profanity.
+
+        Args:
+            words (iterable): The profanities, in any language.
+        """
+        self.words = set()
+        self.regex = None
+        self.add_words(words)
+
+    @classmethod
+    def from_wordlists(cls, paths):
+        """
+        Creates a matcher from wordlist files, one word or phrase per line. The path "better_profanity" stands for the
+        English wordlist of the better_profanity package.
+        """
+        words = []
+        for path in paths:
+            if path == "better_profanity":
+                import better_profanity
+                path = os.path.join(os.path.dirname(better_profanity.__file__), "profanity_wordlist.txt")
+            with open(path, "r", encoding="utf-8") as f:
+                words.extend(line.strip() for line in f if line.strip())
+        return cls(words)
+
+    def add_words(self, words):
+        self.words.update(normalize(word) for word in words)
+        self.words.discard(b"")
+        trie = {}
+        for word in self.words:
+            node = trie
+            for byte in word:
+                node = node.setdefault(re.escape(bytes([byte])), {})
+            node[b""] = True
+        self.regex = re.compile(rb"(?<!\w)(?:" + _trie_pattern(trie) + rb")(?!\w)") if self.words else None
+
+    def find(self, text):
+        """
+        Returns the normalized profanities found in a text.
+        """
+        if self.regex is None:
+            return []
+        folded = fold(text)
+        found = []
+        for normalized, aligned in squeezed(folded.translate(LEET), folded):
+            for match in self.regex.finditer(normalized):
+                word = match.group().decode()
+                if not aligned[match.start():match.end()].isdigit() and word not in found:
+                    found.append(word)
+        return found
+
+    def contains_profanity(self, text, folded=None):
+        """
+        Returns whether a text contains a profanity. `folded` is the text already folded (see `fold`), if it is.
+        """
+        if self.regex is None:
+            return False
+        if folded is None:
+            folded = fold(text)
+        for normalized, aligned in squeezed(folded.translate(LEET), folded):
+            for match in self.regex.finditer(normalized):
+                if not aligned[match.start():match.end()].isdigit():
+                    return True
+        return False
@@ -0,0 +1,80 @@
+import asyncio
+
+import discord
+from loguru import logger
+
+from src.utilities.metrics import metrics
+
+BULK_DELETE_LIMIT = 100  # Maximum number of messages per `channel.delete_messages` call
+
+
+class ModerationQueue:
+    def __init__(self, window=1.0, notice_delete_after=10):
+        """
+        Collects the moderation actions of each channel during a short window and performs them together.
+
+        The first offending message of a channel opens a window of `window` seconds. When it closes, the messages
+        collected during the window are deleted with bulk deletes (up to 100 messages per call) and their authors are
+        warned with a single notice, instead of one deletion and one notice per message. During a raid, this saves most
+        of the Discord rate-limit budget. The number of API calls made and saved is counted in the metrics.
+
+        Args:
+            window (float): The number of seconds the actions of a channel are collected before being performed.
+            notice_delete_after (float): The number of seconds after which the warning notice is deleted.
+        """
+        self.window = window
+        self.notice_delete_after = notice_delete_after
+        self.pending = {}  # channel ID -> (channel, [messages])
+        self.tasks = {}  # channel ID -> flush task
+        self.api_calls = metrics.counter("moderation_api_calls_total")
+        self.api_calls_saved = metrics.counter("moderation_api_calls_saved_total")
+
+    def delete_and_warn(self, message):
+        """
+        Queues the deletion of a message and a warning notice to its author.
+        """
+        channel = message.channel
+        self.pending.setdefault(channel.id, (channel, []))[1].append(message)
+        if channel.id not in self.tasks:
+            self.tasks[channel.id] = asyncio.create_task(self._flush_later(channel.id))
+
+    async def _flush_later(self, channel_id):
+        await asyncio.sleep(self.window)
+        await self.flush(channel_id)
+
+    async def flush(self, channel_id):
+        """
+        Deletes the queued messages of a channel and sends the coalesced warning notice.
+        """
+        self.tasks.pop(channel_id, None)
+        channel, messages = self.pending.pop(channel_id, (None, []))
+        if not messages:
+            return
+        calls = 0
+        for start in range(0, len(messages), BULK_DELETE_LIMIT):
+            batch = messages[start:start + BULK_DELETE_LIMIT]
+            try:
+                if len(batch) == 1:
+                    await batch[0].delete()
+                else:
+                    await channel.delete_messages(batch)
+            except discord.HTTPException as e:
+                logger.warning(f"Couldn't delete {len(batch)} message(s) in #{channel}: {e}")
+            calls += 1
+
+        counts = {}  # author mention -> number of deleted messages, in the order of their first message
+        for message in messages:
+            counts[message.author.mention] = counts.get(message.author.mention, 0) + 1
+        mentions = ", ".join(f"**{mention}**" + (f" ({count} messages)" if count > 1 else "")
+                             for mention, count in counts.items())
+        try:
+            await channel.send(
+                f":warning: {mentions}, your {'messages have' if len(messages) > 1 else 'message has'} been deleted "
+                f"for __containing profanity__. \n_Please keep the chat clean._",
+                delete_after=self.notice_delete_after)
+        except discord.HTTPException as e:
+            logger.warning(f"Couldn't send the warning notice in #{channel}: {e}")
+        calls += 1
+
+        self.api_calls.inc(calls)
+        self.api_calls_saved.inc(2 * len(messages) - calls)  # One deletion and one notice per message otherwise
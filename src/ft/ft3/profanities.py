@@ -1,8 +1,15 @@
-from better_profanity import profanity
+from src.ft.ft3.matcher import ProfanityMatcher, fold
+from src.ft.ft3.moderation import ModerationQueue
+from src.ft.ft3.warnings import open_warnings
+from src.utilities.analysis import analysis_of
+from src.utilities.settings import Settings
 
-from src.ft.ft3.warnings import Warnings
-
-warnings = Warnings()
+settings = Settings()
+warnings = open_warnings(settings)
+profanities_settings = settings.get('profanities') or {}
+profanity = ProfanityMatcher.from_wordlists(profanities_settings.get(
+    'wordlists', ["better_profanity", "src/ft/ft3/wordlists/fr.txt"]))
+moderation = ModerationQueue(window=profanities_settings.get('moderation_window_seconds', 1.0))
 
 
 async def handle_profanities(message):
@@ -12,16 +19,16 @@ async def handle_profanities(message):
     Args:
         message (discord.Message): The message that was sent in the channel.
 
-    The function first checks if the message content contains any profanity using the `better_profanity` library. If
-    the message contains profanity, it is deleted and a warning message is sent to the channel, mentioning the author
-    of the message. The warning message is then deleted after a delay of 10 seconds.
+    The function first checks if the message content contains any profanity of the wordlists configured in
+    `settings.json`, with a precompiled matcher, on the folded content memoized in the analysis of the message. If the
+    message contains profanity, its author is warned and the message is queued for deletion: the messages of a channel
+    queued within `moderation_window_seconds` are bulk deleted, and a single warning message mentioning their authors
+    is sent to the channel. The warning message is then deleted after a delay of 10 seconds.
 
     This function doesn't return anything.
     """
-    if profanity.contains_profanity(message.content):  # Check if the message contains profanity.
-        await message.delete()  # Delete the message.
+    analysis = analysis_of(message)
+    folded = analysis.memo("folded", lambda: fold(message.content))
+    if profanity.contains_profanity(message.content, folded):  # Check if the message contains profanity.
         warnings.add_warning(message.author.id)
-        await message.channel.send(
-            f":warning: **{message.author.mention}**, your message has been deleted for __containing profanity__. "
-            f"\n_Please keep the chat clean._",
-            delete_after=10)  # Send a warning message to the channel.
+        moderation.delete_and_warn(message)  # Delete the message and warn its author, together with the other ones.
@@ -1,76 +1,226 @@
+import atexit
 import json
 import os
+import threading
+from datetime import date
 
+from loguru import logger
+
+from src.ft.ft3.history import WarningHistory, period_bounds
+from src.ft.ft3.leaderboard import Leaderboard
+from src.utilities.store import iso_day, open_event_store
 from src.utilities.utilities import get_current_date_formatted
 
 
 class Warnings:
-    def __init__(self):
+    def __init__(self, store=None, flush_seconds=5, flush_changes=50):
+        """
+        The number of warnings of each user, of all time and of the current day.
+
+        Without an event store, the warnings are kept in memory and written behind to `warnings.json` and to the daily
+        `warnings_MMDDYYYY.json` by a background thread, so that a raid of profanities doesn't rewrite both files on
+        the event loop for every warning. The writes are coalesced: the files are written `flush_seconds` seconds
+        after the first unsaved change, or as soon as `flush_changes` changes are unsaved, and once more on exit.
+        Each file is replaced atomically, so a crash never leaves a truncated file. The counts are kept in leaderboards
+        updated on every change, so that the top users are read without sorting all of them, and rolled up per day,
+        week and month in `warnings_history.json` for the history queries.
+
+        Args:
+            store (EventStore): The event store counting the warnings in its `warnings` table instead of the JSON
+                                files, or None.
+            flush_seconds (float): The maximum number of seconds a warning stays in memory only.
+            flush_changes (int): The number of unsaved changes triggering a write before `flush_seconds`.
+        """
+        self.store = store
+        self.flush_seconds = flush_seconds
+        self.flush_changes = flush_changes
         self.warnings_file = "src/ft/ft3/warnings.json"
-        self.daily_warnings_file = f"src/ft/ft3/warnings_{get_current_date_formatted()}.json"
-        self.warnings = {}
-        self.daily_warnings = {}
-        self.load_warnings()
-        self.load_daily_warnings()
+        self.day = get_current_date_formatted()
+        self.warnings = Leaderboard()
+        self.daily_warnings = Leaderboard()
+        self.history = None
+        self.closed_days = {}  # Daily file -> warnings of a past day not written yet
+        self.changes = 0  # Number of changes since the last write
+        self.lock = threading.Lock()
+        self.io_lock = threading.Lock()  # Serializes the writes of the files
+        self.changed = threading.Condition(self.lock)
+        self.writer = None
+        self.closing = False
+        if not self.store:
+            self.load_warnings()
+            self.load_daily_warnings()
+            self.history = WarningHistory()
+            atexit.register(self.close)
+
+    @property
+    def daily_warnings_file(self):
+        return f"src/ft/ft3/warnings_{self.day}.json"
 
     def load_warnings(self):
         try:
             with open(self.warnings_file, "r") as f:
-                self.warnings = json.load(f)
+                self.warnings = Leaderboard(json.load(f))
         except FileNotFoundError:
-            self.warnings = {}
+            self.warnings = Leaderboard()
             self.save_warnings()
 
     def load_daily_warnings(self):
         try:
             with open(self.daily_warnings_file, "r") as f:
-                self.daily_warnings = json.load(f)
+                self.daily_warnings = Leaderboard(json.load(f))
         except FileNotFoundError:
-            self.daily_warnings = {}
+            self.daily_warnings = Leaderboard()
             self.save_warnings()
 
+    @staticmethod
+    def _write(file_path, warnings):
+        with open(f"{file_path}.tmp", "w") as f:
+            json.dump(warnings, f, indent=4)
+        os.replace(f"{file_path}.tmp", file_path)
+
     def save_warnings(self):
-        with open(self.warnings_file, "w") as f:
-            json.dump(self.warnings, f, indent=4)
-        with open(self.daily_warnings_file, "w") as f:
-            json.dump(self.daily_warnings, f, indent=4)
+        """
+        Writes the warnings now, from the calling thread.
+        """
+        with self.io_lock:
+            with self.lock:
+                files = {**self.closed_days, self.warnings_file: self.warnings.to_dict(),
+                         self.daily_warnings_file: self.daily_warnings.to_dict()}
+                if self.history:
+                    files[self.history.file_path] = self.history.to_dict()
+                self.closed_days = {}
+                self.changes = 0
+            for file_path, warnings in files.items():
+                self._write(file_path, warnings)
+
+    def _writer(self):
+        while True:
+            with self.changed:
+                while not self.changes and not self.closing:
+                    self.changed.wait()
+                if self.closing:
+                    return
+                # Coalesce the changes made during `flush_seconds`, unless there are already enough of them.
+                self.changed.wait_for(lambda: self.changes >= self.flush_changes or self.closing, self.flush_seconds)
+            try:
+                self.save_warnings()
+            except OSError as e:
+                logger.error(f"Couldn't write the warnings: {e}")
+
+    def _changed(self):
+        # Called with the lock held.
+        self.changes += 1
+        if self.writer is None:
+            self.writer = threading.Thread(target=self._writer, name="warnings-writer", daemon=True)
+            self.writer.start()
+        self.changed.notify()
+
+    def _roll_day(self):
+        # Called with the lock held. Starts the warnings of a new day, the previous day is written by the next flush.
+        day = get_current_date_formatted()
+        if day != self.day:
+            self.closed_days[self.daily_warnings_file] = self.daily_warnings.to_dict()
+            self.day = day
+            self.daily_warnings = Leaderboard()
+
+    def flush(self):
+        """
+        Writes the unsaved warnings, if any.
+        """
+        if self.changes or self.closed_days:
+            self.save_warnings()
+
+    def close(self):
+        """
+        Stops the background writer and writes the unsaved warnings. Registered to run on exit.
+        """
+        if self.writer is None:
+            return
+        with self.changed:
+            self.closing = True
+            self.changed.notify()
+        self.writer.join()
+        self.writer = None
+        self.closing = False
+        self.flush()
 
     def add_warning(self, user_id):
+        if self.store:
+            self.store.add_warning(user_id, iso_day(get_current_date_formatted()))
+            return
         user_id = str(user_id)
-        # Update global warnings
-        if user_id in self.warnings:
-            self.warnings[user_id] += 1
-        else:
-            self.warnings[user_id] = 1
-        # Update daily warnings
-        if user_id in self.daily_warnings:
-            self.daily_warnings[user_id] += 1
-        else:
-            self.daily_warnings[user_id] = 1
-        # Save both global and daily warnings
-        self.save_warnings()
+        with self.lock:
+            self._roll_day()
+            # Update global warnings
+            self.warnings.increment(user_id)
+            # Update daily warnings
+            self.daily_warnings.increment(user_id)
+            self.history.add(user_id, date.fromisoformat(iso_day(self.day)))
+            self._changed()
 
     def get_user_warnings(self, user_id):
-        # Optionally, you might want to combine global and daily warnings here
-        self.load_warnings()
-        return self.warnings.get(str(user_id), 0)
+        if self.store:
+            return self.store.user_warnings(user_id)
+        return self.warnings.count(str(user_id))
 
     def get_all_warnings(self, limit=10):
-        # Optionally, adjust to combine or separately handle daily warnings
-        self.load_warnings()
-        return {k: v for k, v in sorted(self.warnings.items(), key=lambda item: item[1], reverse=True)[:limit]}
+        if self.store:
+            return self.store.top_warnings(limit)
+        with self.lock:
+            return self.warnings.top(limit)
 
     def get_all_daily_warnings(self, limit=10):
-        # Optionally, adjust to combine or separately handle daily warnings
-        self.load_daily_warnings()
-        return {k: v for k, v in sorted(self.daily_warnings.items(), key=lambda item: item[1], reverse=True)[:limit]}
+        if self.store:
+            return self.store.top_warnings(limit, day=iso_day(get_current_date_formatted()))
+        with self.lock:
+            self._roll_day()
+            return self.daily_warnings.top(limit)
+
+    def get_history(self, start, end, granularity="day", user_id=None):
+        """
+        Returns the warnings per day, week or month between two days, of a user or of everyone.
+
+        Args:
+            start (date): The first day of the range.
+            end (date): The last day of the range.
+            granularity (str): "day", "week" (keyed by its Monday) or "month" (keyed YYYY-MM).
+            user_id (int): The ID of the user, or None for everyone.
+
+        Returns:
+            dict: period -> {user ID: count}, oldest period first, without the periods with no warnings.
+        """
+        if self.store:
+            start, end = period_bounds(start, end, granularity)
+            return self.store.warning_history(start.isoformat(), end.isoformat(), granularity, user_id)
+        user_id = str(user_id) if user_id is not None else None
+        with self.lock:
+            return self.history.query(start, end, granularity, user_id)
 
     def clear_warnings(self, user_id):
+        if self.store:
+            self.store.clear_warnings(user_id)
+            return
         user_id = str(user_id)
-        # Clear from both global and daily warnings if present
-        if user_id in self.warnings:
-            del self.warnings[user_id]
-        if user_id in self.daily_warnings:
-            del self.daily_warnings[user_id]
-        # Save changes
-        self.save_warnings()
+        with self.lock:
+            # Clear from both global and daily warnings if present
+            self.warnings.remove(user_id)
+            self.daily_warnings.remove(user_id)
+            self.history.remove_user(user_id)
+            self._changed()
+
+
+_warnings = None
+
+
+def open_warnings(settings):
+    """
+    Returns the warnings shared by the features, configured in the `storage` and `warnings` sections of settings.json.
+    The warnings not written yet are only in memory, so every feature must use the same instance.
+    """
+    global _warnings
+    if _warnings is None:
+        warnings_settings = settings.get('warnings') or {}
+        _warnings = Warnings(store=open_event_store(settings),
+                             flush_seconds=warnings_settings.get('flush_seconds', 5),
+                             flush_changes=warnings_settings.get('flush_changes', 50))
+    return _warnings
@@ -0,0 +1,31 @@
+import asyncio
+
+from loguru import logger
+
+from src.ft.ft4.gifs import handle_gifs_channel, sentiment_service, tenor
+from src.ft.ft4.sentiments import get_sentiment_analyzer
+from src.utilities.pipeline import pipeline
+from src.utilities.settings import Settings
+
+settings = Settings()
+
+
+def setup(bot):
+    """
+    Registers the GIFs channel feature: the "gifs" stage of the message pipeline. When the GIF search uses the
+    sentiment of the messages, the sentiment model is loaded on first use, or in the background once the bot is ready
+    when `warm_up_models` is enabled in `settings.json`. The fallback GIFs of Tenor are loaded once the bot is ready.
+    """
+    pipeline.add_stage("gifs", handle_gifs_channel,
+                       predicate=lambda message: message.channel.id == settings.get('gifs_channel_id'))
+
+    @bot.listen("on_ready")
+    async def warm_up_sentiment_model():
+        if settings.get('warm_up_models') and sentiment_service:
+            logger.info("Warming up the sentiment model...")
+            await asyncio.to_thread(get_sentiment_analyzer)
+            logger.success("Sentiment model loaded.")
+
+    @bot.listen("on_ready")
+    async def preload_fallback_gifs():
+        await tenor.preload_fallback()
@@ -1,14 +1,14 @@
-import random
+import os
 
 import discord
-import requests
-import os
 
 from dotenv import load_dotenv
 from loguru import logger
 
-from src.ft.ft4.sentiments import analyze_sentiment
+from src.ft.ft4.sentiments import SentimentService
+from src.ft.ft4.tenor import TenorClient
 
+from src.utilities.analysis import analysis_of
 from src.utilities.settings import Settings
 
 dotenv_path = os.path.abspath(os.path.join(os.path.dirname(__file__), "../../..", ".env"))
@@ -16,41 +16,62 @@ load_dotenv(dotenv_path)
 settings = Settings()
 TENOR_API_KEY = os.getenv('TENOR_API_KEY')
 TENOR_CLIENT_KEY = os.getenv('TENOR_CLIENT_KEY')
-
-
-def search_gif(query, limit=2):
+gifs_settings = settings.get('gifs') or {}
+tenor = TenorClient(TENOR_API_KEY, TENOR_CLIENT_KEY,
+                    limit=gifs_settings.get('tenor_limit', 8),
+                    cache_size=gifs_settings.get('tenor_cache_size', 512),
+                    ttl=gifs_settings.get('tenor_cache_ttl_seconds', 3600))
+# The sentiment model only runs if its score is used in the GIF search.
+sentiment_service = SentimentService(
+    max_batch_size=gifs_settings.get('sentiment_batch_size', 8),
+    max_wait=gifs_settings.get('sentiment_max_wait_ms', 20) / 1000,
+) if gifs_settings.get('sentiment_in_query', False) else None
+
+
+async def search_gif(query):
     """
     This function searches for a GIF using the Tenor API.
 
     Args:
         query (str): The search term to use when searching for the GIF.
-        limit (int, optional): The maximum number of GIFs to return. Defaults to 2.
 
-    Returns: str: The URL of a randomly selected GIF from the search results. If the API request fails, a default GIF URL is returned.
+    Returns: str: The URL of a GIF randomly selected from the search results, which are cached. If the search finds
+    nothing or fails, a GIF of the fallback results ("nothing found") is returned, or None if there is none.
+    """
+    return await tenor.random_gif(query)
 
-    Raises:
-        requests.exceptions.RequestException: If the GET request to the Tenor API fails.
+
+def with_mood(query, sentiment):
     """
-    # Define the parameters for the API request.
-    params = {
-        'key': TENOR_API_KEY,
-        'client_key': TENOR_CLIENT_KEY,
-        'q': query,
-        'limit': limit
-    }
-
-    # Send a GET request to the Tenor API.
-    response = requests.get("https://tenor.googleapis.com/v2/search", params=params)
-
-    # If the request was successful, select a random GIF from the results and return its URL.
-    if response.status_code == 200 and response.json()['results']:
-        return response.json()['results'][random.randint(0, limit - 1)]['media_formats']['gif']['url']
-    # If the request was not successful, make a new request with a default query.
-    else:
-        params.update({'q': 'nothing found', 'limit': 5})
-        response = requests.get("https://tenor.googleapis.com/v2/search", params=params)
-        if response.status_code == 200 and response.json()['results']:
-            return response.json()['results'][random.randint(0, params['limit'] - 1)]['media_formats']['gif']['url']
+    Adds the mood of a message to the GIF search query, when its sentiment is clearly negative or positive.
+    """
+    if sentiment["compound"] <= -0.5:
+        return f"{query} sad"
+    if sentiment["compound"] >= 0.5:
+        return f"{query} happy"
+    return query
+
+
+async def prepare_gif(message):
+    """
+    This function prepares the GIF answering a message sent in the GIFs channel.
+
+    Args:
+        message (discord.Message): The message that was sent in the channel.
+
+    The function searches for a GIF based on the normalized message content, shared with the other features through
+    the analysis of the message. With `gifs.sentiment_in_query` enabled in `settings.json`, the sentiment of the
+    message is analyzed first (in a micro-batch with the other messages of the channel, and only once per message) and
+    its mood added to the search; otherwise the model isn't run at all, since nothing would use its result.
+
+    Returns:
+        str: The URL of the GIF found, or None if no GIF was found.
+    """
+    analysis = analysis_of(message)
+    query = analysis.normalized
+    if sentiment_service:
+        query = with_mood(query, await analysis.sentiment(sentiment_service))
+    return await search_gif(query)  # Search for a GIF based on the keywords.
 
 
 async def handle_gifs_channel(message):
@@ -60,14 +81,12 @@ async def handle_gifs_channel(message):
     Args:
         message (discord.Message): The message that was sent in the channel.
 
-    The function first analyzes the sentiment of the message content and extracts keywords from it.
-    It then searches for a GIF based on the extracted keywords.
-    If a GIF URL is found, it creates an embed message with the GIF and sends it to the channel.
+    It prepares a GIF for the message with `prepare_gif`. If a GIF URL is found, it creates an embed message with the
+    GIF and sends it to the channel.
 
     This function doesn't return anything.
     """
-    sentiment = analyze_sentiment(message.content)  # Analyze the sentiment of the message content.
-    gif_url = search_gif(message.content)  # Search for a GIF based on the keywords.
+    gif_url = await prepare_gif(message)
     if gif_url:
         embed = discord.Embed()  # Create a new embed message.
         embed.set_image(url=gif_url)  # Set the image of the embed message to the GIF.
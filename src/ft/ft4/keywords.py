@@ -1,10 +1,17 @@
-import spacy
+nlp = None
 
-nlp = spacy.load("fr_core_news_sm")
+
+def get_nlp():
+    # spaCy and its French model are only loaded when keywords are first extracted.
+    global nlp
+    if nlp is None:
+        import spacy
+        nlp = spacy.load("fr_core_news_sm")
+    return nlp
 
 
 def extract_keywords(message):
-    doc = nlp(message)
+    doc = get_nlp()(message)
     entities = [ent.text for ent in doc.ents]
     keywords = [token.text for token in doc if token.is_alpha and not token.is_stop]
 
@@ -0,0 +1,127 @@
+import asyncio
+import os
+import random
+import time
+from collections import OrderedDict
+
+import aiohttp
+from loguru import logger
+
+from src.utilities.analysis import normalize
+from src.utilities.metrics import metrics
+
+# Tenor search URL, which can be pointed to a local stand-in
+TENOR_SEARCH_URL = os.getenv('TENOR_SEARCH_URL', 'https://tenor.googleapis.com/v2/search')
+# Query of the GIFs sent when a search finds nothing
+FALLBACK_QUERY = "nothing found"
+
+
+class TenorClient:
+    def __init__(self, api_key, client_key, limit=8, cache_size=512, ttl=3600, max_connections=10):
+        """
+        Asynchronous client of the Tenor search API.
+
+        Requests go through one pooled HTTP session. The GIF URLs found for each query are cached, keyed by the
+        normalized query, in an LRU cache of `cache_size` queries, for `ttl` seconds. A GIF is then picked at random
+        from the cached results, so a repeated or popular query costs no request. Concurrent searches of the same query
+        share one request. The GIFs of the fallback query, sent when a search finds nothing, are loaded once.
+
+        Args:
+            api_key (str): The Tenor API key.
+            client_key (str): The client key of the application.
+            limit (int): The number of GIFs requested per search, among which one is picked.
+            cache_size (int): The maximum number of cached queries.
+            ttl (float): The number of seconds the results of a query are cached.
+            max_connections (int): The maximum number of simultaneous connections to Tenor.
+        """
+        self.api_key = api_key
+        self.client_key = client_key
+        self.limit = limit
+        self.cache_size = cache_size
+        self.ttl = ttl
+        self.max_connections = max_connections
+        self.session = None
+        self.cache = OrderedDict()  # normalized query -> (fetched_at, [GIF URLs]), least recently used first
+        self.in_flight = {}  # normalized query -> future of the request
+        self.fallback = []
+        self.requests = metrics.counter("tenor_requests_total")
+        self.cache_hits = metrics.counter("tenor_cache_hits_total")
+
+    async def get_session(self):
+        # Created on first use, from the event loop.
+        if self.session is None or self.session.closed:
+            self.session = aiohttp.ClientSession(timeout=aiohttp.ClientTimeout(total=10),
+                                                 connector=aiohttp.TCPConnector(limit=self.max_connections))
+        return self.session
+
+    async def _request(self, query):
+        params = {'key': self.api_key, 'client_key': self.client_key, 'q': query, 'limit': self.limit}
+        self.requests.inc()
+        try:
+            session = await self.get_session()
+            async with session.get(TENOR_SEARCH_URL, params=params) as response:
+                if response.status != 200:
+                    logger.error(f"Tenor search of '{query}' failed with status {response.status}.")
+                    return None
+                data = await response.json()
+        except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+            logger.error(f"Tenor search of '{query}' failed: {e}")
+            return None
+        return [result['media_formats']['gif']['url'] for result in data.get('results', [])
+                if 'gif' in result.get('media_formats', {})]
+
+    async def search(self, query):
+        """
+        Returns the URLs of the GIFs found for a query, from the cache when possible. A failed search isn't cached.
+        """
+        key = normalize(query)
+        cached = self.cache.get(key)
+        if cached and time.monotonic() - cached[0] < self.ttl:
+            self.cache.move_to_end(key)
+            self.cache_hits.inc()
+            return cached[1]
+        if key in self.in_flight:
+            self.cache_hits.inc()
+            return await self.in_flight[key]
+        future = asyncio.get_running_loop().create_future()
+        self.in_flight[key] = future
+        try:
+            urls = await self._request(key)
+        except asyncio.CancelledError:
+            future.cancel()
+            raise
+        except Exception as e:
+            # An unexpected response (e.g. a result without URL) fails the search of every waiter, like an HTTP error.
+            logger.error(f"Tenor search of '{query}' failed: {e!r}")
+            urls = None
+        finally:
+            del self.in_flight[key]
+        if urls is not None:
+            self.cache[key] = (time.monotonic(), urls)
+            self.cache.move_to_end(key)
+            while len(self.cache) > self.cache_size:
+                self.cache.popitem(last=False)
+        future.set_result(urls or [])
+        return urls or []
+
+    async def preload_fallback(self):
+        """
+        Loads the GIFs of the fallback query, if they aren't loaded yet.
+        """
+        if not self.fallback:
+            self.fallback = await self._request(FALLBACK_QUERY) or []
+
+    async def random_gif(self, query):
+        """
+        Returns the URL of a GIF picked at random among the results of a query, or among the fallback GIFs if the query
+        has no results. None if there is no GIF at all.
+        """
+        urls = await self.search(query)
+        if not urls:
+            await self.preload_fallback()
+            urls = self.fallback
+        return random.choice(urls) if urls else None
+
+    async def close(self):
+        if self.session and not self.session.closed:
+            await self.session.close()
@@ -0,0 +1,124 @@
+import glob
+import gzip
+import json
+import os
+from datetime import datetime, timedelta
+
+
+def parse_day(day):
+    # Days are formatted like `get_current_date_formatted()`: MMDDYYYY, local time.
+    return datetime.strptime(day, "%m%d%Y").date()
+
+
+class MessageArchive:
+    def __init__(self, directory="src/ft/ft5/archive", retention_days=None):
+        """
+        The messages of the past days, partitioned by day.
+
+        Each partition is a gzip-compressed JSONL file (`messages_MMDDYYYY.jsonl.gz`) next to a small index
+        (`messages_MMDDYYYY.index.json`) holding the number of messages, the authors and the time range of the
+        partition, so that a query only decompresses the partitions that can contain matching messages. Partitions
+        older than `retention_days` days are deleted.
+
+        Args:
+            directory (str): The directory of the partitions.
+            retention_days (int): The number of days a partition is kept, or None to keep them forever.
+        """
+        self.directory = directory
+        self.retention_days = retention_days
+
+    def partition_path(self, day):
+        return os.path.join(self.directory, f"messages_{day}.jsonl.gz")
+
+    def index_path(self, day):
+        return os.path.join(self.directory, f"messages_{day}.index.json")
+
+    def days(self):
+        """
+        Returns the archived days, oldest first.
+        """
+        days = [os.path.basename(path)[len("messages_"):-len(".index.json")]
+                for path in glob.glob(os.path.join(self.directory, "messages_*.index.json"))]
+        return sorted(days, key=parse_day)
+
+    def index(self, day):
+        try:
+            with open(self.index_path(day), "r") as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return None
+
+    def archive_day(self, day, messages):
+        """
+        Writes the partition of a day and its index. The index is written last, so that a partition is only visible
+        once it is complete. Archiving a day again merges the new messages into its partition, without duplicating the
+        messages it already holds (same timestamp, author and content), so archiving the same day twice is harmless.
+        """
+        if self.index(day) is not None:
+            archived = self.read_day(day)
+            keys = {(message['timestamp'], message['author'], message['content']) for message in archived}
+            messages = archived + [message for message in messages
+                                   if (message['timestamp'], message['author'], message['content']) not in keys]
+        os.makedirs(self.directory, exist_ok=True)
+        with gzip.open(f"{self.partition_path(day)}.tmp", "wt", encoding="utf-8") as f:
+            f.write("".join(json.dumps(message) + "\n" for message in messages))
+        os.replace(f"{self.partition_path(day)}.tmp", self.partition_path(day))
+        timestamps = [message['timestamp'] for message in messages]
+        index = {
+            'count': len(messages),
+            'authors': sorted(set(message['author'] for message in messages)),
+            'first': min(timestamps, default=None),
+            'last': max(timestamps, default=None),
+        }
+        with open(f"{self.index_path(day)}.tmp", "w") as f:
+            json.dump(index, f)
+        os.replace(f"{self.index_path(day)}.tmp", self.index_path(day))
+
+    def read_day(self, day):
+        try:
+            with gzip.open(self.partition_path(day), "rt", encoding="utf-8") as f:
+                return [json.loads(line) for line in f]
+        except FileNotFoundError:
+            return []
+
+    def query(self, start=None, end=None, author=None):
+        """
+        Returns the archived messages sent between `start` and `end` (aware datetimes, both optional), by `author` if
+        given, oldest partition first. The partitions whose index excludes the query aren't opened.
+        """
+        messages = []
+        for day in self.days():
+            index = self.index(day)
+            if not index or not index['count']:
+                continue
+            if start and datetime.fromisoformat(index['last']) < start:
+                continue
+            if end and datetime.fromisoformat(index['first']) > end:
+                continue
+            if author is not None and author not in index['authors']:
+                continue
+            for message in self.read_day(day):
+                timestamp = datetime.fromisoformat(message['timestamp'])
+                if ((start is None or timestamp >= start) and (end is None or timestamp <= end)
+                        and (author is None or message['author'] == author)):
+                    messages.append(message)
+        return messages
+
+    def apply_retention(self, today):
+        """
+        Deletes the partitions older than the retention period.
+
+        Returns:
+            list: The deleted days.
+        """
+        if self.retention_days is None:
+            return []
+        oldest = today - timedelta(days=self.retention_days)
+        expired = [day for day in self.days() if parse_day(day) < oldest]
+        for day in expired:
+            os.remove(self.index_path(day))  # First, so that a partially deleted partition is invisible.
+            try:
+                os.remove(self.partition_path(day))
+            except FileNotFoundError:
+                pass
+        return expired
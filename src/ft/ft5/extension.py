@@ -0,0 +1,421 @@
+import asyncio
+import json
+import os
+import re
+from datetime import datetime, timezone
+
+import discord
+from discord.ext import tasks
+from loguru import logger
+
+from src.ft.ft2.weather import get_weather
+from src.ft.ft3.warnings import open_warnings
+from src.ft.ft5.archive import MessageArchive
+from src.ft.ft5.reports import NearDuplicateIndex, Reports
+from src.utilities.metrics import timed
+from src.utilities.pipeline import pipeline
+from src.utilities.settings import Settings
+from src.utilities.store import open_event_store
+from src.utilities.utilities import get_current_date_formatted
+
+settings = Settings()
+store = open_event_store(settings)
+warnings = open_warnings(settings)
+reports_settings = settings.get('reports') or {}
+near_duplicate_settings = reports_settings.get('near_duplicates') or {}
+reports = Reports(archive=MessageArchive(directory=reports_settings.get('archive_directory', 'src/ft/ft5/archive'),
+                                         retention_days=reports_settings.get('retention_days')),
+                  store=store,
+                  near_duplicates=NearDuplicateIndex(
+                      threshold=near_duplicate_settings.get('threshold', 0.6),
+                      bands=near_duplicate_settings.get('bands', 16),
+                      shingle_size=near_duplicate_settings.get('shingle_size', 3),
+                      min_length=near_duplicate_settings.get('min_length', 20),
+                  ) if near_duplicate_settings.get('enabled', True) else None)
+
+
+async def handle_reports(message):
+    """
+    Adds a message of the recommended channel to the daily reports, unless it is considered spam (a repetition, or a
+    near-duplicate, of a message sent by the same author in the last 24 hours).
+
+    Args:
+        message (discord.Message): The message object containing data about the received message.
+    """
+    if not reports.is_spam(message):
+        reports.add_message(message)
+
+
+async def count_message(message):
+    """
+    Counts a message in the per-day, per-channel and per-author statistics of the event store, used by the
+    'top10messages' command.
+
+    Args:
+        message (discord.Message): The message object containing data about the received message.
+    """
+    await asyncio.to_thread(store.count_message, message.created_at.date().isoformat(), message.channel.id,
+                            message.author.id)
+
+
+@tasks.loop(minutes=1)
+@timed("task_seconds", task="scheduled_reports_save")
+async def scheduled_reports_save():
+    """
+    A scheduled task that saves report data every minute.
+
+    Only the messages received since the last save are appended to the reports journal, in a worker thread so that
+    the event loop isn't blocked by the disk writes. Nothing is written if no message was received. After midnight, the
+    messages of the previous day are moved to the archive.
+    """
+    saved = await asyncio.to_thread(reports.save_messages)
+    if saved:
+        logger.info(f"Saved {saved} reports message(s).")
+
+
+@tasks.loop(hours=1)
+@timed("task_seconds", task="scheduled_reports_compaction")
+async def scheduled_reports_compaction():
+    """
+    A scheduled task that compacts the reports journal into the daily snapshot every hour, in a worker thread.
+    """
+    logger.info("Compacting reports data...")
+    await asyncio.to_thread(reports.compact_messages)
+
+
+# minimum timing : 2 minutes (free plan limitation : 30 messages per hour)
+@tasks.loop(minutes=6, hours=24)
+@timed("task_seconds", task="scheduled_report")
+async def scheduled_report(bot):
+    """
+    Generates and sends a daily discussion report to a specified Discord channel.
+
+    This scheduled task runs every 24 hours with a 6-minute offset. It performs the following steps:
+    1. Logs into a GPT instance to generate a report prompt.
+    2. Sends the generated prompt to the GPT instance and receives a response.
+    3. Extracts messages and sentiment analysis from the GPT response.
+    4. Compiles a report including the date, sentiment analysis, impactful messages, participants, and warnings.
+    5. Sends the compiled report to a specified Discord channel ('moments_channel_id').
+    6. Optionally generates a word cloud from the messages and a pie chart for warnings distribution, attaching them to the report.
+
+    Exceptions:
+        - Catches and logs any exceptions that occur during the execution.
+        - Attempts to close the GPT session gracefully in case of an exception.
+
+    Args:
+        bot (discord.Bot): The bot instance.
+
+    Note:
+        - The task relies on external settings for channel IDs and the GPT instance configuration.
+        - The 'moments_channel_id' setting determines the target channel for the report.
+        - The function uses matplotlib for generating visualizations (word cloud and pie chart).
+    """
+    import matplotlib.pyplot as plt
+    import numpy as np
+    import openpyxl
+    from openpyxl.styles import Font
+    from wordcloud import WordCloud
+
+    from src.ft.ft5.gpt import GPT
+
+    global gpt
+    try:
+        gpt = GPT(reports)
+        gpt.login()
+        prompt = gpt.generate_report_prompt()
+        response = gpt.send_prompt(prompt) if prompt else ""
+        if response:
+            logger.success(f"ChatGPT response generated.")
+            messages = re.findall(r'\[Message \d+\] "(.*?)"', response)
+            sentiment_match = re.search(r'Global sentiment: (.*)"', response)
+            sentiment = sentiment_match.group(1) if sentiment_match else "No sentiment found"
+        else:
+            messages = []
+            sentiment = "No sentiment found"
+        # send the response to moments_channel_id
+        moments_channel_id = settings.get('moments_channel_id')
+        moments_channel = bot.get_channel(moments_channel_id)
+        unique_authors = reports.get_unique_authors()
+        unique_authors = [bot.get_user(int(author_id)).name for author_id in unique_authors]
+        all_warnings = warnings.get_all_daily_warnings()
+        warnings_description = "\n ".join([f"- **{i + 1}**. {bot.get_user(int(user_id)).mention} - {count} warning(s)"
+                                            for i, (user_id, count) in enumerate(all_warnings.items())]) \
+            if all_warnings else "- No warnings found."
+
+        if moments_channel:
+            embed = discord.Embed(title=f":crystal_ball: Daily discussion report",
+                                    description=f":date: **Date**: {get_current_date_formatted(separator='/')}\n"
+                                                f":bar_chart: **Sentiment**: {sentiment}\n"
+                                                f":loudspeaker: **Impactful messages**:\n"
+                                                f" - {'\n - '.join(messages) or 'No impactful messages found'}\n"
+                                                f":busts_in_silhouette: **Participants**:\n"
+                                                f" - {', '.join([f'{author}' for author in unique_authors]) or 'No participants found'}\n"
+                                                f":warning: **Warnings**:\n {warnings_description}",
+                                    color=0xaa8dd8)
+            embed.set_footer(text="MEE7 Daily Report",
+                                icon_url=settings.get('icon_url'))
+            message = await moments_channel.send(embed=embed)
+            # generate word cloud for messages
+            if messages:
+                wordcloud = WordCloud(width=800, height=400, background_color='white').generate(' '.join(messages))
+                plt.figure(figsize=(10, 5))
+                plt.imshow(wordcloud, interpolation='bilinear')
+                plt.axis('off')
+                plt.savefig('wordcloud.png')
+                plt.close()
+                await message.reply(file=discord.File('wordcloud.png'))
+                os.remove('wordcloud.png')
+
+            # generate tree map for warnings
+            if all_warnings:
+                labels = [bot.get_user(int(user_id)).name for user_id in all_warnings.keys()]
+                sizes = [count for count in all_warnings.values()]
+                colors = np.random.rand(len(labels), 3)
+                plt.figure(figsize=(10, 5))
+                plt.pie(sizes, labels=labels, colors=colors, autopct='%1.1f%%')
+                plt.axis('equal')
+                plt.title('Warnings Distribution')
+                plt.savefig('warnings.png')
+                plt.close()
+                await message.reply(file=discord.File('warnings.png'))
+                os.remove('warnings.png')
+
+            # Create and send Excel report
+            wb = openpyxl.Workbook()
+            ws = wb.active
+            ws.title = "Daily Report"
+
+            # Set up the headers
+            headers = ["Date", "Sentiment", "Messages", "Participants", "Warnings"]
+            for col_num, header in enumerate(headers, 1):
+                cell = ws.cell(row=1, column=col_num, value=header)
+                cell.font = Font(bold=True)
+
+            # Add the data
+            ws.cell(row=2, column=1, value=get_current_date_formatted(separator='/'))
+            ws.cell(row=2, column=2, value=sentiment)
+            ws.cell(row=2, column=3, value="\n".join(messages))
+            ws.cell(row=2, column=4, value=", ".join(unique_authors))
+            ws.cell(row=2, column=5, value=warnings_description)
+
+            # Save the Excel file
+            excel_file = "daily_report.xlsx"
+            wb.save(excel_file)
+            await message.reply(file=discord.File(excel_file))
+            os.remove(excel_file)
+    except Exception as e:
+        logger.error(f"An error occurred: {str(e)}")
+    finally:
+        try:
+            gpt.close()
+        except OSError:
+            pass
+
+
+# scheduled_activity_recommendation & scheduled_report must be at least 3 minutes apart to avoid conflicts
+@tasks.loop(minutes=3, hours=24)
+@timed("task_seconds", task="scheduled_activity_recommendation")
+async def scheduled_activity_recommendation(bot):
+    """
+    A scheduled task that recommends activities based on the current weather in a specified city.
+
+    This task runs every 24 hours with a 3-minute offset. It fetches the current weather data for a predefined city
+    and uses it to generate activity recommendations. These recommendations are then sent to a specific Discord channel
+    dedicated to activity suggestions.
+
+    The activity recommendations are generated by sending a prompt to a GPT model, which returns a list of activities
+    suitable for the current weather conditions. Each activity includes a name and a URL for more information.
+
+    If the GPT model fails to generate a response or an error occurs during the process, the task will log the error
+    and attempt to close the GPT session gracefully. Additionally, if the scheduled report task is not running,
+    this task will initiate it to avoid any conflicts.
+
+    Args:
+        bot (discord.Bot): The bot instance.
+
+    Exceptions:
+        Logs any exceptions that occur during the execution of the task and attempts to close the GPT session.
+    """
+    from src.ft.ft5.gpt import GPT
+
+    global gpt
+    try:
+        city = settings.get('city')
+        date = datetime.now().strftime('%Y-%m-%d')
+        weather_datas = get_weather(city, date)
+        gpt = GPT(reports)
+        gpt.login()
+        prompt = gpt.generate_activity_prompt(weather_datas)
+        response = gpt.send_prompt(prompt) if prompt else ""
+        if response:
+            logger.success(f"ChatGPT response generated.")
+            activities = response.split("[")[1].rsplit("]")[0]
+            activities = f"[{activities}]"
+            activities_json = json.loads(activities)
+            activities_names = [activity['activity'] for activity in activities_json]
+            urls = [activity['url'] for activity in activities_json]
+        else:
+            activities_names = []
+            urls = []
+        # send the response to moments_channel_id
+        activity_channel_id = settings.get('activity_channel_id')
+        activity_channel = bot.get_channel(activity_channel_id)
+        formatted_date = datetime.strptime(date, '%Y-%m-%d').strftime('%m/%d/%Y')
+        if activity_channel:
+            embed = discord.Embed(title=f":tada: Activity recommendation at {city}",
+                                  description=f":date: **Date**: {formatted_date}\n"
+                                              f":white_sun_rain_cloud: **Weather**: {weather_datas['weather']}\n"
+                                              f":thermometer: **Temperature**: {weather_datas['temperature']}°C",
+                                  color=0xfd6ce4)
+            embed.set_footer(text="MEE7 Activity Recommendation",
+                             icon_url=settings.get('icon_url'))
+            for activity_name, url in zip(activities_names, urls):
+                embed.add_field(name=f":placard: {activity_name}", value=f":link: [Read more]({url})", inline=False)
+            await activity_channel.send(embed=embed)
+    except Exception as e:
+        logger.error(f"An error occurred: {str(e)}")
+    finally:
+        try:
+            gpt.close()
+            if not scheduled_report.is_running():
+                # Start the scheduled report task after the activity recommendation task to avoid conflicts
+                start_scheduled_report.start(bot)
+        except OSError:
+            pass
+
+
+@tasks.loop(minutes=3)
+async def start_scheduled_report(bot):
+    """
+    A scheduled task that attempts to start the scheduled report task.
+
+    This task runs every 3 minutes. On its first loop, it simply logs a message indicating a delay
+    before starting the scheduled report task. This is to ensure there's a delay before the task starts,
+    allowing for any necessary setup or conditions to be met.
+
+    On subsequent loops, if the scheduled report task is not already running, it starts the task and then
+    stops itself to prevent further execution.
+    """
+    # Do not start the task on the first loop, so that we add a delay
+    if start_scheduled_report.current_loop == 0:
+        logger.debug("Delaying the start of the scheduled report task, starting in 3 minutes...")
+        return
+    if not scheduled_report.is_running():
+        logger.info("Starting the scheduled report task...")
+        scheduled_report.start(bot)
+        logger.success("Scheduled report task started.")
+        start_scheduled_report.stop()
+
+
+def setup(bot):
+    """
+    Registers the daily reports feature: the "reports" stage of the message pipeline, the 'top10messages' command, and
+    the reports save and compaction tasks started once the bot is ready. The heavy dependencies of the GPT tasks and of
+    the charts (selenium, matplotlib, wordcloud, openpyxl) are only imported when they are used. With an event store,
+    the "message_stats" stage counts the messages for the 'top10messages' command.
+    """
+    pipeline.add_stage("reports", handle_reports,
+                       predicate=lambda message: message.channel.id == settings.get('recommended_channel_id'))
+    if store:
+        pipeline.add_stage("message_stats", count_message)
+
+    @bot.listen("on_ready")
+    async def start_reports_tasks():
+        if not scheduled_reports_save.is_running():
+            scheduled_reports_save.start()
+        if not scheduled_reports_compaction.is_running():
+            scheduled_reports_compaction.start()
+        # scheduled_activity_recommendation.start(bot)
+
+    @bot.command(name="top10messages", description="Displays the top 10 users who sent the most messages today.")
+    async def top10messages(ctx, bots: discord.Option(discord.SlashCommandOptionType.boolean) = False):
+        """
+        Asynchronously handles the 'top10messages' command within Discord.
+
+        This command calculates and displays the top 10 users who have sent the most messages in the server for the current day.
+        It can optionally include messages sent by bots.
+
+        Args:
+            ctx (discord.Context): The context in which the command was called. This includes information about the message,
+                                   the channel, and the user who called the command.
+            bots (discord.Option): A boolean option provided by the user indicating whether to include bot messages in the count.
+                                   Defaults to False, excluding bot messages from the count.
+
+        The function performs the following steps:
+        1. Sends an initial response indicating that the calculation is in progress.
+        2. Initializes a dictionary to keep track of message counts per user.
+        3. Iterates through all text channels in the server, counting messages sent by each user after midnight of the current day.
+           If 'bots' is False, messages sent by bots are excluded.
+           With an event store and without bots, the counts of the "message_stats" stage are queried instead.
+        4. Sorts the users by their message count in descending order and selects the top 10.
+        5. If there are no messages found for the current day, sends an embed message indicating so.
+        6. Otherwise, generates a bar graph displaying the usernames and their corresponding message counts.
+        7. Saves the graph to a file named 'top10messages.png', sends it in an embed message, and then deletes the file.
+        """
+        import matplotlib.pyplot as plt
+
+        await ctx.respond("Calculating, this may take a moment...")
+
+        message_counts = {}
+        today = datetime.now(timezone.utc).date()
+
+        if store and not bots:
+            # The messages of the bots aren't counted by the "message_stats" stage.
+            top10 = await asyncio.to_thread(store.top_authors, today.isoformat(),
+                                            [channel.id for channel in ctx.guild.text_channels])
+        else:
+            # Iterate through all channels in the server
+            for channel in ctx.guild.text_channels:
+                async for message in channel.history(limit=None,
+                                                     after=datetime.combine(today, datetime.min.time(),
+                                                                            tzinfo=timezone.utc)):
+                    if message.author.bot and not bots:
+                        continue
+                    if message.author.id in message_counts:
+                        message_counts[message.author.id] += 1
+                    else:
+                        message_counts[message.author.id] = 1
+
+            # Sort users by message count
+            sorted_counts = sorted(message_counts.items(), key=lambda item: item[1], reverse=True)
+            top10 = sorted_counts[:10]
+
+        if not top10:
+            # No messages found today
+            embed = discord.Embed(title=f"No messages found today ({today})",
+                                  description="No data available for top 10 users by message count.",
+                                  color=discord.Color.blue())
+            embed.set_footer(text="MEE7 Stats", icon_url=settings.get('icon_url'))
+            await ctx.respond(embed=embed)
+            return
+
+        # Extract usernames and message counts
+        user_names = []
+        message_numbers = []
+        for user_id, count in top10:
+            user = await bot.fetch_user(user_id)
+            user_names.append(f"{user.name}#{user.discriminator}" if user.discriminator != "0" else user.name)
+            message_numbers.append(count)
+
+        # Generate the graph
+        plt.figure(figsize=(10, 5))
+        plt.bar(user_names, message_numbers, color='skyblue')
+        for i, v in enumerate(message_numbers):
+            plt.text(i, v + 0.5, str(v), ha='center', va='bottom')
+        plt.xlabel('Users')
+        plt.ylabel('Message Count')
+        plt.title(f"Top 10 Users by Message Count (Today, {today})")
+        plt.xticks(rotation=45)
+        plt.tight_layout()
+
+        # Save the graph to a file
+        plt.savefig('top10messages.png')
+        plt.close()
+
+        # Send the graph on Discord in an embed
+        embed = discord.Embed(title=f"Top 10 Users by Message Count (Today, {today})",
+                              color=discord.Color.blue())
+        embed.set_image(url="attachment://top10messages.png")
+        embed.set_footer(text="MEE7 Stats", icon_url=settings.get('icon_url'))
+        await ctx.respond(embed=embed, file=discord.File('top10messages.png'))
+        os.remove('top10messages.png')
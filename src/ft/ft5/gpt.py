@@ -8,13 +8,17 @@ from selenium.webdriver.chrome.options import Options
 import undetected_chromedriver as uc
 from loguru import logger
 
-from src.ft.ft5.reports import Reports
 from src.utilities.utilities import remove_non_bmp
 
 
 class GPT:
-    def __init__(self):
-        reports = Reports()
+    def __init__(self, reports):
+        """
+        Args:
+            reports (Reports): The reports of the bot, whose messages of the day are summarized. The instance of the
+                               ft5 extension must be used: it holds the messages not saved yet, and with the SQLite
+                               backend the daily JSON files stay empty.
+        """
         self.messages = reports.get_messages()
         # Load environment variables
         load_dotenv()
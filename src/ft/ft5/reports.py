@@ -1,48 +1,397 @@
 import json
+import os
+import re
+import threading
+from collections import deque
 from datetime import datetime, timedelta, timezone
+from hashlib import blake2b
+from struct import Struct
 
+from loguru import logger
+
+from src.ft.ft5.archive import MessageArchive, parse_day
+from src.utilities.analysis import analysis_of, normalize
+from src.utilities.metrics import timed
+from src.utilities.store import iso_day
 from src.utilities.utilities import get_current_date_formatted
 
+# The snapshots (.json) and journals (.jsonl) of the days, in src/ft/ft5
+DAY_FILE_PATTERN = re.compile(r'^messages_(\d{8})\.jsonl?$')
+
+
+def message_key(stored_message):
+    # Two distinct messages never share their author, channel, content and timestamp (to the microsecond).
+    return (stored_message['timestamp'], stored_message['author'], stored_message.get('channel'),
+            stored_message['content'])
+
+
+def spam_key(author_id, content):
+    return author_id, hash(normalize(content))
+
+
+class NearDuplicateIndex:
+    NUM_PERM = 32
+    # One blake2b digest of 64 bytes gives the 32 MinHash values (16 bits each) of a shingle.
+    HASH_VALUES = Struct(f"<{NUM_PERM}H").unpack
+    MAX_CACHED_SHINGLES = 200_000
+
+    def __init__(self, threshold=0.6, bands=16, shingle_size=3, min_length=20):
+        """
+        Finds the messages of an author similar to one of their recent messages (copy-paste spam with small edits).
+
+        A message is represented by its character shingles (the substrings of `shingle_size` characters of its
+        normalized content), summarized by a MinHash signature of `NUM_PERM` values. The signature is split into
+        `bands` bands, each indexed in a hash table (LSH): the messages of the same author sharing at least one band are
+        candidates, and a candidate is a near-duplicate if the fraction of equal signature values, an estimate of the
+        Jaccard similarity of the shingles, is at least `threshold`. A lookup only compares the candidates, instead of
+        every message of the window. Messages shorter than `min_length` characters are ignored ("ok", "mdr"...).
+
+        Args:
+            threshold (float): The minimal estimated Jaccard similarity of two near-duplicates, between 0 and 1.
+            bands (int): The number of LSH bands, a divisor of `NUM_PERM`. More bands find less similar candidates.
+            shingle_size (int): The number of characters of the shingles.
+            min_length (int): The minimal length of the normalized messages that are indexed and looked up.
+        """
+        if self.NUM_PERM % bands:
+            raise ValueError(f"The number of bands must divide {self.NUM_PERM}")
+        self.threshold = threshold
+        self.bands = bands
+        self.rows = self.NUM_PERM // bands
+        self.shingle_size = shingle_size
+        self.min_length = min_length
+        self.buckets = {}  # (author, band, band values) -> set of entry IDs
+        self.entries = {}  # entry ID -> (author, signature)
+        self.queue = deque()  # (timestamp, entry ID) of the indexed messages, oldest first
+        self.next_id = 0
+        self.shingles_cache = {}  # shingle -> hash values, shared by the messages using the same shingles
+
+    def signature(self, content, analysis=None):
+        """
+        Returns the MinHash signature of a message, or None if it is too short. With the analysis of the message, the
+        signature is computed once, for both the lookup and the addition of the message.
+        """
+        if analysis is not None:
+            return analysis.memo("minhash", lambda: self._signature(analysis.normalized))
+        return self._signature(normalize(content))
+
+    def _signature(self, text):
+        if len(text) < self.min_length:
+            return None
+        if len(self.shingles_cache) > self.MAX_CACHED_SHINGLES:
+            self.shingles_cache.clear()
+        values = []
+        for shingle in {text[i:i + self.shingle_size] for i in range(len(text) - self.shingle_size + 1)}:
+            shingle_values = self.shingles_cache.get(shingle)
+            if shingle_values is None:
+                shingle_values = self.HASH_VALUES(blake2b(shingle.encode(), digest_size=64).digest())
+                self.shingles_cache[shingle] = shingle_values
+            values.append(shingle_values)
+        return tuple(map(min, zip(*values)))
+
+    def _band_keys(self, author, signature):
+        return [(author, band, signature[band * self.rows:(band + 1) * self.rows]) for band in range(self.bands)]
+
+    def add(self, author, content, timestamp, analysis=None):
+        signature = self.signature(content, analysis)
+        if signature is None:
+            return
+        entry_id = self.next_id
+        self.next_id += 1
+        self.entries[entry_id] = (author, signature)
+        for key in self._band_keys(author, signature):
+            self.buckets.setdefault(key, set()).add(entry_id)
+        self.queue.append((timestamp, entry_id))
+
+    def find(self, author, content, analysis=None):
+        """
+        Returns whether a near-duplicate of the message was sent by the same author.
+        """
+        signature = self.signature(content, analysis)
+        if signature is None:
+            return False
+        candidates = set()
+        for key in self._band_keys(author, signature):
+            candidates.update(self.buckets.get(key, ()))
+        for entry_id in candidates:
+            _, candidate = self.entries[entry_id]
+            similarity = sum(a == b for a, b in zip(signature, candidate)) / self.NUM_PERM
+            if similarity >= self.threshold:
+                return True
+        return False
+
+    def evict(self, oldest):
+        """
+        Removes the messages sent before the `oldest` timestamp.
+        """
+        while self.queue and self.queue[0][0] < oldest:
+            _, entry_id = self.queue.popleft()
+            author, signature = self.entries.pop(entry_id)
+            for key in self._band_keys(author, signature):
+                bucket = self.buckets[key]
+                bucket.discard(entry_id)
+                if not bucket:
+                    del self.buckets[key]
+
+    def clear(self):
+        self.buckets = {}
+        self.entries = {}
+        self.queue = deque()
+
 
 class Reports:
-    def __init__(self):
+    def __init__(self, spam_window=timedelta(days=1), archive=None, store=None, near_duplicates=None):
+        """
+        The messages of the day, and an index of the recent messages used to detect spam in constant time.
+
+        The messages are stored in a daily snapshot (`messages_MMDDYYYY.json`) and a journal
+        (`messages_MMDDYYYY.jsonl`): saving only appends the messages added since the last save to the journal, and
+        compacting rewrites the snapshot with all the messages of the day and empties the journal. Loading replays the
+        journal on top of the snapshot. Saving and compacting can run in a worker thread while messages are added.
+
+        The first message received after local midnight starts a new day. The messages of the previous day are moved
+        to the archive by the next save, which also applies the retention policy of the archive. Days left uncompressed
+        (e.g. the bot was stopped at midnight) are archived when the reports are created.
+
+        With an event store, the messages are inserted in its `messages` table instead, and there is nothing to
+        compact nor to archive: the retention policy deletes the old rows.
+
+        The index maps (author, normalized content hash) to the timestamps of the matching messages of the last
+        `spam_window`. A second queue keeps the indexed messages in arrival order, so that the expired ones are
+        evicted from the index as the window slides. The index is rebuilt from the messages when they are loaded. With
+        a near-duplicate index, the messages similar to a recent message of their author are also considered spam.
+
+        Args:
+            spam_window (timedelta): How long a message is remembered to detect its repetitions.
+            archive (MessageArchive): The archive of the past days.
+            store (EventStore, optional): The SQLite store replacing the JSON files.
+            near_duplicates (NearDuplicateIndex, optional): The index of the recent messages used to detect the edited
+                                                            repetitions.
+        """
+        self.spam_window = spam_window
+        self.archive = archive or MessageArchive()
+        self.store = store
+        self.day = get_current_date_formatted()
         self.messages_data = []
+        self.pending = []  # messages added since the last save, not journaled yet
+        self.closed_days = []  # (day, messages, pending messages) of the past days, not archived yet
+        self.lock = threading.Lock()  # protects `messages_data` and `pending`
+        self.io_lock = threading.Lock()  # serializes the writes to the snapshot and the journal
+        self.spam_index = {}  # (author, content hash) -> deque of timestamps
+        self.spam_queue = deque()  # (timestamp, key) of the indexed messages, oldest first
+        self.near_duplicates = near_duplicates
         self.load_messages()
+        self.archive_stale_days()
+
+    def snapshot_path(self, day=None):
+        return f'src/ft/ft5/messages_{day or self.day}.json'
+
+    def journal_path(self, day=None):
+        return f'src/ft/ft5/messages_{day or self.day}.jsonl'
 
+    @timed("reports_seconds", operation="add_message")
     def add_message(self, message):
-        self.messages_data.append({
+        stored_message = {
             'author': message.author.id,
+            'channel': message.channel.id,
             'content': message.content,
             'timestamp': message.created_at.isoformat()
-        })
+        }
+        day = get_current_date_formatted()
+        with self.lock:
+            if day != self.day:
+                self.closed_days.append((self.day, self.messages_data, self.pending))
+                self.day, self.messages_data, self.pending = day, [], []
+            self.messages_data.append(stored_message)
+            self.pending.append(stored_message)
+        analysis = analysis_of(message)
+        self._index((message.author.id, analysis.content_hash), message.created_at.timestamp())
+        if self.near_duplicates:
+            self.near_duplicates.add(message.author.id, message.content, message.created_at.timestamp(), analysis)
 
     def get_messages(self):
-        return self.messages_data
+        # A copy, since the messages are added and the day rolled over while the GPT tasks read them.
+        with self.lock:
+            return list(self.messages_data)
 
     def get_unique_authors(self):
+        if self.store:
+            return self.store.authors(iso_day(self.day))
         return set([message['author'] for message in self.messages_data])
 
-    def load_messages(self):
+    def read_day(self, day):
+        """
+        Reads the snapshot and the journal of a day. The journaled messages already in the snapshot are skipped: if the
+        bot stopped during a compaction, after the snapshot was replaced but before the journal was emptied, the
+        journal still holds messages of the new snapshot. These messages come first in the journal, so the snapshot is
+        only searched when the first journaled message isn't newer than all the messages of the snapshot.
+
+        Returns:
+            tuple: The messages, and whether the journal must be compacted (a corrupted line or already compacted
+                   messages were ignored).
+        """
         try:
-            filename = f'src/ft/ft5/messages_{get_current_date_formatted()}.json'
-            with open(filename, 'r') as file:
-                self.messages_data = json.load(file)
+            with open(self.snapshot_path(day), 'r') as file:
+                messages_data = json.load(file)
         except FileNotFoundError:
-            self.messages_data = []
+            messages_data = []
+        corrupted = False
+        compacted = None  # keys of the snapshot messages, if the journal may hold some of them
+        try:
+            with open(self.journal_path(day), 'r') as file:
+                for line in file:
+                    try:
+                        stored_message = json.loads(line)
+                    except json.JSONDecodeError:
+                        # The last line may be truncated if the bot stopped while appending to the journal.
+                        logger.warning(f"Ignoring a corrupted line of the reports journal: {line!r}")
+                        corrupted = True
+                        continue
+                    if compacted is None:
+                        latest = max((message['timestamp'] for message in messages_data), default=None)
+                        compacted = (set() if latest is None or stored_message['timestamp'] > latest
+                                     else {message_key(message) for message in messages_data})
+                    if message_key(stored_message) in compacted:
+                        corrupted = True
+                        continue
+                    messages_data.append(stored_message)
+        except FileNotFoundError:
+            pass
+        return messages_data, corrupted
+
+    def load_messages(self):
+        self.day = get_current_date_formatted()
+        if self.store:
+            messages_data, corrupted = self.store.messages(iso_day(self.day)), False
+        else:
+            messages_data, corrupted = self.read_day(self.day)
+        with self.lock:
+            self.messages_data = messages_data
+            self.pending = []
+        self.index_messages()
+        if corrupted:
+            # The next messages would be appended to the corrupted line, or after the already compacted messages.
+            self.compact_messages()
+
+    def index_messages(self):
+        """
+        Rebuilds the spam index from `messages_data`.
+        """
+        self.spam_index = {}
+        self.spam_queue = deque()
+        entries = sorted((datetime.fromisoformat(stored_message['timestamp']).timestamp(),
+                          spam_key(stored_message['author'], stored_message['content']), i)
+                         for i, stored_message in enumerate(self.messages_data))
+        if self.near_duplicates:
+            self.near_duplicates.clear()
+        for timestamp, key, i in entries:
+            self._index(key, timestamp)
+            if self.near_duplicates:
+                stored_message = self.messages_data[i]
+                self.near_duplicates.add(stored_message['author'], stored_message['content'], timestamp)
+
+    def _index(self, key, timestamp):
+        self.spam_index.setdefault(key, deque()).append(timestamp)
+        self.spam_queue.append((timestamp, key))
 
+    def _evict(self, now):
+        oldest = now - self.spam_window.total_seconds()
+        while self.spam_queue and self.spam_queue[0][0] < oldest:
+            _, key = self.spam_queue.popleft()
+            timestamps = self.spam_index[key]
+            timestamps.popleft()
+            if not timestamps:
+                del self.spam_index[key]
+        if self.near_duplicates:
+            self.near_duplicates.evict(oldest)
+
+    @timed("reports_seconds", operation="save_messages")
     def save_messages(self):
-        # Generate the filename based on the current date
-        filename = f'src/ft/ft5/messages_{get_current_date_formatted()}.json'
-        with open(filename, 'w') as file:
-            json.dump(self.messages_data, file, indent=4)
+        """
+        Appends the messages added since the last save to the journal, with a single fsync, or inserts them in the
+        event store in a single transaction. Does nothing if no message was added.
+
+        Returns:
+            int: The number of journaled messages.
+        """
+        with self.io_lock:
+            with self.lock:
+                closed_days, self.closed_days = self.closed_days, []
+                pending, self.pending = self.pending, []
+                day = self.day
+            if self.store:
+                for closed_day, _, closed_pending in closed_days:
+                    self.store.add_messages([{**stored_message, 'day': iso_day(closed_day)}
+                                             for stored_message in closed_pending])
+                if closed_days:
+                    self._apply_store_retention(day)
+                self.store.add_messages([{**stored_message, 'day': iso_day(day)} for stored_message in pending])
+                return len(pending)
+            for closed_day, messages_data, _ in closed_days:
+                self._archive_day(closed_day, messages_data)
+            if closed_days:
+                self.archive.apply_retention(parse_day(day))
+            if not pending:
+                return 0
+            with open(self.journal_path(day), 'a') as file:
+                file.write(''.join(json.dumps(stored_message) + '\n' for stored_message in pending))
+                file.flush()
+                os.fsync(file.fileno())
+            return len(pending)
 
+    @timed("reports_seconds", operation="compact_messages")
+    def compact_messages(self):
+        """
+        Rewrites the daily snapshot with all the messages of the day, then empties the journal. The snapshot is
+        replaced atomically, so that a crash during the compaction loses nothing, and a journal left full by a crash
+        after the replacement isn't replayed twice (see `read_day`). Does nothing with an event store.
+        """
+        if self.store:
+            return
+        with self.io_lock:
+            with self.lock:
+                messages_data = list(self.messages_data)
+                self.pending = []  # They are part of the snapshot.
+                day = self.day
+            snapshot_path = self.snapshot_path(day)
+            with open(f'{snapshot_path}.tmp', 'w') as file:
+                json.dump(messages_data, file, indent=4)
+                file.flush()
+                os.fsync(file.fileno())
+            os.replace(f'{snapshot_path}.tmp', snapshot_path)
+            open(self.journal_path(day), 'w').close()
+
+    def _archive_day(self, day, messages_data):
+        self.archive.archive_day(day, messages_data)
+        for path in (self.snapshot_path(day), self.journal_path(day)):
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+
+    def archive_stale_days(self):
+        """
+        Archives the snapshots and journals of the past days left in `src/ft/ft5`, then applies the retention policy.
+        """
+        if self.store:
+            self._apply_store_retention(self.day)
+            return
+        with self.io_lock:
+            days = {match.group(1) for match in map(DAY_FILE_PATTERN.match, os.listdir('src/ft/ft5')) if match}
+            for day in sorted(days - {self.day}, key=parse_day):
+                messages_data, _ = self.read_day(day)
+                self._archive_day(day, messages_data)
+            self.archive.apply_retention(parse_day(self.day))
+
+    def _apply_store_retention(self, day):
+        if self.archive.retention_days is not None:
+            oldest = parse_day(day) - timedelta(days=self.archive.retention_days)
+            self.store.delete_messages_before(oldest.isoformat())
+
+    @timed("reports_seconds", operation="is_spam")
     def is_spam(self, message):
-        for stored_message in self.messages_data:
-            stored_time = datetime.fromisoformat(stored_message['timestamp'])
-            # Convert current UTC time to an offset-aware datetime
-            current_time = datetime.utcnow().replace(tzinfo=timezone.utc)
-            if (stored_message['author'] == message.author.id and
-                    stored_message['content'] == message.content and
-                    stored_time >= (current_time - timedelta(days=1))):
-                return True
-        return False
\ No newline at end of file
+        self._evict(datetime.now(timezone.utc).timestamp())
+        analysis = analysis_of(message)
+        if (message.author.id, analysis.content_hash) in self.spam_index:
+            return True
+        return (self.near_duplicates is not None
+                and self.near_duplicates.find(message.author.id, message.content, analysis))
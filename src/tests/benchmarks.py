@@ -0,0 +1,467 @@
+# Micro-benchmarks of the bot's hot functions, runnable offline from the repository root:
+#   python -m src.tests.benchmarks                    # run and compare with the stored baseline
+#   python -m src.tests.benchmarks --full             # include the 1M messages scale
+#   python -m src.tests.benchmarks --save-baseline    # store the current results as the new baseline
+import argparse
+import contextlib
+import glob
+import json
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta, timezone, date
+from types import SimpleNamespace
+
+REPO_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), "../.."))
+BASELINE_FILE = os.path.join(REPO_ROOT, "src/tests/benchmarks_baseline.json")
+
+MESSAGES_SCALES = (10_000, 100_000)
+FULL_MESSAGES_SCALES = MESSAGES_SCALES + (1_000_000,)
+USERS = 1_000
+
+BENCHMARKS = []
+
+
+def benchmark(name, scales=(None,)):
+    """
+    Registers a benchmark.
+
+    The decorated function takes a scale (or None) and performs the setup, then returns a tuple `(run, ops)`: `run`
+    is the callable being timed and `ops` the number of operations it performs, used to report a time per operation.
+
+    Args:
+        name (str): The name of the benchmark, used as baseline key together with the scale.
+        scales (tuple): The scales at which the benchmark runs. A callable taking the parsed arguments is accepted
+                        for scales depending on the command line options.
+    """
+
+    def decorator(func):
+        BENCHMARKS.append((name, scales, func))
+        return func
+
+    return decorator
+
+
+def load_fixture_messages():
+    messages = []
+    # Kept out of src/ft/ft5, where the bot archives the daily files of the past days.
+    for file_path in sorted(glob.glob(os.path.join(REPO_ROOT, "src/tests/fixtures/messages_*.json"))):
+        with open(file_path, "r") as f:
+            messages.extend(json.load(f))
+    return messages
+
+
+def load_fixture_warnings():
+    warnings = {}
+    for file_path in sorted(glob.glob(os.path.join(REPO_ROOT, "src/ft/ft3/warnings_*.json"))):
+        with open(file_path, "r") as f:
+            for user_id, count in json.load(f).items():
+                warnings[user_id] = warnings.get(user_id, 0) + count
+    return warnings
+
+
+FIXTURE_MESSAGES = load_fixture_messages()
+FIXTURE_CONTENTS = [message['content'] for message in FIXTURE_MESSAGES]
+AUTHOR_IDS = [173370163041665024 + i for i in range(USERS)]
+
+
+def fake_message(author_id, content, created_at=None, channel_id=0):
+    """
+    Builds an object exposing the attributes of `discord.Message` used by the features.
+    """
+    return SimpleNamespace(
+        author=SimpleNamespace(id=author_id, bot=False, mention=f"<@{author_id}>"),
+        content=content,
+        created_at=created_at or datetime.now(timezone.utc),
+        channel=SimpleNamespace(id=channel_id),
+    )
+
+
+def synthetic_messages(count, seed=0):
+    """
+    Generates `count` stored messages of the last 24 hours, written by `USERS` authors, with contents taken from the
+    committed fixtures (suffixed so that they don't all collide).
+    """
+    rng = random.Random(seed)
+    now = datetime.now(timezone.utc)
+    return [{
+        'author': rng.choice(AUTHOR_IDS),
+        'content': f"{rng.choice(FIXTURE_CONTENTS)} #{i % 997}",
+        'timestamp': (now - timedelta(seconds=rng.randrange(86_000))).isoformat()
+    } for i in range(count)]
+
+
+def synthetic_ical(events_count, seed=0):
+    rng = random.Random(seed)
+    start_of_week = date.today() - timedelta(days=date.today().weekday())
+    lines = ["BEGIN:VCALENDAR", "VERSION:2.0", "PRODID:-//MEE7//Benchmarks//FR"]
+    for i in range(events_count):
+        day = start_of_week + timedelta(days=rng.randrange(-28, 28))
+        hour = rng.randrange(7, 20)
+        start = datetime(day.year, day.month, day.day, hour, rng.choice((0, 30)), tzinfo=timezone.utc)
+        end = start + timedelta(minutes=rng.choice((60, 90, 120, 240)))
+        lines += ["BEGIN:VEVENT",
+                  f"UID:event-{i}@mee7",
+                  f"DTSTART:{start.strftime('%Y%m%dT%H%M%SZ')}",
+                  f"DTEND:{end.strftime('%Y%m%dT%H%M%SZ')}",
+                  f"SUMMARY:Cours {i % 40} - Aix-en-Provence | Salle {i % 12}",
+                  "END:VEVENT"]
+    lines.append("END:VCALENDAR")
+    return "\r\n".join(lines)
+
+
+@contextlib.contextmanager
+def temporary_workdir():
+    """
+    Runs the benchmark in a temporary working directory mimicking the repository layout, so that the features writing
+    their data with relative paths don't touch the committed files.
+    """
+    previous = os.getcwd()
+    with tempfile.TemporaryDirectory(prefix="mee7-bench-") as workdir:
+        for directory in ("src/ft/ft1", "src/ft/ft3", "src/ft/ft5", "user_icals"):
+            os.makedirs(os.path.join(workdir, directory))
+        with open(os.path.join(workdir, "settings.json"), "w") as f, \
+                open(os.path.join(REPO_ROOT, "settings.json"), "r") as settings:
+            f.write(settings.read())
+        os.chdir(workdir)
+        try:
+            yield workdir
+        finally:
+            os.chdir(previous)
+
+
+def messages_scales(args):
+    return FULL_MESSAGES_SCALES if args.full else MESSAGES_SCALES
+
+
+@benchmark("reports.is_spam", scales=messages_scales)
+def bench_is_spam(scale):
+    from src.ft.ft5.reports import Reports
+    reports = Reports()
+    reports.messages_data = synthetic_messages(scale)
+    reports.index_messages()
+    rng = random.Random(1)
+    # Half of the probes are repeats of stored messages, the other half are new messages.
+    probes = [fake_message(stored['author'], stored['content'])
+              for stored in rng.sample(reports.messages_data, 10)]
+    probes += [fake_message(rng.choice(AUTHOR_IDS), f"nouveau message {i}") for i in range(10)]
+
+    def run():
+        for probe in probes:
+            reports.is_spam(probe)
+
+    return run, len(probes)
+
+
+def edited(content, rng):
+    """
+    Returns a copy-paste spam variant of a message: a few characters replaced and some punctuation appended.
+    """
+    characters = list(content)
+    for _ in range(max(1, len(characters) // 40)):
+        characters[rng.randrange(len(characters))] = rng.choice("aeiouxz")
+    return "".join(characters) + rng.choice(("!!", " ?", " :)", "..."))
+
+
+@benchmark("reports.is_spam.near_duplicates", scales=messages_scales)
+def bench_is_spam_near_duplicates(scale):
+    from src.ft.ft5.reports import NearDuplicateIndex, Reports
+    reports = Reports(near_duplicates=NearDuplicateIndex())
+    reports.messages_data = synthetic_messages(scale)
+    reports.index_messages()
+    rng = random.Random(5)
+    # Half of the probes are edited repeats of stored messages, the other half are new messages.
+    probes = [fake_message(stored['author'], edited(stored['content'], rng))
+              for stored in rng.sample(reports.messages_data, 10)]
+    probes += [fake_message(rng.choice(AUTHOR_IDS), f"{rng.choice(FIXTURE_CONTENTS)} nouveau {i}") for i in range(10)]
+
+    def run():
+        # The probes have no ID: each call gets a fresh analysis, so the signature is computed every time.
+        for probe in probes:
+            reports.is_spam(probe)
+
+    return run, len(probes)
+
+
+@benchmark("reports.save_messages", scales=messages_scales)
+def bench_save_messages(scale):
+    from src.ft.ft5.reports import Reports
+    reports = Reports()
+    reports.messages_data = synthetic_messages(scale)
+    reports.compact_messages()
+    rng = random.Random(4)
+    # A minute of an active channel: 100 new messages are journaled on top of the day's messages.
+    new_messages = [fake_message(rng.choice(AUTHOR_IDS), f"nouveau message {i}") for i in range(100)]
+
+    def run():
+        for message in new_messages:
+            reports.add_message(message)
+        reports.save_messages()
+
+    return run, 1
+
+
+@benchmark("reports.compact_messages", scales=messages_scales)
+def bench_compact_messages(scale):
+    from src.ft.ft5.reports import Reports
+    reports = Reports()
+    reports.messages_data = synthetic_messages(scale)
+    return reports.compact_messages, 1
+
+
+@benchmark("reports.load_messages", scales=messages_scales)
+def bench_load_messages(scale):
+    from src.ft.ft5.reports import Reports
+    reports = Reports()
+    # The messages of a day file are in arrival order.
+    messages = sorted(synthetic_messages(scale), key=lambda message: message['timestamp'])
+    # Most of the day's messages are in the snapshot, the last hour in the journal.
+    reports.messages_data = messages[:scale * 23 // 24]
+    reports.compact_messages()
+    reports.messages_data = messages
+    reports.pending = messages[scale * 23 // 24:]
+    reports.save_messages()
+    return reports.load_messages, 1
+
+
+@benchmark("warnings.add_warning", scales=(USERS,))
+def bench_add_warning(scale):
+    from src.ft.ft3.warnings import Warnings
+    warnings = Warnings()
+    rng = random.Random(2)
+    user_ids = [rng.choice(AUTHOR_IDS[:scale]) for _ in range(200)]
+
+    def run():
+        for user_id in user_ids:
+            warnings.add_warning(user_id)
+        warnings.flush()
+
+    return run, len(user_ids)
+
+
+@benchmark("warnings.get_all_warnings", scales=(USERS,))
+def bench_get_all_warnings(scale):
+    from src.ft.ft3.warnings import Warnings
+    warnings = Warnings()
+    rng = random.Random(3)
+    fixture_warnings = load_fixture_warnings()
+    for user_id in AUTHOR_IDS[:scale]:
+        warnings.warnings.set(str(user_id), fixture_warnings.get(str(user_id), rng.randrange(1, 50)))
+    warnings.save_warnings()
+
+    def run():
+        for _ in range(100):
+            warnings.get_all_warnings()
+
+    return run, 100
+
+
+@benchmark("warnings.get_all_warnings.sqlite", scales=(USERS,))
+def bench_get_all_warnings_sqlite(scale):
+    from src.ft.ft3.warnings import Warnings
+    from src.utilities.store import EventStore
+    store = EventStore("mee7.db")
+    rng = random.Random(3)
+    fixture_warnings = load_fixture_warnings()
+    for user_id in AUTHOR_IDS[:scale]:
+        store.add_warning(user_id, date.today().isoformat(), fixture_warnings.get(str(user_id), rng.randrange(1, 50)))
+    warnings = Warnings(store=store)
+
+    def run():
+        for _ in range(100):
+            warnings.get_all_warnings()
+
+    return run, 100
+
+
+@benchmark("warnings.get_history", scales=(365, 3_650))
+def bench_get_history(scale):
+    from src.ft.ft3.history import WarningHistory
+    history = WarningHistory()
+    rng = random.Random(7)
+    # `scale` days of history, a few warnings per day.
+    today = date.today()
+    for offset in range(scale):
+        for _ in range(rng.randrange(5)):
+            history.add(str(rng.choice(AUTHOR_IDS)), today - timedelta(days=offset))
+
+    def run():
+        for granularity in ("day", "week", "month"):
+            history.query(today - timedelta(days=365), today, granularity)
+
+    return run, 3
+
+
+@benchmark("planning.parse_ical_content", scales=(100, 1_000))
+def bench_parse_ical_content(scale):
+    from src.ft.ft2.planning import parse_ical_content
+    ical_content = synthetic_ical(scale)
+    return lambda: parse_ical_content(ical_content), 1
+
+
+@benchmark("planning.check_availability", scales=(100, 1_000))
+def bench_check_availability(scale):
+    from src.ft.ft2.planning import parse_ical_content, check_availability
+    events = parse_ical_content(synthetic_ical(scale))
+    start_of_week = date.today() - timedelta(days=date.today().weekday())
+
+    def run():
+        for _ in range(100):
+            check_availability(events, start_of_week)
+
+    return run, 100
+
+
+@benchmark("planning.aggregate_weekly_events", scales=(10, 100))
+def bench_aggregate_weekly_events(scale):
+    from src.ft.ft2.planning import aggregate_weekly_events
+    for i, user_id in enumerate(AUTHOR_IDS[:scale]):
+        with open(f"user_icals/{user_id}.json", "w") as f:
+            json.dump({"user_id": user_id, "ical_content": synthetic_ical(50, seed=i)}, f)
+    return aggregate_weekly_events, 1
+
+
+@benchmark("flood_control.allow", scales=(10_000,))
+def bench_flood_control(scale):
+    from src.utilities.flood_control import FloodControl
+    rng = random.Random(6)
+    # More authors than buckets, so that the LRU eviction runs too.
+    flood_control = FloodControl(max_buckets=scale // 2)
+    messages = [fake_message(rng.randrange(scale), "message", channel_id=rng.randrange(10)) for _ in range(scale)]
+
+    def run():
+        for message in messages:
+            flood_control.allow(message)
+
+    return run, len(messages)
+
+
+@benchmark("profanity.contains_profanity", scales=(1_000,))
+def bench_contains_profanity(scale):
+    from better_profanity import profanity
+    profanity.load_censor_words()
+    contents = [message['content'] for message in synthetic_messages(scale)]
+
+    def run():
+        for content in contents:
+            profanity.contains_profanity(content)
+
+    return run, len(contents)
+
+
+@benchmark("profanity.matcher", scales=(1_000, 10_000))
+def bench_profanity_matcher(scale):
+    from src.ft.ft3.matcher import ProfanityMatcher
+    # Same messages as profanity.contains_profanity, with the French wordlist on top of the English one.
+    matcher = ProfanityMatcher.from_wordlists(["better_profanity",
+                                               os.path.join(REPO_ROOT, "src/ft/ft3/wordlists/fr.txt")])
+    contents = [message['content'] for message in synthetic_messages(scale)]
+
+    def run():
+        for content in contents:
+            matcher.contains_profanity(content)
+
+    return run, len(contents)
+
+
+@benchmark("sentiment.analyze_sentiments", scales=(1, 8, 32))
+def bench_analyze_sentiments(scale):
+    from src.ft.ft4.sentiments import analyze_sentiments, get_sentiment_analyzer
+    get_sentiment_analyzer()  # Load the model (downloaded on first run) outside of the measure.
+    # The same 32 messages, analyzed in batches of `scale` messages: the cost per message is the inverse throughput.
+    contents = [message['content'] for message in synthetic_messages(32)]
+
+    def run():
+        for start in range(0, len(contents), scale):
+            analyze_sentiments(contents[start:start + scale])
+
+    return run, len(contents)
+
+
+@benchmark("gpt.generate_prompt_messages", scales=messages_scales)
+def bench_generate_prompt_messages(scale):
+    from unittest import mock
+    from src.ft.ft5.gpt import GPT
+    gpt = GPT.__new__(GPT)  # Skip the constructor, which starts a Chrome driver.
+    gpt.messages = synthetic_messages(scale)
+
+    def run():
+        with mock.patch("src.ft.ft5.gpt.time.sleep"):  # Ignore the security delay.
+            gpt.generate_prompt_messages()
+
+    return run, 1
+
+
+def run_benchmark(run, repeat):
+    durations = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        run()
+        durations.append(time.perf_counter() - start)
+    return statistics.median(durations)
+
+
+def format_duration(seconds):
+    if seconds >= 1:
+        return f"{seconds:.2f}s"
+    if seconds >= 1e-3:
+        return f"{seconds * 1e3:.2f}ms"
+    return f"{seconds * 1e6:.1f}µs"
+
+
+def main():
+    parser = argparse.ArgumentParser(description="MEE7 micro-benchmarks")
+    parser.add_argument("--filter", default="", help="only run the benchmarks whose name contains this string")
+    parser.add_argument("--full", action="store_true", help="include the 1M messages scale")
+    parser.add_argument("--repeat", type=int, default=3, help="number of timed runs, the median is kept")
+    parser.add_argument("--baseline", default=BASELINE_FILE, help="path of the baseline file")
+    parser.add_argument("--save-baseline", action="store_true", help="store the results as the new baseline")
+    parser.add_argument("--tolerance", type=float, default=0.25,
+                        help="allowed slowdown relative to the baseline before reporting a regression")
+    args = parser.parse_args()
+
+    sys.path.insert(0, REPO_ROOT)
+    baseline = {}
+    if os.path.exists(args.baseline):
+        with open(args.baseline, "r") as f:
+            baseline = json.load(f)
+
+    results = {}
+    regressions = []
+    for name, scales, func in BENCHMARKS:
+        if args.filter not in name:
+            continue
+        for scale in (scales(args) if callable(scales) else scales):
+            key = name if scale is None else f"{name}[{scale}]"
+            with temporary_workdir():
+                try:
+                    run, ops = func(scale)
+                except ImportError as e:
+                    print(f"{key:<48} skipped ({e})")
+                    break
+                per_op = run_benchmark(run, args.repeat) / ops
+            results[key] = per_op
+            line = f"{key:<48} {format_duration(per_op):>10}/op"
+            if key in baseline:
+                ratio = per_op / baseline[key]
+                line += f"   baseline {format_duration(baseline[key]):>10}/op   x{ratio:.2f}"
+                if ratio > 1 + args.tolerance:
+                    line += "   REGRESSION"
+                    regressions.append(key)
+            print(line, flush=True)
+
+    if args.save_baseline:
+        baseline.update(results)
+        with open(args.baseline, "w") as f:
+            json.dump(dict(sorted(baseline.items())), f, indent=4)
+        print(f"Baseline saved to {args.baseline}")
+    elif regressions:
+        print(f"{len(regressions)} regression(s): {', '.join(regressions)}")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
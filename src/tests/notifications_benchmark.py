@@ -0,0 +1,139 @@
+# Load test of the Twitch stream notifications loop against the local stand-in (src/tests/twitch_standin.py), runnable
+# offline from the repository root:
+#   python -m src.tests.notifications_benchmark                      # 10, 1k and 10k streamers
+#   python -m src.tests.notifications_benchmark --streamers 50000 --cycles 30
+# Time is compressed by `--speedup`: with the default of 15, a 15 seconds tick of `check_streamers` lasts one second,
+# and the polling intervals, the request budget and the rate limit window are scaled accordingly. Latencies are
+# reported in real (uncompressed) seconds.
+import argparse
+import asyncio
+import sys
+import time
+from types import SimpleNamespace
+
+from src.tests.benchmarks import REPO_ROOT, temporary_workdir
+from src.tests.twitch_standin import TwitchStandIn
+from src.utilities.metrics import Histogram
+
+
+class RecordingChannel:
+    def __init__(self):
+        self.sent = 0
+
+    async def send(self, embed):
+        self.sent += 1
+        return SimpleNamespace(id=self.sent)
+
+
+async def run_scale(streamers_count, args):
+    from loguru import logger
+    from src.ft.ft1 import stream_notifications, twitch_api
+    from src.ft.ft1.profiles import UserProfileCache
+    from src.ft.ft1.scheduler import PollingScheduler
+    from src.ft.ft1.states import StreamerStates
+    logger.disable("src")
+
+    twitch_settings = stream_notifications.twitch_settings
+    tick = twitch_settings.get('poll_tick_seconds', 15) / args.speedup
+    standin = TwitchStandIn(latency=args.latency, live_ratio=args.live_ratio, churn=args.churn, churn_interval=tick,
+                            rate_limit=args.rate_limit, rate_limit_window=60 / args.speedup, seed=streamers_count)
+    runner, base_url = await standin.start()
+    twitch_api.TOKEN_URL = f"{base_url}/oauth2/token"
+    twitch_api.HELIX_API_URL = f"{base_url}/helix"
+    twitch_api.twitch_auth.client_id = twitch_api.twitch_auth.client_secret = "standin"
+    twitch_api.twitch_auth.access_token = None
+
+    # Fresh state for every scale, as if the bot started with this list of streamers.
+    stream_notifications.STREAMERS = [f"streamer{i}" for i in range(streamers_count)]
+    stream_notifications.user_profiles = UserProfileCache()
+    stream_notifications.streamer_states = StreamerStates()
+    stream_notifications.scheduler = PollingScheduler(
+        tick=tick,
+        min_interval=twitch_settings.get('min_poll_seconds', 15) / args.speedup,
+        default_interval=twitch_settings.get('default_poll_seconds', 60) / args.speedup,
+        max_interval=twitch_settings.get('max_poll_seconds', 300) / args.speedup,
+        max_requests_per_minute=twitch_settings.get('max_requests_per_minute', 60) * args.speedup,
+        batch_size=twitch_api.HELIX_MAX_VALUES,
+    )
+
+    channel = RecordingChannel()
+    bot = SimpleNamespace(get_channel=lambda channel_id: channel)
+    latencies = Histogram(window=100_000)
+    measuring = False
+    notify_discord = stream_notifications.notify_discord
+
+    async def measured_notify_discord(datas, bot):
+        live_since = standin.live_since.get(datas['streamer_data']['user_login'])
+        if measuring and live_since is not None:
+            latencies.observe((time.monotonic() - live_since) * args.speedup)
+        return await notify_discord(datas, bot)
+
+    stream_notifications.notify_discord = measured_notify_discord
+    durations = Histogram(window=100_000)
+    requests_per_cycle = []
+    try:
+        for cycle in range(args.cycles):
+            requests_before = sum(standin.requests.values())
+            start = time.perf_counter()
+            await stream_notifications.check_streamers.coro(bot)
+            duration = time.perf_counter() - start
+            durations.observe(duration)
+            requests_per_cycle.append(sum(standin.requests.values()) - requests_before)
+            # The streams live before every streamer was checked once are announced at startup, their latency isn't
+            # meaningful.
+            measuring = len(stream_notifications.scheduler.next_poll) == streamers_count
+            await asyncio.sleep(max(0.0, tick - duration))
+    finally:
+        stream_notifications.notify_discord = notify_discord
+        await runner.cleanup()
+
+    loop_duration = durations.percentiles((50, 95))
+    latency = latencies.percentiles((50, 95))
+    steady_requests = requests_per_cycle[1:] or requests_per_cycle
+    return {
+        'loop_p50': loop_duration[50],
+        'loop_p95': loop_duration[95],
+        'first_cycle_requests': requests_per_cycle[0],
+        'requests_per_cycle': sum(steady_requests) / len(steady_requests),
+        'rejected': standin.rejected,
+        'notifications': channel.sent,
+        'latency_p50': latency[50],
+        'latency_p95': latency[95],
+        'measured': latencies.count,
+    }
+
+
+async def run(args):
+    from src.ft.ft1.twitch_api import get_session
+    print(f"{'streamers':>9} {'loop p50':>9} {'loop p95':>9} {'1st cycle':>9} {'req/cycle':>9} {'429':>5} "
+          f"{'notified':>8} {'latency p50':>11} {'latency p95':>11}")
+    for streamers_count in args.streamers:
+        with temporary_workdir():
+            result = await run_scale(streamers_count, args)
+        latency = (f"{result['latency_p50']:>10.1f}s {result['latency_p95']:>10.1f}s" if result['measured']
+                   else f"{'n/a':>11} {'n/a':>11}")
+        print(f"{streamers_count:>9} {result['loop_p50'] * 1e3:>7.1f}ms {result['loop_p95'] * 1e3:>7.1f}ms "
+              f"{result['first_cycle_requests']:>9} {result['requests_per_cycle']:>9.2f} {result['rejected']:>5} "
+              f"{result['notifications']:>8} {latency}", flush=True)
+    await (await get_session()).close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="MEE7 stream notifications load test")
+    parser.add_argument("--streamers", type=int, nargs="+", default=[10, 1_000, 10_000],
+                        help="numbers of streamers to check")
+    parser.add_argument("--cycles", type=int, default=20, help="number of ticks of the notifications loop per scale")
+    parser.add_argument("--speedup", type=float, default=15, help="time compression factor")
+    parser.add_argument("--latency", type=float, default=0.05, help="delay of every stand-in response, in seconds")
+    parser.add_argument("--live-ratio", type=float, default=0.1, help="probability for a streamer to be live")
+    parser.add_argument("--churn", type=float, default=0.02,
+                        help="fraction of the streamers whose state is drawn again at every tick")
+    parser.add_argument("--rate-limit", type=int, default=800, help="stand-in requests allowed per (real) minute")
+    args = parser.parse_args()
+
+    sys.path.insert(0, REPO_ROOT)
+    asyncio.run(run(args))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,89 @@
+# Comparison of the inference backends of the sentiment model (src/ft/ft4/sentiments.py) on the committed French
+# message fixtures, from the repository root:
+#   python -m src.tests.sentiment_backends
+#   python -m src.tests.sentiment_backends --backends pytorch quantized --messages 500
+# Every backend runs in its own process, so that the memory of one model doesn't count for the next one. Reported:
+# the load time, the peak RSS, the latency of one message, the cost per message in batches of 8, and the agreement of
+# the labels with the PyTorch backend.
+import argparse
+import multiprocessing
+import resource
+import statistics
+import sys
+import time
+from queue import Empty
+
+from src.tests.benchmarks import FIXTURE_CONTENTS, REPO_ROOT
+
+
+def measure(backend, contents, queue):
+    sys.path.insert(0, REPO_ROOT)
+    import transformers  # noqa: F401 - imported first, so that the library doesn't count in the model memory
+    from src.ft.ft4.sentiments import analyze_sentiments, get_sentiment_analyzer
+    rss_before = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    start = time.perf_counter()
+    get_sentiment_analyzer(backend)
+    load_seconds = time.perf_counter() - start
+
+    latencies = []
+    for content in contents[:50]:
+        start = time.perf_counter()
+        analyze_sentiments([content], backend)
+        latencies.append(time.perf_counter() - start)
+    scores = []
+    start = time.perf_counter()
+    for index in range(0, len(contents), 8):
+        scores.extend(result['compound'] for result in analyze_sentiments(contents[index:index + 8], backend))
+    batched_seconds = (time.perf_counter() - start) / len(contents)
+    rss_after = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    queue.put({
+        'load_seconds': load_seconds,
+        'rss_mb': (rss_after - rss_before) / 1024,  # ru_maxrss is in KB on Linux
+        'latency_ms': statistics.median(latencies) * 1000,
+        'batched_ms': batched_seconds * 1000,
+        'scores': scores,
+    })
+
+
+def main():
+    from src.ft.ft4.sentiments import BACKENDS, PYTORCH
+
+    parser = argparse.ArgumentParser(description="MEE7 sentiment backends comparison")
+    parser.add_argument("--backends", nargs="+", default=list(BACKENDS), choices=BACKENDS,
+                        help="backends to compare, the first one is the reference of the agreement")
+    parser.add_argument("--messages", type=int, default=200, help="number of fixture messages to analyze")
+    args = parser.parse_args()
+
+    contents = FIXTURE_CONTENTS[:args.messages]
+    context = multiprocessing.get_context("spawn")
+    results = {}
+    for backend in args.backends:
+        queue = context.Queue()
+        process = context.Process(target=measure, args=(backend, contents, queue))
+        process.start()
+        # The result is read before joining: a child blocks on exit until its queued result, larger than the pipe
+        # buffer, has been read.
+        result = None
+        while result is None and (process.is_alive() or not queue.empty()):
+            try:
+                result = queue.get(timeout=1)
+            except Empty:
+                pass
+        process.join()
+        if result is None:
+            print(f"{backend:<10} failed (exit code {process.exitcode}), see the error above")
+            continue
+        results[backend] = result
+
+    reference = results.get(PYTORCH) or next(iter(results.values()), None)
+    print(f"{len(contents)} fixture messages")
+    print(f"{'backend':<10} {'load':>8} {'RSS':>9} {'1 message':>11} {'batch of 8':>12} {'agreement':>10} {'MAE':>6}")
+    for backend, result in results.items():
+        agreement = statistics.mean(a == b for a, b in zip(result['scores'], reference['scores']))
+        error = statistics.mean(abs(a - b) for a, b in zip(result['scores'], reference['scores']))
+        print(f"{backend:<10} {result['load_seconds']:>7.1f}s {result['rss_mb']:>6.0f} MB "
+              f"{result['latency_ms']:>8.1f} ms {result['batched_ms']:>6.1f} ms/msg {agreement:>9.1%} {error:>6.3f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,61 @@
+# Behaviour tests of the archive of the past days (src/ft/ft5/archive.py), from the repository root:
+#   python -m pytest src/tests/test_archive.py
+from datetime import date, datetime, timezone
+
+import pytest
+
+from src.ft.ft5.archive import MessageArchive
+
+
+def stored(author, content, timestamp):
+    return {'author': author, 'channel': 1, 'content': content, 'timestamp': timestamp}
+
+
+@pytest.fixture
+def archive(tmp_path):
+    archive = MessageArchive(directory=str(tmp_path / "archive"), retention_days=30)
+    archive.archive_day("07162024", [stored(1, "hello", "2024-07-16T09:00:00+00:00"),
+                                     stored(2, "salut", "2024-07-16T18:00:00+00:00")])
+    archive.archive_day("07172024", [stored(1, "again", "2024-07-17T10:00:00+00:00")])
+    return archive
+
+
+def test_index(archive):
+    assert archive.days() == ["07162024", "07172024"]
+    assert archive.index("07162024") == {'count': 2, 'authors': [1, 2], 'first': "2024-07-16T09:00:00+00:00",
+                                         'last': "2024-07-16T18:00:00+00:00"}
+    assert archive.index("07182024") is None
+
+
+def test_query(archive):
+    assert [m['content'] for m in archive.query()] == ["hello", "salut", "again"]
+    assert [m['content'] for m in archive.query(author=1)] == ["hello", "again"]
+    assert [m['content'] for m in archive.query(start=datetime(2024, 7, 16, 12, tzinfo=timezone.utc),
+                                                end=datetime(2024, 7, 17, 9, tzinfo=timezone.utc))] == ["salut"]
+
+
+def test_query_skips_the_partitions_excluded_by_their_index(archive, monkeypatch):
+    opened = []
+    read_day = archive.read_day
+    monkeypatch.setattr(archive, "read_day", lambda day: opened.append(day) or read_day(day))
+    archive.query(start=datetime(2024, 7, 17, tzinfo=timezone.utc))
+    archive.query(author=2)
+    assert opened == ["07172024", "07162024"]
+
+
+def test_archiving_a_day_again_merges_without_duplicates(archive):
+    archive.archive_day("07162024", [stored(2, "salut", "2024-07-16T18:00:00+00:00"),
+                                     stored(3, "late", "2024-07-16T23:59:00+00:00")])
+    assert [m['content'] for m in archive.read_day("07162024")] == ["hello", "salut", "late"]
+    assert archive.index("07162024")['count'] == 3
+
+
+def test_retention(archive):
+    assert archive.apply_retention(date(2024, 8, 16)) == ["07162024"]
+    assert archive.days() == ["07172024"]
+    assert archive.read_day("07162024") == []
+    assert archive.apply_retention(date(2024, 8, 16)) == []
+
+
+def test_no_retention():
+    assert MessageArchive(directory="unused", retention_days=None).apply_retention(date(2030, 1, 1)) == []
@@ -0,0 +1,65 @@
+# Behaviour tests of the profanity matcher (src/ft/ft3/matcher.py), with the wordlists of settings.json, from the
+# repository root:
+#   python -m pytest src/tests/test_matcher.py
+import os
+
+import pytest
+
+from src.ft.ft3.matcher import ProfanityMatcher
+
+REPO_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), "../.."))
+
+
+@pytest.fixture(scope="module")
+def matcher():
+    return ProfanityMatcher.from_wordlists(["better_profanity", os.path.join(REPO_ROOT, "src/ft/ft3/wordlists/fr.txt")])
+
+
+@pytest.mark.parametrize("text", [
+    "good job",
+    "it's so good",
+    "I need to assess the situation",
+    "what a class",
+    "un bon conseil",
+    "il habite à Aix",
+    "les tests passent",
+    "rendez-vous à 455",
+    "take a bite",
+    "pros and cons",
+    "a con artist",
+    "le PDF est en ligne",
+    "une tapette à mouches",
+    "",
+])
+def test_clean_messages(matcher, text):
+    assert not matcher.contains_profanity(text)
+    assert matcher.find(text) == []
+
+
+@pytest.mark.parametrize("text, word", [
+    ("oh merde", "merde"),
+    ("MERDE!", "merde"),
+    ("m3rde", "merde"),
+    ("enculé", "encule"),
+    ("puuuutain", "putain"),
+    ("connnnard", "connard"),
+    ("fils de pute", "fils de pute"),
+    ("espèce de con", "espece de con"),
+    ("what the fuck", "fuck"),
+    ("sh1t", "shit"),
+])
+def test_profanities(matcher, text, word):
+    assert matcher.contains_profanity(text)
+    assert word in matcher.find(text)
+
+
+def test_words_are_matched_whole(matcher):
+    assert matcher.find("connerie de conseil") == []
+    assert matcher.find("sale con") == ["sale con"]
+    assert matcher.find("con") == []
+
+
+def test_matches_made_of_digits_are_ignored():
+    matcher = ProfanityMatcher(["ass"])
+    assert not matcher.contains_profanity("455")
+    assert matcher.contains_profanity("a55")
@@ -0,0 +1,122 @@
+# Behaviour tests of the daily reports (src/ft/ft5/reports.py): journal and snapshot replay, midnight rollover and
+# archiving of the past days, from the repository root:
+#   python -m pytest src/tests/test_reports.py
+import os
+from datetime import datetime, timezone
+from types import SimpleNamespace
+
+import pytest
+
+from src.ft.ft5 import reports as reports_module
+from src.ft.ft5.archive import MessageArchive
+from src.ft.ft5.reports import Reports
+from src.utilities.store import EventStore
+
+
+def fake_message(author_id, content, created_at=None, channel_id=1):
+    return SimpleNamespace(author=SimpleNamespace(id=author_id), channel=SimpleNamespace(id=channel_id),
+                           content=content, created_at=created_at or datetime.now(timezone.utc))
+
+
+@pytest.fixture
+def workdir(tmp_path, monkeypatch):
+    # The reports write their daily files relative to the working directory.
+    os.makedirs(tmp_path / "src/ft/ft5")
+    monkeypatch.chdir(tmp_path)
+    return tmp_path
+
+
+def new_reports(workdir):
+    return Reports(archive=MessageArchive(directory=str(workdir / "archive")))
+
+
+def contents(messages):
+    return [message['content'] for message in messages]
+
+
+def test_journal_is_replayed_on_top_of_the_snapshot(workdir):
+    reports = new_reports(workdir)
+    reports.add_message(fake_message(1, "first"))
+    reports.compact_messages()
+    reports.add_message(fake_message(2, "second"))
+    reports.save_messages()
+
+    assert contents(new_reports(workdir).get_messages()) == ["first", "second"]
+
+
+def test_crash_between_snapshot_replacement_and_journal_truncation(workdir):
+    reports = new_reports(workdir)
+    reports.add_message(fake_message(1, "first"))
+    reports.add_message(fake_message(2, "second"))
+    reports.save_messages()
+    with open(reports.journal_path(), "r") as f:
+        journal = f.read()
+    reports.compact_messages()
+    # The bot stopped right after replacing the snapshot: the journal still holds the compacted messages.
+    with open(reports.journal_path(), "w") as f:
+        f.write(journal)
+
+    reloaded = new_reports(workdir)
+    assert contents(reloaded.get_messages()) == ["first", "second"]
+    assert reloaded.is_spam(fake_message(1, "first"))
+
+
+def test_truncated_journal_line_is_ignored(workdir):
+    reports = new_reports(workdir)
+    reports.add_message(fake_message(1, "first"))
+    reports.save_messages()
+    with open(reports.journal_path(), "a") as f:
+        f.write('{"author": 2, "cont')
+
+    reloaded = new_reports(workdir)
+    assert contents(reloaded.get_messages()) == ["first"]
+    # The journal was compacted, so the next messages aren't appended to the truncated line.
+    reloaded.add_message(fake_message(3, "third"))
+    reloaded.save_messages()
+    assert contents(new_reports(workdir).get_messages()) == ["first", "third"]
+
+
+def test_rollover_without_restart(workdir, monkeypatch):
+    monkeypatch.setattr(reports_module, "get_current_date_formatted", lambda: "07162024")
+    reports = new_reports(workdir)
+    reports.add_message(fake_message(1, "before midnight"))
+    reports.save_messages()
+    reports.add_message(fake_message(2, "still the same day"))
+
+    monkeypatch.setattr(reports_module, "get_current_date_formatted", lambda: "07172024")
+    reports.add_message(fake_message(3, "after midnight"))
+    assert contents(reports.get_messages()) == ["after midnight"]
+    reports.save_messages()
+
+    # The past day, including its message never journaled, is archived and its files removed.
+    assert contents(reports.archive.read_day("07162024")) == ["before midnight", "still the same day"]
+    assert not os.path.exists(reports.snapshot_path("07162024"))
+    assert not os.path.exists(reports.journal_path("07162024"))
+    assert contents(new_reports(workdir).get_messages()) == ["after midnight"]
+
+
+def test_past_days_left_on_disk_are_archived_once(workdir, monkeypatch):
+    monkeypatch.setattr(reports_module, "get_current_date_formatted", lambda: "07162024")
+    reports = new_reports(workdir)
+    reports.add_message(fake_message(1, "left behind"))
+    reports.save_messages()
+
+    monkeypatch.setattr(reports_module, "get_current_date_formatted", lambda: "07172024")
+    new_reports(workdir)
+    new_reports(workdir)
+    assert contents(MessageArchive(directory=str(workdir / "archive")).read_day("07162024")) == ["left behind"]
+
+
+def test_rollover_with_the_event_store(workdir, monkeypatch):
+    monkeypatch.setattr(reports_module, "get_current_date_formatted", lambda: "07162024")
+    store = EventStore(str(workdir / "mee7.db"))
+    reports = Reports(archive=MessageArchive(directory=str(workdir / "archive")), store=store)
+    reports.add_message(fake_message(1, "before midnight"))
+
+    monkeypatch.setattr(reports_module, "get_current_date_formatted", lambda: "07172024")
+    reports.add_message(fake_message(2, "after midnight"))
+    reports.save_messages()
+
+    assert contents(store.messages("2024-07-16")) == ["before midnight"]
+    assert contents(store.messages("2024-07-17")) == ["after midnight"]
+    store.close()
@@ -0,0 +1,67 @@
+# Behaviour tests of the SQLite event store (src/utilities/store.py), from the repository root:
+#   python -m pytest src/tests/test_store.py
+import gzip
+import json
+import os
+
+import pytest
+
+from src.utilities.store import UNKNOWN_DAY, EventStore
+
+
+@pytest.fixture
+def workdir(tmp_path, monkeypatch):
+    # The migration reads the JSON files relative to the working directory.
+    for directory in ("src/ft/ft5/archive", "src/ft/ft3", "user_icals"):
+        os.makedirs(tmp_path / directory)
+    with open(tmp_path / "src/ft/ft5/messages_07172024.json", "w") as f:
+        json.dump([{'author': 1, 'channel': 5, 'content': "snapshot", 'timestamp': "2024-07-17T10:00:00+00:00"}], f)
+    with open(tmp_path / "src/ft/ft5/messages_07172024.jsonl", "w") as f:
+        f.write(json.dumps({'author': 2, 'channel': 5, 'content': "journal",
+                            'timestamp': "2024-07-17T11:00:00+00:00"}) + "\n")
+    with gzip.open(tmp_path / "src/ft/ft5/archive/messages_07162024.jsonl.gz", "wt", encoding="utf-8") as f:
+        f.write(json.dumps({'author': 1, 'channel': 5, 'content': "archived",
+                            'timestamp': "2024-07-16T10:00:00+00:00"}) + "\n")
+    with open(tmp_path / "src/ft/ft3/warnings_07162024.json", "w") as f:
+        json.dump({"1": 2}, f)
+    with open(tmp_path / "src/ft/ft3/warnings.json", "w") as f:
+        json.dump({"1": 5}, f)
+    with open(tmp_path / "user_icals/1.json", "w") as f:
+        json.dump({'user_id': 1, 'ical_content': "BEGIN:VCALENDAR"}, f)
+    monkeypatch.chdir(tmp_path)
+    return tmp_path
+
+
+@pytest.fixture
+def store(workdir):
+    store = EventStore(str(workdir / "mee7.db"))
+    yield store
+    store.close()
+
+
+def test_migrate_json_files(store):
+    assert store.migrate_json_files() == {'messages': 3, 'warnings': 2, 'user_icals': 1}
+    assert [m['content'] for m in store.messages("2024-07-16")] == ["archived"]
+    assert [m['content'] for m in store.messages("2024-07-17")] == ["snapshot", "journal"]
+    # The warnings of warnings.json missing from the daily files are kept, on an unknown day.
+    assert store.user_warnings(1) == 5
+    assert store.top_warnings(day=UNKNOWN_DAY) == {"1": 3}
+    assert store.user_ical(1) == "BEGIN:VCALENDAR"
+
+
+def test_migrate_json_files_is_idempotent(store, workdir):
+    store.migrate_json_files()
+    assert store.migrate_json_files() is None
+    reopened = EventStore(str(workdir / "mee7.db"))
+    assert reopened.migrate_json_files() is None
+    reopened.close()
+    assert len(store.messages("2024-07-17")) == 2
+    assert store.user_warnings(1) == 5
+
+
+def test_delete_messages_before(store):
+    store.add_messages([{'day': "2024-07-15", 'author': 1, 'content': "old", 'timestamp': "2024-07-15T10:00:00"},
+                        {'day': "2024-07-16", 'author': 1, 'content': "kept", 'timestamp': "2024-07-16T10:00:00"}])
+    store.delete_messages_before("2024-07-16")
+    assert store.messages("2024-07-15") == []
+    assert [m['content'] for m in store.messages("2024-07-16")] == ["kept"]
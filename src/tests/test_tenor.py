@@ -0,0 +1,60 @@
+# Behaviour tests of the Tenor client (src/ft/ft4/tenor.py), without network, from the repository root:
+#   python -m pytest src/tests/test_tenor.py
+import asyncio
+
+import pytest
+
+from src.ft.ft4.tenor import TenorClient
+
+
+def client_with(request):
+    client = TenorClient(api_key="key", client_key="client")
+    calls = []
+
+    async def fake_request(query):
+        calls.append(query)
+        await asyncio.sleep(0.01)  # Lets the other searches join the request in flight.
+        return request(query)
+
+    client._request = fake_request
+    return client, calls
+
+
+async def search_twice(client, query):
+    return await asyncio.gather(client.search(query), client.search(query.upper()))
+
+
+def test_concurrent_searches_share_one_request():
+    client, calls = client_with(lambda query: ["https://tenor/a.gif"])
+    assert asyncio.run(search_twice(client, "chat")) == [["https://tenor/a.gif"], ["https://tenor/a.gif"]]
+    assert calls == ["chat"]
+    assert asyncio.run(client.search("chat")) == ["https://tenor/a.gif"]
+    assert calls == ["chat"]
+
+
+def test_a_failed_request_fails_every_waiter_without_cancelling_them():
+    def fail(query):
+        raise KeyError('media_formats')
+
+    client, calls = client_with(fail)
+    assert asyncio.run(search_twice(client, "chat")) == [[], []]
+    assert client.in_flight == {}
+    # A failed search isn't cached.
+    asyncio.run(client.search("chat"))
+    assert calls == ["chat", "chat"]
+
+
+def test_cancelling_the_request_cancels_the_waiters():
+    client, _ = client_with(lambda query: ["https://tenor/a.gif"])
+
+    async def cancel_first():
+        first = asyncio.create_task(client.search("chat"))
+        await asyncio.sleep(0)
+        second = asyncio.create_task(client.search("chat"))
+        await asyncio.sleep(0)
+        first.cancel()
+        return await asyncio.gather(first, second, return_exceptions=True)
+
+    results = asyncio.run(cancel_first())
+    assert all(isinstance(result, asyncio.CancelledError) for result in results)
+    assert client.in_flight == {}
@@ -0,0 +1,201 @@
+# Local stand-in of the Twitch API endpoints used by the stream notifications, to load-test them without Twitch:
+#   python -m src.tests.twitch_standin --port 8081 --latency 0.05 --live-ratio 0.1
+# then start the bot with TWITCH_TOKEN_URL=http://127.0.0.1:8081/oauth2/token and
+# TWITCH_HELIX_API_URL=http://127.0.0.1:8081/helix (any TWITCH_CLIENT_ID and TWITCH_CLIENT_SECRET are accepted).
+import argparse
+import asyncio
+import random
+import secrets
+import time
+import zlib
+from datetime import datetime, timezone
+
+from aiohttp import web
+
+GAMES = ["Just Chatting", "Rocket League", "League of Legends", "Valorant", "Minecraft", "Squad Busters"]
+
+
+class TwitchStandIn:
+    def __init__(self, latency=0.0, live_ratio=0.1, churn=0.05, churn_interval=1.0, rate_limit=800,
+                 rate_limit_window=60.0, token_ttl=3600, seed=0):
+        """
+        Simulates `/oauth2/token`, `/helix/streams` and `/helix/users`.
+
+        Every login is a valid user whose ID is derived from the login. A streamer is live with probability
+        `live_ratio`: every `churn_interval` seconds, a fraction `churn` of the streamers is drawn again, the ones going
+        live getting a new stream ID. The churn runs in a background task on wall-clock ticks, independently of the
+        requests, so a stream starts between two polls like on Twitch and the notification latency is measurable. Requests are delayed by `latency` seconds and limited to `rate_limit` points per
+        `rate_limit_window` seconds like Helix (one point per request, `Ratelimit-*` headers, 429 when exhausted).
+
+        Args:
+            latency (float): The delay of every response, in seconds.
+            live_ratio (float): The probability for a streamer to be live.
+            churn (float): The fraction of the streamers whose state is drawn again at every churn step.
+            churn_interval (float): The number of seconds between two churn steps.
+            rate_limit (int): The number of requests allowed per window.
+            rate_limit_window (float): The duration of the rate limit window, in seconds.
+            token_ttl (int): The lifetime of the access tokens, in seconds.
+            seed (int): The seed of the random live sets.
+        """
+        self.latency = latency
+        self.live_ratio = live_ratio
+        self.churn = churn
+        self.churn_interval = churn_interval
+        self.rate_limit = rate_limit
+        self.rate_limit_window = rate_limit_window
+        self.token_ttl = token_ttl
+        self.rng = random.Random(seed)
+        self.tokens = {}  # access token -> expiration (monotonic)
+        self.streams = {}  # login -> stream data, for the live streamers
+        self.live_since = {}  # login -> time.monotonic() when the current stream started
+        self.known_logins = set()
+        self.users_by_id = {}
+        self.window_start = time.monotonic()
+        self.points = rate_limit
+        self.requests = {}  # endpoint -> number of requests
+        self.rejected = 0  # number of 429 responses
+        self.next_stream_id = 40_000_000_000
+
+    def app(self):
+        app = web.Application()
+        app.router.add_post("/oauth2/token", self.token)
+        app.router.add_get("/helix/streams", self.helix_streams)
+        app.router.add_get("/helix/users", self.helix_users)
+        app.cleanup_ctx.append(self._churn_context)
+        return app
+
+    async def _churn_context(self, app):
+        task = asyncio.create_task(self._churn_loop(), name="standin-churn")
+        yield
+        task.cancel()
+
+    def user(self, login):
+        user_id = str(zlib.crc32(login.encode()) + 100_000_000)
+        if user_id not in self.users_by_id:
+            self.users_by_id[user_id] = {
+                'id': user_id, 'login': login, 'display_name': login.capitalize(), 'type': '', 'broadcaster_type': '',
+                'description': f"Stand-in user {login}", 'view_count': 0, 'created_at': "2016-01-01T00:00:00Z",
+                'profile_image_url': f"https://static-cdn.jtvnw.net/jtv_user_pictures/{login}-profile_image-300x300.png",
+                'offline_image_url': '',
+            }
+        return self.users_by_id[user_id]
+
+    def _go_live(self, login):
+        user = self.user(login)
+        self.next_stream_id += 1
+        self.streams[login] = {
+            'id': str(self.next_stream_id), 'user_id': user['id'], 'user_login': login,
+            'user_name': user['display_name'], 'game_id': '0', 'game_name': self.rng.choice(GAMES), 'type': 'live',
+            'title': f"Stream #{self.next_stream_id}", 'viewer_count': self.rng.randrange(1, 5000),
+            'started_at': datetime.now(timezone.utc).strftime("%Y-%m-%dT%H:%M:%SZ"), 'language': 'fr',
+            'thumbnail_url': '', 'tag_ids': [], 'tags': [], 'is_mature': False,
+        }
+        self.live_since[login] = time.monotonic()
+
+    def _draw(self, login):
+        if self.rng.random() < self.live_ratio:
+            if login not in self.streams:
+                self._go_live(login)
+        else:
+            self.streams.pop(login, None)
+            self.live_since.pop(login, None)
+
+    def _discover(self, logins):
+        # The first time a streamer is requested, its initial state is drawn.
+        for login in logins:
+            if login not in self.known_logins:
+                self.known_logins.add(login)
+                self._draw(login)
+
+    async def _churn_loop(self):
+        next_churn = time.monotonic() + self.churn_interval
+        while True:
+            await asyncio.sleep(max(0.0, next_churn - time.monotonic()))
+            next_churn += self.churn_interval
+            logins = list(self.known_logins)
+            for login in self.rng.sample(logins, int(len(logins) * self.churn)):
+                self._draw(login)
+
+    def _rate_limit_headers(self):
+        now = time.monotonic()
+        if now - self.window_start >= self.rate_limit_window:
+            self.window_start = now
+            self.points = self.rate_limit
+        reset = int(time.time() + self.rate_limit_window - (now - self.window_start))
+        return {'Ratelimit-Limit': str(self.rate_limit), 'Ratelimit-Remaining': str(max(self.points, 0)),
+                'Ratelimit-Reset': str(reset)}
+
+    async def _helix(self, request, endpoint):
+        await asyncio.sleep(self.latency)
+        self.requests[endpoint] = self.requests.get(endpoint, 0) + 1
+        token = request.headers.get('Authorization', '').removeprefix('Bearer ')
+        if self.tokens.get(token, 0) < time.monotonic() or not request.headers.get('Client-ID'):
+            return web.json_response({'error': 'Unauthorized', 'status': 401, 'message': 'Invalid OAuth token'},
+                                     status=401)
+        headers = self._rate_limit_headers()
+        if self.points <= 0:
+            self.rejected += 1
+            return web.json_response({'error': 'Too Many Requests', 'status': 429, 'message': ''}, status=429,
+                                     headers=headers)
+        self.points -= 1
+        headers['Ratelimit-Remaining'] = str(self.points)
+        return headers
+
+    async def token(self, request):
+        await asyncio.sleep(self.latency)
+        self.requests['token'] = self.requests.get('token', 0) + 1
+        data = await request.post()
+        if not data.get('client_id') or not data.get('client_secret'):
+            return web.json_response({'status': 400, 'message': 'missing client id'}, status=400)
+        access_token = secrets.token_hex(15)
+        self.tokens[access_token] = time.monotonic() + self.token_ttl
+        return web.json_response({'access_token': access_token, 'expires_in': self.token_ttl, 'token_type': 'bearer'})
+
+    async def helix_streams(self, request):
+        headers = await self._helix(request, 'streams')
+        if isinstance(headers, web.Response):
+            return headers
+        logins = [login.lower() for login in request.query.getall('user_login', [])][:100]
+        self._discover(logins)
+        data = [self.streams[login] for login in logins if login in self.streams]
+        return web.json_response({'data': data, 'pagination': {}}, headers=headers)
+
+    async def helix_users(self, request):
+        headers = await self._helix(request, 'users')
+        if isinstance(headers, web.Response):
+            return headers
+        users = [self.user(login.lower()) for login in request.query.getall('login', [])]
+        users += [self.users_by_id[user_id] for user_id in request.query.getall('id', []) if user_id in self.users_by_id]
+        return web.json_response({'data': users[:100]}, headers=headers)
+
+    async def start(self, host="127.0.0.1", port=0):
+        """
+        Starts serving in the running event loop.
+
+        Returns:
+            tuple: The `web.AppRunner` (to clean it up) and the base URL of the stand-in.
+        """
+        runner = web.AppRunner(self.app())
+        await runner.setup()
+        site = web.TCPSite(runner, host, port)
+        await site.start()
+        port = site._server.sockets[0].getsockname()[1]
+        return runner, f"http://{host}:{port}"
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Local stand-in of the Twitch API")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8081)
+    parser.add_argument("--latency", type=float, default=0.05, help="delay of every response, in seconds")
+    parser.add_argument("--live-ratio", type=float, default=0.1, help="probability for a streamer to be live")
+    parser.add_argument("--churn", type=float, default=0.01, help="fraction of the streamers drawn again every second")
+    parser.add_argument("--rate-limit", type=int, default=800, help="requests allowed per minute")
+    args = parser.parse_args()
+    standin = TwitchStandIn(latency=args.latency, live_ratio=args.live_ratio, churn=args.churn,
+                            rate_limit=args.rate_limit)
+    web.run_app(standin.app(), host=args.host, port=args.port)
+
+
+if __name__ == "__main__":
+    main()
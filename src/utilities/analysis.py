@@ -0,0 +1,102 @@
+from collections import OrderedDict
+from functools import cached_property
+
+from src.utilities.metrics import metrics
+from src.utilities.settings import Settings
+
+
+def normalize(content):
+    # Messages only differing by their case or their whitespace are considered identical.
+    return " ".join(content.casefold().split())
+
+
+class MessageAnalysis:
+    def __init__(self, content):
+        """
+        The artifacts derived from the content of one message, each computed on first use and then shared by every
+        feature handling the message.
+
+        Nothing is computed when the analysis is created: a message only pays for the artifacts the enabled features
+        actually read. The artifacts specific to one feature (e.g. the MinHash signature of the reports) are memoized
+        with `memo`.
+
+        Args:
+            content (str): The content of the message.
+        """
+        self.content = content
+        self.artifacts = {}
+        self.sentiment_future = None
+
+    @cached_property
+    def normalized(self):
+        """
+        The content casefolded, with its whitespace collapsed.
+        """
+        return normalize(self.content)
+
+    @cached_property
+    def content_hash(self):
+        return hash(self.normalized)
+
+    def memo(self, name, compute):
+        """
+        Returns the artifact `name` of the message, calling `compute()` the first time it is requested.
+        """
+        try:
+            return self.artifacts[name]
+        except KeyError:
+            value = self.artifacts[name] = compute()
+            return value
+
+    async def sentiment(self, service):
+        """
+        Returns the {"compound": score} sentiment of the message, requested once from a `SentimentService`. Must be
+        awaited from the event loop.
+        """
+        if self.sentiment_future is None:
+            self.sentiment_future = service.analyze(self.content)
+        return await self.sentiment_future
+
+
+class AnalysisCache:
+    def __init__(self, max_size=1024):
+        """
+        The analyses of the recent messages, keyed by message ID, in LRU order.
+
+        A Discord message can't carry extra attributes, so the features look its analysis up here, from the event loop
+        where all the stages run. The least recently used analyses are evicted beyond `max_size` messages: by then,
+        every stage is done with them. A message whose content changed since its analysis (an edit) gets a new one.
+
+        Args:
+            max_size (int): The maximum number of analyses kept in memory.
+        """
+        self.max_size = max_size
+        self.analyses = OrderedDict()  # message ID -> MessageAnalysis, least recently used first
+        self.hits = metrics.counter("analysis_cache_hits_total")
+        metrics.gauge("analysis_cache_size", callback=lambda: len(self.analyses))
+
+    def get(self, message):
+        """
+        Returns the analysis of a message, created empty if the message has none yet. A message without ID (e.g. in the
+        benchmarks) gets an analysis that isn't cached.
+        """
+        message_id = getattr(message, "id", None)
+        if message_id is None:
+            return MessageAnalysis(message.content)
+        analysis = self.analyses.get(message_id)
+        if analysis is not None and analysis.content == message.content:
+            self.analyses.move_to_end(message_id)
+            self.hits.inc()
+            return analysis
+        analysis = self.analyses[message_id] = MessageAnalysis(message.content)
+        self.analyses.move_to_end(message_id)
+        if len(self.analyses) > self.max_size:
+            self.analyses.popitem(last=False)
+        return analysis
+
+
+analyses = AnalysisCache((Settings().get('analysis') or {}).get('cache_size', 1024))
+
+
+def analysis_of(message):
+    return analyses.get(message)
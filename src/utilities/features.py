@@ -0,0 +1,77 @@
+import os
+import time
+
+from loguru import logger
+
+from src.utilities.metrics import metrics
+
+# Extension module of each feature, loaded in this order (the message pipeline stages are run in the same order).
+FEATURES = {
+    "ft1": "src.ft.ft1.extension",  # Twitch stream notifications and recommendations
+    "ft2": "src.ft.ft2.extension",  # Planning and availabilities
+    "ft3": "src.ft.ft3.extension",  # Profanities and warnings
+    "ft4": "src.ft.ft4.extension",  # GIFs channel
+    "ft5": "src.ft.ft5.extension",  # Daily reports and activity recommendations
+    "bonus": "src.ft.bonus.extension",  # Squad Busters and Destiny
+}
+
+PROCESS_START = time.perf_counter()
+
+
+def current_rss():
+    """
+    Returns the resident set size of the bot process in bytes, or None if it can't be measured on this platform.
+    """
+    try:
+        with open("/proc/self/statm", "r") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, AttributeError):
+        pass
+    try:
+        import resource
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024  # Peak RSS, in kilobytes on Linux.
+    except ImportError:
+        return None
+
+
+def load_features(bot, enabled_features):
+    """
+    Loads the extension of every enabled feature and reports the time and memory taken by each of them.
+
+    Args:
+        bot (discord.Bot): The bot instance.
+        enabled_features (dict): The `features` section of `settings.json`, mapping feature names to booleans. Missing
+                                 features are enabled.
+
+    Returns:
+        list: A list of tuples `(feature, seconds, rss_bytes)` in loading order. `rss_bytes` is the growth of the
+              resident memory caused by the feature, or None if it can't be measured.
+    """
+    report = []
+    for feature, extension in FEATURES.items():
+        if not (enabled_features or {}).get(feature, True):
+            logger.info(f"Feature {feature} is disabled.")
+            continue
+        rss_before = current_rss()
+        start = time.perf_counter()
+        bot.load_extension(extension)
+        duration = time.perf_counter() - start
+        rss_after = current_rss()
+        rss_growth = rss_after - rss_before if rss_before is not None and rss_after is not None else None
+        metrics.gauge("feature_load_seconds", feature=feature).set(round(duration, 3))
+        if rss_growth is not None:
+            metrics.gauge("feature_rss_bytes", feature=feature).set(rss_growth)
+        report.append((feature, duration, rss_growth))
+    log_startup_report(report)
+    return report
+
+
+def log_startup_report(report):
+    lines = [f"{'feature':<8} {'load time':>10} {'memory':>10}"]
+    for feature, duration, rss_growth in report:
+        memory = f"{rss_growth / 2 ** 20:.1f} MiB" if rss_growth is not None else "n/a"
+        lines.append(f"{feature:<8} {duration:>9.2f}s {memory:>10}")
+    rss = current_rss()
+    total_memory = f"{rss / 2 ** 20:.1f} MiB" if rss is not None else "n/a"
+    lines.append(f"{'total':<8} {time.perf_counter() - PROCESS_START:>9.2f}s {total_memory:>10}")
+    logger.info("Startup report:\n" + "\n".join(lines))
@@ -0,0 +1,94 @@
+import time
+from collections import OrderedDict
+
+from src.utilities.metrics import metrics
+from src.utilities.settings import Settings
+
+
+class TokenBucket:
+    __slots__ = ("tokens", "updated_at")
+
+    def __init__(self, tokens, updated_at):
+        self.tokens = tokens
+        self.updated_at = updated_at
+
+
+class FloodControl:
+    def __init__(self, author_rate=1.0, author_burst=5, channel_rate=5.0, channel_burst=20, max_buckets=10_000,
+                 exempt_stages=("profanities", "message_stats"), clock=time.monotonic):
+        """
+        Token-bucket limiter of the messages handed over to the message pipeline, per author and per channel.
+
+        Every author and every channel owns a bucket of `burst` tokens, refilled at `rate` tokens per second. A message
+        takes one token from the bucket of its author and one from the bucket of its channel; when one of them is
+        empty, the message is a flood and is only submitted to the `exempt_stages` (the moderation and the message
+        statistics, which are cheap and must see every message), so that the expensive stages (sentiment model, Tenor
+        calls) never run for it. The buckets are kept in LRU order and the least recently used ones are evicted beyond
+        `max_buckets`: an idle bucket is full anyway, so evicting it doesn't change the limits.
+
+        Args:
+            author_rate (float): The number of messages per second allowed per author, in the long run.
+            author_burst (int): The number of messages an author can send at once.
+            channel_rate (float): The number of messages per second allowed per channel, in the long run.
+            channel_burst (int): The number of messages that can be sent at once in a channel.
+            max_buckets (int): The maximum number of buckets kept in memory.
+            exempt_stages (tuple): The names of the pipeline stages still receiving the floods.
+            clock (callable): Returns the current time in seconds.
+        """
+        self.limits = {'author': (author_rate, author_burst), 'channel': (channel_rate, channel_burst)}
+        self.max_buckets = max_buckets
+        self.exempt_stages = set(exempt_stages)
+        self.clock = clock
+        self.buckets = OrderedDict()  # (scope, ID) -> TokenBucket, least recently used first
+        self.rejected = {scope: metrics.counter("flood_rejected_total", scope=scope) for scope in self.limits}
+        metrics.gauge("flood_buckets", callback=lambda: len(self.buckets))
+
+    def _bucket(self, scope, key, now):
+        rate, burst = self.limits[scope]
+        bucket = self.buckets.get((scope, key))
+        if bucket is None:
+            bucket = self.buckets[(scope, key)] = TokenBucket(burst, now)
+            if len(self.buckets) > self.max_buckets:
+                self.buckets.popitem(last=False)
+        else:
+            self.buckets.move_to_end((scope, key))
+            bucket.tokens = min(burst, bucket.tokens + (now - bucket.updated_at) * rate)
+            bucket.updated_at = now
+        return bucket
+
+    def allow(self, message):
+        """
+        Takes a token from the buckets of the author and of the channel of a message.
+
+        Returns:
+            bool: False if the message is a flood. No token is taken then, so that a flooding author doesn't drain the
+                  bucket of the channel.
+        """
+        now = self.clock()
+        author = self._bucket('author', message.author.id, now)
+        channel = self._bucket('channel', message.channel.id, now)
+        for scope, bucket in (('author', author), ('channel', channel)):
+            if bucket.tokens < 1:
+                self.rejected[scope].inc()
+                return False
+        author.tokens -= 1
+        channel.tokens -= 1
+        return True
+
+
+def create_flood_control(settings):
+    """
+    Creates the flood control configured in the `flood_control` section of settings.json, or returns None if it is
+    disabled.
+    """
+    settings = settings or {}
+    if not settings.get('enabled', True):
+        return None
+    author, channel = settings.get('author', {}), settings.get('channel', {})
+    return FloodControl(author_rate=author.get('rate', 1.0), author_burst=author.get('burst', 5),
+                        channel_rate=channel.get('rate', 5.0), channel_burst=channel.get('burst', 20),
+                        max_buckets=settings.get('max_buckets', 10_000),
+                        exempt_stages=settings.get('exempt_stages', ("profanities", "message_stats")))
+
+
+flood_control = create_flood_control(Settings().get('flood_control'))
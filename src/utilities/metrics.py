@@ -0,0 +1,223 @@
+import functools
+import inspect
+import time
+from collections import deque
+
+from aiohttp import web
+from loguru import logger
+
+
+class Counter:
+    def __init__(self):
+        self.value = 0
+
+    def inc(self, amount=1):
+        self.value += amount
+
+
+class Gauge:
+    def __init__(self, callback=None):
+        self.callback = callback
+        self._value = 0
+
+    def set(self, value):
+        self._value = value
+
+    @property
+    def value(self):
+        return self.callback() if self.callback else self._value
+
+
+class Histogram:
+    def __init__(self, window=1024):
+        """
+        Records observations (typically durations in seconds). The count and sum cover every observation, while the
+        percentiles are computed over the `window` most recent ones, so they follow the current behaviour of the bot.
+        """
+        self.samples = deque(maxlen=window)
+        self.count = 0
+        self.sum = 0.0
+
+    def observe(self, value):
+        self.samples.append(value)
+        self.count += 1
+        self.sum += value
+
+    def percentiles(self, percents=(50, 95, 99)):
+        """
+        Computes percentiles of the recent observations using the nearest-rank method.
+
+        Returns:
+            dict: A dictionary mapping each requested percent to its value (0.0 when nothing was observed yet).
+        """
+        ordered = sorted(self.samples)
+        if not ordered:
+            return {percent: 0.0 for percent in percents}
+        return {percent: ordered[min(len(ordered) - 1, max(0, round(percent / 100 * len(ordered)) - 1))]
+                for percent in percents}
+
+
+class MetricsRegistry:
+    def __init__(self, prefix="mee7"):
+        """
+        A registry of counters, gauges and latency histograms, identified by a name and optional labels.
+
+        Args:
+            prefix (str): The prefix added to every metric name in the Prometheus exposition.
+        """
+        self.prefix = prefix
+        self.started_at = time.monotonic()
+        self.counters = {}
+        self.gauges = {}
+        self.histograms = {}
+
+    @staticmethod
+    def _key(name, labels):
+        return name, tuple(sorted(labels.items()))
+
+    def counter(self, name, **labels):
+        return self.counters.setdefault(self._key(name, labels), Counter())
+
+    def gauge(self, name, callback=None, **labels):
+        key = self._key(name, labels)
+        if key not in self.gauges:
+            self.gauges[key] = Gauge(callback)
+        elif callback:
+            self.gauges[key].callback = callback
+        return self.gauges[key]
+
+    def histogram(self, name, **labels):
+        return self.histograms.setdefault(self._key(name, labels), Histogram())
+
+    def uptime(self):
+        return time.monotonic() - self.started_at
+
+    def summary(self):
+        """
+        Summarizes the metrics in a human-readable form, as displayed by the `/stats` command.
+
+        Returns:
+            list: A list of lines. Latencies are given in milliseconds and throughputs in calls per minute since startup.
+        """
+        minutes = max(self.uptime() / 60, 1 / 60)
+        lines = [f"uptime: {self.uptime() / 3600:.1f}h"]
+        for (name, labels), histogram in sorted(self.histograms.items()):
+            if not histogram.count:
+                continue
+            p50, p95, p99 = (value * 1000 for value in histogram.percentiles().values())
+            lines.append(f"{name}{_format_labels(labels)}: {histogram.count} ({histogram.count / minutes:.1f}/min) "
+                         f"p50={p50:.1f}ms p95={p95:.1f}ms p99={p99:.1f}ms")
+        for (name, labels), counter in sorted(self.counters.items()):
+            if counter.value:
+                lines.append(f"{name}{_format_labels(labels)}: {counter.value}")
+        for (name, labels), gauge in sorted(self.gauges.items()):
+            lines.append(f"{name}{_format_labels(labels)}: {gauge.value}")
+        return lines
+
+    def to_prometheus(self):
+        """
+        Renders every metric in the Prometheus text exposition format. Histograms are exposed as summaries with their
+        p50, p95 and p99 quantiles.
+
+        Returns:
+            str: The metrics, one sample per line.
+        """
+        lines = [f"# TYPE {self.prefix}_uptime_seconds gauge", f"{self.prefix}_uptime_seconds {self.uptime():.3f}"]
+        for metric_type, group in (("counter", self.counters), ("gauge", self.gauges)):
+            for name in sorted({name for name, _ in group}):
+                lines.append(f"# TYPE {self.prefix}_{name} {metric_type}")
+                for (metric_name, labels), metric in group.items():
+                    if metric_name == name:
+                        lines.append(f"{self.prefix}_{name}{_format_labels(labels)} {metric.value}")
+        for name in sorted({name for name, _ in self.histograms}):
+            lines.append(f"# TYPE {self.prefix}_{name} summary")
+            for (metric_name, labels), histogram in self.histograms.items():
+                if metric_name != name:
+                    continue
+                for percent, value in histogram.percentiles().items():
+                    quantile_labels = labels + (("quantile", str(percent / 100)),)
+                    lines.append(f"{self.prefix}_{name}{_format_labels(quantile_labels)} {value:.6f}")
+                lines.append(f"{self.prefix}_{name}_sum{_format_labels(labels)} {histogram.sum:.6f}")
+                lines.append(f"{self.prefix}_{name}_count{_format_labels(labels)} {histogram.count}")
+        return "\n".join(lines) + "\n"
+
+
+def _format_labels(labels):
+    if not labels:
+        return ""
+    return "{" + ",".join(f'{key}="{value}"' for key, value in labels) + "}"
+
+
+metrics = MetricsRegistry()
+
+
+def timed(name, **labels):
+    """
+    Decorator recording the duration of each call of the decorated function in the `name` histogram, and its
+    failures in the `<name>_errors_total` counter (without the `_seconds` suffix). Works with both regular and
+    coroutine functions.
+
+    Args:
+        name (str): The name of the histogram.
+        **labels: The labels of the histogram, e.g. `task="check_streamers"`.
+    """
+
+    def decorator(func):
+        histogram = metrics.histogram(name, **labels)
+        errors = metrics.counter(f"{name.removesuffix('_seconds')}_errors_total", **labels)
+
+        if inspect.iscoroutinefunction(func):
+            @functools.wraps(func)
+            async def async_wrapper(*args, **kwargs):
+                start = time.perf_counter()
+                try:
+                    return await func(*args, **kwargs)
+                except Exception:
+                    errors.inc()
+                    raise
+                finally:
+                    histogram.observe(time.perf_counter() - start)
+
+            return async_wrapper
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            start = time.perf_counter()
+            try:
+                return func(*args, **kwargs)
+            except Exception:
+                errors.inc()
+                raise
+            finally:
+                histogram.observe(time.perf_counter() - start)
+
+        return wrapper
+
+    return decorator
+
+
+_metrics_runner = None
+
+
+async def start_metrics_server(host="127.0.0.1", port=9108):
+    """
+    Starts a local HTTP server exposing the metrics in the Prometheus text format on `/metrics`. Does nothing if the
+    server is already running.
+
+    Args:
+        host (str): The address to bind. Defaults to localhost, the metrics are not meant to be public.
+        port (int): The port to listen on.
+    """
+    global _metrics_runner
+    if _metrics_runner:
+        return
+
+    async def handle_metrics(request):
+        return web.Response(text=metrics.to_prometheus(), content_type="text/plain", charset="utf-8")
+
+    app = web.Application()
+    app.router.add_get("/metrics", handle_metrics)
+    _metrics_runner = web.AppRunner(app)
+    await _metrics_runner.setup()
+    await web.TCPSite(_metrics_runner, host, port).start()
+    logger.info(f"Metrics available on http://{host}:{port}/metrics")
@@ -0,0 +1,166 @@
+import asyncio
+import time
+
+from loguru import logger
+
+from src.utilities.metrics import metrics
+from src.utilities.settings import Settings
+
+DROP_NEWEST = "drop_newest"
+DROP_OLDEST = "drop_oldest"
+BLOCK = "block"
+OVERFLOW_POLICIES = (DROP_NEWEST, DROP_OLDEST, BLOCK)
+
+
+class Stage:
+    def __init__(self, name, handler, predicate=None, workers=1, queue_size=100, overflow_policy=DROP_NEWEST):
+        """
+        Describes one step of the message pipeline.
+
+        Args:
+            name (str): The name of the stage, used in logs and to look up per-stage settings.
+            handler (callable): A coroutine function taking the message. The blocking work (model inference, disk
+                                writes) is moved off the event loop by the handler itself.
+            predicate (callable, optional): A function taking the message and returning whether this stage should
+                                            process it. Defaults to accepting every message.
+            workers (int): The number of concurrent workers consuming the stage queue.
+            queue_size (int): The maximum number of messages waiting in the stage queue.
+            overflow_policy (str): What to do when the queue is full: `DROP_NEWEST` discards the incoming message,
+                                   `DROP_OLDEST` discards the oldest queued message, `BLOCK` waits for a free slot.
+        """
+        if overflow_policy not in OVERFLOW_POLICIES:
+            raise ValueError(f"Unknown overflow policy: {overflow_policy}")
+        self.name = name
+        self.handler = handler
+        self.predicate = predicate
+        self.workers = workers
+        self.queue_size = queue_size
+        self.overflow_policy = overflow_policy
+        # Created with the stage, so that the messages received before the pipeline starts wait for the workers.
+        self.queue = asyncio.Queue(maxsize=queue_size)
+        self.submitted = metrics.counter("pipeline_messages_total", stage=name)
+        self.dropped = metrics.counter("pipeline_dropped_total", stage=name)
+        self.errors = metrics.counter("pipeline_errors_total", stage=name)
+        self.wait_time = metrics.histogram("pipeline_wait_seconds", stage=name)
+        self.latency = metrics.histogram("pipeline_stage_seconds", stage=name)
+        metrics.gauge("pipeline_queue_depth", callback=self.depth, stage=name)
+
+    def accepts(self, message):
+        return self.predicate is None or self.predicate(message)
+
+    def depth(self):
+        return self.queue.qsize()
+
+
+class MessagePipeline:
+    def __init__(self, settings=None):
+        """
+        A non-blocking message processing pipeline.
+
+        Every stage owns a bounded queue and a set of worker tasks. Submitting a message only enqueues it in the
+        stages that accept it, so `on_message` returns immediately and a slow stage (e.g. the GIFs channel) never
+        delays the others nor the gateway heartbeats. The messages submitted before `start` (e.g. while the guilds are
+        still being chunked) wait in the queues.
+
+        Args:
+            settings (dict, optional): The `pipeline` section of `settings.json`. Supported keys are `queue_size`,
+                                       `workers`, `overflow_policy` and `stages`, a mapping of stage names to per-stage
+                                       overrides of these keys.
+        """
+        self.settings = settings or {}
+        self.stages = []
+        self.tasks = []
+
+    def add_stage(self, name, handler, predicate=None, overflow_policy=None):
+        """
+        Registers a new stage, using the queue settings of `settings.json` for that stage.
+
+        Args:
+            name (str): The name of the stage.
+            handler (callable): The stage handler, see `Stage`.
+            predicate (callable, optional): A function selecting the messages handled by the stage.
+            overflow_policy (str, optional): The overflow policy of the stage when `settings.json` doesn't set one for
+                                             it, instead of the global one (e.g. `BLOCK` for a stage that must never
+                                             skip a message).
+
+        Returns:
+            Stage: The registered stage.
+        """
+        overrides = self.settings.get('stages', {}).get(name, {})
+        stage = Stage(name, handler, predicate=predicate,
+                      workers=overrides.get('workers', self.settings.get('workers', 1)),
+                      queue_size=overrides.get('queue_size', self.settings.get('queue_size', 100)),
+                      overflow_policy=overrides.get('overflow_policy', overflow_policy
+                                                    or self.settings.get('overflow_policy', DROP_NEWEST)))
+        self.stages.append(stage)
+        return stage
+
+    @property
+    def running(self):
+        return bool(self.tasks)
+
+    def start(self):
+        """
+        Starts the workers of the stages. Must be called from a running event loop, does nothing if
+        the pipeline is already running (e.g. when `on_ready` is triggered again after a reconnection).
+        """
+        if self.running:
+            return
+        for stage in self.stages:
+            for _ in range(stage.workers):
+                self.tasks.append(asyncio.create_task(self._worker(stage), name=f"pipeline-{stage.name}"))
+        logger.info(f"Message pipeline started with stages: {', '.join(stage.name for stage in self.stages)}")
+
+    async def stop(self):
+        """
+        Cancels the stage workers. The queued messages are processed when the pipeline is started again.
+        """
+        for task in self.tasks:
+            task.cancel()
+        await asyncio.gather(*self.tasks, return_exceptions=True)
+        self.tasks = []
+
+    async def submit(self, message, stages=None):
+        """
+        Enqueues a message in every stage accepting it, applying each stage's overflow policy when its queue is full.
+
+        Args:
+            message (discord.Message): The message to process.
+            stages (set): The names of the stages the message is submitted to, or None for all of them.
+        """
+        for stage in self.stages:
+            if stages is not None and stage.name not in stages:
+                continue
+            if not stage.accepts(message):
+                continue
+            stage.submitted.inc()
+            item = (message, time.perf_counter())
+            if stage.queue.full():
+                if stage.overflow_policy == BLOCK:
+                    await stage.queue.put(item)
+                    continue
+                stage.dropped.inc()
+                if stage.overflow_policy == DROP_NEWEST:
+                    logger.warning(f"Stage '{stage.name}' is overloaded, dropping the incoming message.")
+                    continue
+                logger.warning(f"Stage '{stage.name}' is overloaded, dropping the oldest queued message.")
+                stage.queue.get_nowait()
+                stage.queue.task_done()
+            stage.queue.put_nowait(item)
+
+    async def _worker(self, stage):
+        while True:
+            message, enqueued_at = await stage.queue.get()
+            start = time.perf_counter()
+            stage.wait_time.observe(start - enqueued_at)
+            try:
+                await stage.handler(message)
+            except Exception as e:
+                stage.errors.inc()
+                logger.error(f"An error occurred in stage '{stage.name}': {str(e)}")
+            finally:
+                stage.latency.observe(time.perf_counter() - start)
+                stage.queue.task_done()
+
+
+pipeline = MessagePipeline(Settings().get('pipeline'))
@@ -0,0 +1,296 @@
+# Optional SQLite storage of the bot's events, shared by the reports, the warnings and the planning. Enabled with
+# `"storage": {"backend": "sqlite"}` in settings.json; the existing JSON files are imported once with:
+#   python -m src.utilities.store --migrate
+import argparse
+import glob
+import gzip
+import json
+import os
+import sqlite3
+import threading
+from datetime import datetime
+
+from loguru import logger
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS messages (
+    id INTEGER PRIMARY KEY,
+    day TEXT NOT NULL,
+    channel INTEGER,
+    author INTEGER NOT NULL,
+    timestamp TEXT NOT NULL,
+    content TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS messages_day ON messages (day);
+CREATE INDEX IF NOT EXISTS messages_author_day ON messages (author, day);
+CREATE INDEX IF NOT EXISTS messages_channel_day ON messages (channel, day);
+
+CREATE TABLE IF NOT EXISTS message_counts (
+    day TEXT NOT NULL,
+    channel INTEGER NOT NULL,
+    author INTEGER NOT NULL,
+    count INTEGER NOT NULL,
+    PRIMARY KEY (day, channel, author)
+);
+
+CREATE TABLE IF NOT EXISTS warnings (
+    user_id TEXT NOT NULL,
+    day TEXT NOT NULL,
+    count INTEGER NOT NULL,
+    PRIMARY KEY (user_id, day)
+);
+CREATE INDEX IF NOT EXISTS warnings_day ON warnings (day);
+
+CREATE TABLE IF NOT EXISTS user_icals (
+    user_id TEXT PRIMARY KEY,
+    ical_content TEXT NOT NULL,
+    updated_at TEXT NOT NULL
+);
+
+CREATE TABLE IF NOT EXISTS meta (
+    key TEXT PRIMARY KEY,
+    value TEXT
+);
+"""
+
+# Day of the warnings imported from warnings.json that don't appear in any daily file
+UNKNOWN_DAY = ""
+
+
+def iso_day(day):
+    # Converts a day formatted like `get_current_date_formatted()` (MMDDYYYY) to the ISO format used by the store.
+    return datetime.strptime(day, "%m%d%Y").date().isoformat()
+
+
+class EventStore:
+    def __init__(self, path="mee7.db"):
+        """
+        An embedded SQLite database in WAL mode, so that the scheduled tasks can read while a message is written.
+
+        Days are stored in the ISO format, so that they sort chronologically. The connection is shared by the event
+        loop and the worker threads, every access is serialized by a lock.
+
+        Args:
+            path (str): The path of the database file.
+        """
+        self.path = path
+        self.lock = threading.Lock()
+        self.connection = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self.connection.execute("PRAGMA journal_mode=WAL")
+        self.connection.execute("PRAGMA synchronous=NORMAL")
+        self.connection.executescript(SCHEMA)
+
+    def query(self, sql, parameters=()):
+        with self.lock:
+            return self.connection.execute(sql, parameters).fetchall()
+
+    def execute(self, sql, parameters=()):
+        with self.lock:
+            self.connection.execute(sql, parameters)
+
+    def execute_many(self, sql, rows):
+        # One transaction for all the rows.
+        with self.lock:
+            self.connection.execute("BEGIN")
+            try:
+                self.connection.executemany(sql, rows)
+            except BaseException:
+                self.connection.execute("ROLLBACK")
+                raise
+            self.connection.execute("COMMIT")
+
+    def close(self):
+        with self.lock:
+            self.connection.close()
+
+    # Reports
+
+    def add_messages(self, messages):
+        if not messages:
+            return
+        self.execute_many(
+            "INSERT INTO messages (day, channel, author, timestamp, content) VALUES (?, ?, ?, ?, ?)",
+            [(message['day'], message.get('channel'), message['author'], message['timestamp'], message['content'])
+             for message in messages])
+
+    def messages(self, day):
+        return [{'author': author, 'content': content, 'timestamp': timestamp}
+                for author, content, timestamp in self.query(
+                    "SELECT author, content, timestamp FROM messages WHERE day = ? ORDER BY id", (day,))]
+
+    def authors(self, day):
+        return {author for author, in self.query("SELECT DISTINCT author FROM messages WHERE day = ?", (day,))}
+
+    def delete_messages_before(self, day):
+        self.execute("DELETE FROM messages WHERE day < ?", (day,))
+
+    # Message statistics
+
+    def count_message(self, day, channel, author):
+        self.execute("INSERT INTO message_counts (day, channel, author, count) VALUES (?, ?, ?, 1) "
+                     "ON CONFLICT (day, channel, author) DO UPDATE SET count = count + 1",
+                     (day, channel, author))
+
+    def top_authors(self, day, channels, limit=10):
+        """
+        Returns the `limit` authors who sent the most messages in the given channels during a day, as a list of
+        (author, count) tuples.
+        """
+        placeholders = ", ".join("?" * len(channels))
+        return self.query(
+            f"SELECT author, SUM(count) AS total FROM message_counts WHERE day = ? AND channel IN ({placeholders}) "
+            f"GROUP BY author ORDER BY total DESC LIMIT ?",
+            (day, *channels, limit))
+
+    # Warnings
+
+    def add_warning(self, user_id, day, count=1):
+        self.execute("INSERT INTO warnings (user_id, day, count) VALUES (?, ?, ?) "
+                     "ON CONFLICT (user_id, day) DO UPDATE SET count = count + excluded.count",
+                     (str(user_id), day, count))
+
+    def user_warnings(self, user_id):
+        (count,), = self.query("SELECT COALESCE(SUM(count), 0) FROM warnings WHERE user_id = ?", (str(user_id),))
+        return count
+
+    def top_warnings(self, limit=10, day=None):
+        """
+        Returns the users with the most warnings, of all time or of a day, as a dict of user ID -> count.
+        """
+        where, parameters = ("WHERE day = ? ", (day,)) if day is not None else ("", ())
+        return dict(self.query(f"SELECT user_id, SUM(count) AS total FROM warnings {where}"
+                               f"GROUP BY user_id ORDER BY total DESC LIMIT ?", (*parameters, limit)))
+
+    def warning_history(self, start, end, granularity="day", user_id=None):
+        """
+        Returns the warnings per day, week (keyed by its Monday) or month (keyed YYYY-MM) between two ISO days, of a
+        user or of everyone, as a dict of period -> {user ID: count}, oldest period first.
+        """
+        period = {
+            'day': "day",
+            'week': "date(day, '-' || ((CAST(strftime('%w', day) AS INTEGER) + 6) % 7) || ' days')",
+            'month': "substr(day, 1, 7)",
+        }[granularity]
+        where, parameters = ("AND user_id = ? ", (str(user_id),)) if user_id is not None else ("", ())
+        history = {}
+        for key, user, count in self.query(
+                f"SELECT {period} AS period, user_id, SUM(count) FROM warnings WHERE day BETWEEN ? AND ? {where}"
+                f"GROUP BY period, user_id ORDER BY period", (start, end, *parameters)):
+            history.setdefault(key, {})[user] = count
+        return history
+
+    def clear_warnings(self, user_id):
+        self.execute("DELETE FROM warnings WHERE user_id = ?", (str(user_id),))
+
+    # Planning
+
+    def set_user_ical(self, user_id, ical_content):
+        self.execute("INSERT INTO user_icals (user_id, ical_content, updated_at) VALUES (?, ?, ?) "
+                     "ON CONFLICT (user_id) DO UPDATE SET ical_content = excluded.ical_content, "
+                     "updated_at = excluded.updated_at",
+                     (str(user_id), ical_content, datetime.now().isoformat()))
+
+    def user_ical(self, user_id):
+        rows = self.query("SELECT ical_content FROM user_icals WHERE user_id = ?", (str(user_id),))
+        return rows[0][0] if rows else None
+
+    def user_icals(self):
+        return dict(self.query("SELECT user_id, ical_content FROM user_icals"))
+
+    # Migration
+
+    def migrate_json_files(self):
+        """
+        Imports the messages of the reports (daily snapshots, journals and archive), the warnings and the users' iCals
+        from the JSON files. Runs only once per database. The aggregated events of the planning (derived from the
+        iCals) and settings.json (edited by hand) stay in JSON.
+
+        Returns:
+            dict: The number of imported rows per table, or None if the database was already migrated.
+        """
+        if self.query("SELECT 1 FROM meta WHERE key = 'migrated_at'"):
+            return None
+        imported = {'messages': 0, 'warnings': 0, 'user_icals': 0}
+
+        days = {}  # ISO day -> messages
+        for path in glob.glob("src/ft/ft5/messages_*.json") + glob.glob("src/ft/ft5/messages_*.jsonl") + \
+                glob.glob("src/ft/ft5/archive/messages_*.jsonl.gz"):
+            day = iso_day(os.path.basename(path).split(".")[0][len("messages_"):])
+            with (gzip.open(path, "rt", encoding="utf-8") if path.endswith(".gz") else open(path, "r")) as f:
+                if path.endswith(".json"):
+                    messages = json.load(f)
+                else:
+                    messages = []
+                    for line in f:
+                        try:
+                            messages.append(json.loads(line))
+                        except json.JSONDecodeError:
+                            logger.warning(f"Ignoring a corrupted line of {path}: {line!r}")
+            days.setdefault(day, []).extend(messages)
+        for day, messages in days.items():
+            self.add_messages([{**message, 'day': day} for message in messages])
+            imported['messages'] += len(messages)
+
+        daily_totals = {}
+        for path in glob.glob("src/ft/ft3/warnings_*.json"):
+            day = iso_day(os.path.basename(path)[len("warnings_"):-len(".json")])
+            with open(path, "r") as f:
+                for user_id, count in json.load(f).items():
+                    self.add_warning(user_id, day, count)
+                    daily_totals[user_id] = daily_totals.get(user_id, 0) + count
+                    imported['warnings'] += 1
+        if os.path.exists("src/ft/ft3/warnings.json"):
+            with open("src/ft/ft3/warnings.json", "r") as f:
+                for user_id, count in json.load(f).items():
+                    # The warnings older than the daily files.
+                    if count > daily_totals.get(user_id, 0):
+                        self.add_warning(user_id, UNKNOWN_DAY, count - daily_totals.get(user_id, 0))
+                        imported['warnings'] += 1
+
+        for path in glob.glob("user_icals/*.json"):
+            with open(path, "r") as f:
+                user_data = json.load(f)
+            self.set_user_ical(user_data["user_id"], user_data.get("ical_content", ""))
+            imported['user_icals'] += 1
+
+        self.execute("INSERT INTO meta (key, value) VALUES ('migrated_at', ?)", (datetime.now().isoformat(),))
+        return imported
+
+
+_stores = {}
+
+
+def open_event_store(settings):
+    """
+    Returns the event store configured in the `storage` section of settings.json, or None if the bot stores its data
+    in JSON files. The features share one store per database file.
+    """
+    storage = settings.get('storage') or {}
+    if storage.get('backend', 'json') != 'sqlite':
+        return None
+    path = storage.get('sqlite_path', 'mee7.db')
+    if path not in _stores:
+        _stores[path] = EventStore(path)
+    return _stores[path]
+
+
+def main():
+    from src.utilities.settings import Settings
+
+    parser = argparse.ArgumentParser(description="MEE7 event store")
+    parser.add_argument("--migrate", action="store_true", help="import the existing JSON files into the database")
+    args = parser.parse_args()
+    storage = Settings().get('storage') or {}
+    store = EventStore(storage.get('sqlite_path', 'mee7.db'))
+    if args.migrate:
+        imported = store.migrate_json_files()
+        if imported is None:
+            logger.warning(f"{store.path} was already migrated, nothing was imported.")
+        else:
+            logger.success(f"Imported into {store.path}: " +
+                           ", ".join(f"{count} {table}" for table, count in imported.items()))
+    store.close()
+
+
+if __name__ == "__main__":
+    main()